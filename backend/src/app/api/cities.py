@@ -6,17 +6,20 @@ from fastapi import APIRouter, Depends, Query, HTTPException, status
 from sqlalchemy.orm import Session
 
 from ..core.database import get_db
-from ..core.security import KeycloakBearer
+from ..core.unit_of_work import UnitOfWorkRoute
+from ..core.security import KeycloakBearer, require_city_scope
 from ..schemas import (
     City, CityCreate, CityUpdate, 
     PaginatedResponse, ErrorResponse
 )
 from ..services import city_service
+from .scopes import city_of_path, new_city
 
 router = APIRouter(
     prefix="/cities", 
     tags=["Cities"],
-    dependencies=[Depends(KeycloakBearer())]
+    dependencies=[Depends(KeycloakBearer())],
+    route_class=UnitOfWorkRoute
 )
 
 
@@ -58,7 +61,7 @@ def get_city_stats(
     return city_service.get_city_stats(db, city_id)
 
 
-@router.post("/", response_model=City, status_code=status.HTTP_201_CREATED, summary="Create city")
+@router.post("/", response_model=City, status_code=status.HTTP_201_CREATED, summary="Create city", dependencies=[Depends(require_city_scope(new_city))])
 def create_city(
     city_in: CityCreate,
     db: Session = Depends(get_db)
@@ -67,7 +70,7 @@ def create_city(
     return city_service.create_city(db, city_in)
 
 
-@router.put("/{city_id}", response_model=City, summary="Update city")
+@router.put("/{city_id}", response_model=City, summary="Update city", dependencies=[Depends(require_city_scope(city_of_path))])
 def update_city(
     city_id: int,
     city_in: CityUpdate,
@@ -77,7 +80,7 @@ def update_city(
     return city_service.update_city(db, city_id, city_in)
 
 
-@router.delete("/{city_id}", response_model=City, summary="Delete city")
+@router.delete("/{city_id}", response_model=City, summary="Delete city", dependencies=[Depends(require_city_scope(city_of_path))])
 def delete_city(
     city_id: int,
     db: Session = Depends(get_db)
@@ -4,9 +4,11 @@ Dashboard and Visualization API routes with Keycloak authentication.
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query, HTTPException, status, Path
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..core.database import get_db
-from ..core.security import KeycloakBearer
+from ..core.database import get_db, get_async_db
+from ..core.unit_of_work import UnitOfWorkRoute
+from ..core.security import KeycloakBearer, require_city_scope
 from ..schemas import (
     Dashboard, DashboardCreate, DashboardUpdate, DashboardWithSections,
     DashboardSection, DashboardSectionCreate, DashboardSectionUpdate,
@@ -14,26 +16,28 @@ from ..schemas import (
     LineChart, BarChart, PieChart, StatChart, Table, Map,
     AnyVisualizationCreate, AnyVisualization
 )
-from ..services import dashboard_service, visualization_service, section_service
+from ..services import dashboard_service, visualization_service, section_service, async_dashboard_service, async_visualization_service, async_section_service
+from .scopes import cities_of_visualizations, city_of_body, city_of_dashboard, city_of_section, city_of_visualization
 
 router = APIRouter(
     prefix="/dashboards", 
     tags=["Dashboards"],
-    dependencies=[Depends(KeycloakBearer())]
+    dependencies=[Depends(KeycloakBearer())],
+    route_class=UnitOfWorkRoute
 )
 
 
 @router.get("/", response_model=List[Dashboard], summary="List dashboards")
-def list_dashboards(
+async def list_dashboards(
     city_id: Optional[int] = Query(None, description="Filter by city ID"),
     public_only: bool = Query(True, description="Show only public dashboards"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """List dashboards with optional filtering."""
     if city_id:
-        dashboards, total = dashboard_service.list_dashboards_by_city(
+        dashboards, total = await async_dashboard_service.list_dashboards_by_city(
             db, city_id, skip, limit, public_only
         )
     else:
@@ -45,43 +49,43 @@ def list_dashboards(
 
 
 @router.get("/{dashboard_id}", response_model=Dashboard, summary="Get dashboard by ID")
-def get_dashboard(
+async def get_dashboard(
     dashboard_id: int = Path(..., description="Dashboard ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific dashboard by ID."""
-    return dashboard_service.get_dashboard(db, dashboard_id)
+    return await async_dashboard_service.get_dashboard(db, dashboard_id)
 
 
 @router.get("/city/{city_code}", response_model=Dashboard, summary="Get dashboard by city code")
-def get_dashboard_by_city_code(
+async def get_dashboard_by_city_code(
     city_code: str = Path(..., description="City code"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get dashboard for a specific city by city code."""
-    return dashboard_service.get_dashboard_by_city_code(db, city_code)
+    return await async_dashboard_service.get_dashboard_by_city_code(db, city_code)
 
 
 @router.get("/{dashboard_id}/with-visualizations", response_model=DashboardWithSections, summary="Get dashboard with visualizations")
-def get_dashboard_with_visualizations(
+async def get_dashboard_with_visualizations(
     dashboard_id: int = Path(..., description="Dashboard ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get dashboard with all its sections and visualizations."""
-    return dashboard_service.get_dashboard_with_sections_and_visualizations(db, dashboard_id)
+    return await async_dashboard_service.get_dashboard_with_sections_and_visualizations(db, dashboard_id)
 
 
 # Dashboard Section routes
 @router.get("/{dashboard_id}/sections", response_model=List[DashboardSection], summary="Get dashboard sections")
-def get_dashboard_sections(
+async def get_dashboard_sections(
     dashboard_id: int = Path(..., description="Dashboard ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all sections for a dashboard."""
-    return section_service.list_sections_by_dashboard(db, dashboard_id)
+    return await async_section_service.list_sections_by_dashboard(db, dashboard_id)
 
 
-@router.post("/{dashboard_id}/sections", response_model=DashboardSection, status_code=status.HTTP_201_CREATED, summary="Create section")
+@router.post("/{dashboard_id}/sections", response_model=DashboardSection, status_code=status.HTTP_201_CREATED, summary="Create section", dependencies=[Depends(require_city_scope(city_of_dashboard))])
 def create_section(
     dashboard_id: int = Path(..., description="Dashboard ID"),
     section_in: DashboardSectionCreate = ...,
@@ -95,7 +99,7 @@ def create_section(
     return section_service.create_section(db, section_in)
 
 
-@router.put("/sections/{section_id}", response_model=DashboardSection, summary="Update section")
+@router.put("/sections/{section_id}", response_model=DashboardSection, summary="Update section", dependencies=[Depends(require_city_scope(city_of_section))])
 def update_section(
     section_id: int = Path(..., description="Section ID"),
     section_in: DashboardSectionUpdate = ...,
@@ -105,7 +109,7 @@ def update_section(
     return section_service.update_section(db, section_id, section_in)
 
 
-@router.delete("/sections/{section_id}", response_model=DashboardSection, summary="Delete section")
+@router.delete("/sections/{section_id}", response_model=DashboardSection, summary="Delete section", dependencies=[Depends(require_city_scope(city_of_section))])
 def delete_section(
     section_id: int = Path(..., description="Section ID"),
     db: Session = Depends(get_db)
@@ -114,7 +118,7 @@ def delete_section(
     return section_service.delete_section(db, section_id)
 
 
-@router.put("/{dashboard_id}/sections/reorder", summary="Reorder sections")
+@router.put("/{dashboard_id}/sections/reorder", summary="Reorder sections", dependencies=[Depends(require_city_scope(city_of_dashboard))])
 def reorder_sections(
     dashboard_id: int = Path(..., description="Dashboard ID"),
     section_ids: List[int] = ...,
@@ -124,7 +128,7 @@ def reorder_sections(
     return section_service.reorder_sections(db, dashboard_id, section_ids)
 
 
-@router.post("/sections/{section_id}/duplicate", response_model=DashboardSection, summary="Duplicate section")
+@router.post("/sections/{section_id}/duplicate", response_model=DashboardSection, summary="Duplicate section", dependencies=[Depends(require_city_scope(city_of_section))])
 def duplicate_section(
     section_id: int = Path(..., description="Section ID"),
     new_name: str = ...,
@@ -134,7 +138,7 @@ def duplicate_section(
     return section_service.duplicate_section(db, section_id, new_name)
 
 
-@router.post("/", response_model=Dashboard, status_code=status.HTTP_201_CREATED, summary="Create dashboard")
+@router.post("/", response_model=Dashboard, status_code=status.HTTP_201_CREATED, summary="Create dashboard", dependencies=[Depends(require_city_scope(city_of_body))])
 def create_dashboard(
     dashboard_in: DashboardCreate,
     db: Session = Depends(get_db)
@@ -143,7 +147,7 @@ def create_dashboard(
     return dashboard_service.create_dashboard(db, dashboard_in)
 
 
-@router.put("/{dashboard_id}", response_model=Dashboard, summary="Update dashboard")
+@router.put("/{dashboard_id}", response_model=Dashboard, summary="Update dashboard", dependencies=[Depends(require_city_scope(city_of_dashboard))])
 def update_dashboard(
     dashboard_id: int = Path(..., description="Dashboard ID"),
     dashboard_in: DashboardUpdate = ...,
@@ -153,7 +157,7 @@ def update_dashboard(
     return dashboard_service.update_dashboard(db, dashboard_id, dashboard_in)
 
 
-@router.delete("/{dashboard_id}", response_model=Dashboard, summary="Delete dashboard")
+@router.delete("/{dashboard_id}", response_model=Dashboard, summary="Delete dashboard", dependencies=[Depends(require_city_scope(city_of_dashboard))])
 def delete_dashboard(
     dashboard_id: int = Path(..., description="Dashboard ID"),
     db: Session = Depends(get_db)
@@ -164,15 +168,15 @@ def delete_dashboard(
 
 # Visualization routes
 @router.get("/{dashboard_id}/visualizations", response_model=List[AnyVisualization], summary="Get dashboard visualizations")
-def get_dashboard_visualizations(
+async def get_dashboard_visualizations(
     dashboard_id: int = Path(..., description="Dashboard ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all visualizations for a dashboard."""
-    return visualization_service.list_visualizations_by_dashboard(db, dashboard_id)
+    return await async_visualization_service.list_visualizations_by_dashboard(db, dashboard_id)
 
 
-@router.post("/{dashboard_id}/visualizations", response_model=AnyVisualization, status_code=status.HTTP_201_CREATED, summary="Create visualization")
+@router.post("/{dashboard_id}/visualizations", response_model=AnyVisualization, status_code=status.HTTP_201_CREATED, summary="Create visualization", dependencies=[Depends(require_city_scope(city_of_dashboard))])
 def create_visualization(
     dashboard_id: int = Path(..., description="Dashboard ID"),
     vis_in: AnyVisualizationCreate = ...,
@@ -188,12 +192,13 @@ def create_visualization(
 visualization_router = APIRouter(
     prefix="/visualizations", 
     tags=["Visualizations"],
-    dependencies=[Depends(KeycloakBearer())]
+    dependencies=[Depends(KeycloakBearer())],
+    route_class=UnitOfWorkRoute
 )
 
 
 # Bulk operations must come before path parameters to avoid route conflicts
-@visualization_router.delete("/bulk", summary="Delete multiple visualizations")
+@visualization_router.delete("/bulk", summary="Delete multiple visualizations", dependencies=[Depends(require_city_scope(cities_of_visualizations))])
 def delete_multiple_visualizations(
     ids: List[int] = Query(..., description="List of visualization IDs to delete"),
     db: Session = Depends(get_db)
@@ -204,15 +209,15 @@ def delete_multiple_visualizations(
 
 
 @visualization_router.get("/{vis_id}", response_model=AnyVisualization, summary="Get visualization")
-def get_visualization(
+async def get_visualization(
     vis_id: int = Path(..., description="Visualization ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific visualization by ID."""
-    return visualization_service.get_visualization(db, vis_id)
+    return await async_visualization_service.get_visualization(db, vis_id)
 
 
-@visualization_router.put("/{vis_id}", response_model=AnyVisualization, summary="Update visualization")
+@visualization_router.put("/{vis_id}", response_model=AnyVisualization, summary="Update visualization", dependencies=[Depends(require_city_scope(city_of_visualization))])
 def update_visualization(
     vis_id: int = Path(..., description="Visualization ID"),
     vis_in: VisualizationUpdate = ...,
@@ -222,7 +227,7 @@ def update_visualization(
     return visualization_service.update_visualization(db, vis_id, vis_in)
 
 
-@visualization_router.delete("/{vis_id}", response_model=AnyVisualization, summary="Delete visualization")
+@visualization_router.delete("/{vis_id}", response_model=AnyVisualization, summary="Delete visualization", dependencies=[Depends(require_city_scope(city_of_visualization))])
 def delete_visualization(
     vis_id: int = Path(..., description="Visualization ID"),
     db: Session = Depends(get_db)
@@ -233,13 +238,13 @@ def delete_visualization(
 
 # Legacy endpoint for city-based visualization listing (consolidated)
 @visualization_router.get("/city/{city_code}", summary="Get visualizations by city code (legacy)")
-def get_visualizations_by_city(
+async def get_visualizations_by_city(
     city_code: str = Path(..., description="City code"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Legacy endpoint for getting all visualizations for a city by code."""
     # This replaces individual city endpoints like /ioannina/visualizations, /maribor/visualizations, etc.
-    return visualization_service.list_visualizations_by_city(db, city_code)
+    return await async_visualization_service.list_visualizations_by_city(db, city_code)
 
 
 # Include the visualization router
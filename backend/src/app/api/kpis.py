@@ -3,22 +3,32 @@ KPI API routes with Keycloak authentication.
 """
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, Query, HTTPException, status, Path
+from fastapi import APIRouter, Depends, Query, HTTPException, status, Path, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..core.database import get_db
-from ..core.security import KeycloakBearer
+from ..core.database import get_db, get_async_db, open_stream_session, read_only_route
+from ..core.negotiation import preferred_media_type
+from ..core.pagination import set_next_cursor, set_total_count
+from ..core.unit_of_work import UnitOfWorkRoute
+from ..core.security import KeycloakBearer, require_city_scope
 from ..schemas import (
     KPI, KPICreate, KPIUpdate, KPISummary,
-    KPIValue, KPIValueCreate, KPIValueBulkCreate,
-    KPIQueryParams, KPIValueQueryParams
+    KPIValue, KPIValueCreate, KPIValueBulkCreate, KPIValueBulkResult,
+    KPIValueBatchCreate, KPIValueBatchResult, KPISeriesQuery, KPISeriesResponse,
+    KPIQueryParams, KPIValueQueryParams, KPIValueSeries
 )
-from ..services import kpi_service, kpi_value_service
+from ..services import kpi_service, kpi_value_service, async_kpi_value_service
+from ..services.columnar import ENCODERS as SERIES_ENCODERS, JSON, SERIES_CONTENT, SERIES_MEDIA_TYPES
+from ..services.exports import EXPORT_FORMATS
+from .scopes import cities_of_kpi_batch, city_of_body, city_of_kpi
 
 router = APIRouter(
     prefix="/kpis", 
     tags=["KPIs"],
-    dependencies=[Depends(KeycloakBearer())]
+    dependencies=[Depends(KeycloakBearer())],
+    route_class=UnitOfWorkRoute
 )
 
 
@@ -99,6 +109,19 @@ def get_kpi_categories(
     return kpi_service.get_kpi_categories(db, city_id)
 
 
+@router.get("/latest-values", response_model=List[KPIValue], summary="Get latest values of a city's KPIs")
+async def get_latest_kpi_values_by_city(
+    city_id: int = Query(..., description="City ID"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the latest value of every KPI of a city in one request, e.g. for the
+    stat cards of a dashboard or a KPI catalogue. KPIs without values are
+    omitted; each value carries its `kpi_id`.
+    """
+    return await async_kpi_value_service.get_latest_kpi_values_by_city(db, city_id)
+
+
 @router.get("/{kpi_id}", response_model=KPI, summary="Get KPI by ID")
 def get_kpi(
     kpi_id: int = Path(..., description="KPI ID"),
@@ -140,7 +163,7 @@ def get_kpi_with_latest_value(
     return kpi_service.get_kpi_with_latest_value(db, kpi_id)
 
 
-@router.post("/", response_model=KPI, status_code=status.HTTP_201_CREATED, summary="Create KPI")
+@router.post("/", response_model=KPI, status_code=status.HTTP_201_CREATED, summary="Create KPI", dependencies=[Depends(require_city_scope(city_of_body))])
 def create_kpi(
     kpi_in: KPICreate,
     db: Session = Depends(get_db)
@@ -174,7 +197,7 @@ def create_kpi(
     return kpi_service.create_kpi(db, kpi_in)
 
 
-@router.put("/{kpi_id}", response_model=KPI, summary="Update KPI")
+@router.put("/{kpi_id}", response_model=KPI, summary="Update KPI", dependencies=[Depends(require_city_scope(city_of_kpi))])
 def update_kpi(
     kpi_id: int = Path(..., description="KPI ID"),
     kpi_in: KPIUpdate = ...,
@@ -184,7 +207,7 @@ def update_kpi(
     return kpi_service.update_kpi(db, kpi_id, kpi_in)
 
 
-@router.delete("/{kpi_id}", summary="Delete KPI")
+@router.delete("/{kpi_id}", summary="Delete KPI", dependencies=[Depends(require_city_scope(city_of_kpi))])
 def delete_kpi(
     kpi_id: int = Path(..., description="KPI ID"),
     db: Session = Depends(get_db)
@@ -195,15 +218,20 @@ def delete_kpi(
 
 
 # KPI Values endpoints
-@router.get("/{kpi_id}/values", response_model=List[KPIValue], summary="Get KPI values")
-def get_kpi_values(
+@router.get("/{kpi_id}/values", response_model=List[KPIValue], summary="Get KPI values", responses={200: {"content": SERIES_CONTENT}})
+async def get_kpi_values(
     kpi_id: int = Path(..., description="KPI ID"),
     start_date: Optional[datetime] = Query(None, description="Start date for filtering"),
     end_date: Optional[datetime] = Query(None, description="End date for filtering"),
     category_label: Optional[str] = Query(None, description="Filter by category label"),
     limit: int = Query(1000, ge=1, le=10000, description="Maximum number of values"),
     offset: int = Query(0, ge=0, description="Number of values to skip"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch (from X-Next-Cursor)"),
+    include_total: bool = Query(False, description="Count the matching values (X-Total-Count header)"),
+    *,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get KPI values with optional time range and category filtering.
@@ -217,35 +245,93 @@ def get_kpi_values(
     - `end_date`: End of date range (ISO 8601 format: 2024-12-31T23:59:59)
     - `category_label`: Filter by category label (if KPI has category labels)
     - `limit`: Maximum number of values to return (1-10000)
-    - `offset`: Number of values to skip for pagination
+    - `offset`: Number of values to skip for pagination (kept for compatibility)
+    - `cursor`: Opaque cursor of the next page; cannot be combined with `offset`
+    - `include_total`: Also count the values matching the filters (costs a second query)
     
     **Returns:**
-    - List of KPI values with timestamps and values
+    - List of KPI values ordered by timestamp
+    - `X-Next-Cursor` and `Link: <...>; rel="next"` headers when more values follow
+    - With `include_total=true`: `X-Total-Count`, and `X-Total-Count-Estimated: true`
+      when the total is a planner estimate (very large ranges on PostgreSQL)
+    
+    **Columnar formats** (chosen with the `Accept` header):
+    - `application/vnd.kpi-columns+json`: `{"kpi_id", "timestamp": [...], "value": [...],
+      "category_label": [...] | null}` with timestamps in epoch milliseconds (UTC)
+    - `application/vnd.apache.arrow.stream`: Arrow IPC stream (`timestamp[ms, UTC]`,
+      `float64`, `utf8` columns) when the server has `pyarrow` installed
+    
+    Cursor pages seek directly to their first value, so reading deep into a
+    long series costs the same per page as reading its start; `offset` pages
+    get slower the further they go.
     
     **Examples:**
     - `/kpis/123/values` - All values for KPI 123
     - `/kpis/123/values?start_date=2024-01-01&end_date=2024-01-31` - January 2024 values
     - `/kpis/123/values?limit=100&offset=0` - First 100 values
+    - `/kpis/123/values?limit=100&cursor=...` - The 100 values after the previous page
     """
     params = KPIValueQueryParams(
         start_date=start_date,
         end_date=end_date,
         category_label=category_label,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor,
+        include_total=include_total
     )
     
-    values, total = kpi_value_service.get_kpi_values(db, kpi_id, params)
-    return values
+    media_type = preferred_media_type(request, SERIES_MEDIA_TYPES) or JSON
+    columnar = media_type != JSON
+    values, total, next_cursor = await async_kpi_value_service.get_kpi_values(db, kpi_id, params, as_rows=columnar)
+    if columnar:
+        response = Response(SERIES_ENCODERS[media_type](kpi_id, values), media_type=media_type)
+    response.headers["Vary"] = "Accept"
+    set_next_cursor(request, response, next_cursor)
+    set_total_count(response, total)
+    return response if columnar else values
+
+
+@router.get("/{kpi_id}/values/export", summary="Export KPI values", response_class=StreamingResponse)
+async def export_kpi_values(
+    kpi_id: int = Path(..., description="KPI ID"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Export format: csv or ndjson"),
+    start_date: Optional[datetime] = Query(None, description="Start date"),
+    end_date: Optional[datetime] = Query(None, description="End date"),
+    category_label: Optional[str] = Query(None, description="Filter by category label"),
+    *,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Stream every value of a KPI in a time range as CSV or newline-delimited JSON.
+    
+    Rows are read from a server-side cursor in batches and written to the
+    response as they arrive, so memory stays flat however long the series and
+    the download starts before the query has finished. Columns: `timestamp`,
+    `value`, `category_label`.
+    
+    **Examples:**
+    - `/kpis/123/values/export` - Whole history as CSV
+    - `/kpis/123/values/export?format=ndjson&start_date=2024-01-01` - One JSON object per line
+    """
+    chunks = await async_kpi_value_service.export_kpi_values(
+        db, open_stream_session(request), kpi_id, format, start_date, end_date, category_label
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="kpi-{kpi_id}-values.{format}"'}
+    )
 
 
 @router.get("/{kpi_id}/values/latest", response_model=KPIValue, summary="Get latest KPI value")
-def get_latest_kpi_value(
+async def get_latest_kpi_value(
     kpi_id: int = Path(..., description="KPI ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get the most recent value for a KPI."""
-    value = kpi_value_service.get_latest_kpi_value(db, kpi_id)
+    value = await async_kpi_value_service.get_latest_kpi_value(db, kpi_id)
     if not value:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -255,20 +341,122 @@ def get_latest_kpi_value(
 
 
 @router.get("/{kpi_id}/values/aggregated", summary="Get aggregated KPI values")
-def get_kpi_values_aggregated(
+async def get_kpi_values_aggregated(
     kpi_id: int = Path(..., description="KPI ID"),
-    period: str = Query("day", regex="^(day|week|month|year)$", description="Aggregation period"),
+    period: str = Query("day", description="Aggregation period: hour, day, week, month, year or a fixed width (5min, 15min, 6h, ...)"),
     start_date: Optional[datetime] = Query(None, description="Start date"),
     end_date: Optional[datetime] = Query(None, description="End date"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get aggregated KPI values by time period (day, week, month, year)."""
-    return kpi_value_service.get_kpi_values_aggregated(
+    """
+    Get aggregated KPI values (avg, min, max, count) by time period.
+    
+    `period` is a calendar unit (hour, day, week, month, year) or a fixed
+    bucket width aligned to the Unix epoch, e.g. `5min`, `15min`, `6h`, `2d`.
+    
+    **Example:**
+    - `/kpis/123/values/aggregated?period=15min&start_date=2024-01-01&end_date=2024-01-02`
+    """
+    return await async_kpi_value_service.get_kpi_values_aggregated(
         db, kpi_id, period, start_date, end_date
     )
 
 
-@router.post("/{kpi_id}/values", response_model=KPIValue, status_code=status.HTTP_201_CREATED, summary="Add KPI value")
+@router.get("/{kpi_id}/values/downsampled", response_model=KPIValueSeries, summary="Get downsampled KPI values")
+async def get_kpi_values_downsampled(
+    kpi_id: int = Path(..., description="KPI ID"),
+    points: int = Query(800, ge=3, le=10000, description="Maximum number of points to return"),
+    start_date: Optional[datetime] = Query(None, description="Start date"),
+    end_date: Optional[datetime] = Query(None, description="End date"),
+    category_label: Optional[str] = Query(None, description="Filter by category"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get KPI values in a time range reduced to at most `points` points for charting.
+    
+    Uses Largest-Triangle-Three-Buckets, which keeps the first and last values
+    and the peaks and troughs of the series. Ranges with no more than `points`
+    values are returned unchanged; `source_points` tells how many values the
+    range holds.
+    
+    **Example:**
+    - `/kpis/123/values/downsampled?points=500&start_date=2024-01-01&end_date=2024-12-31`
+    """
+    return await async_kpi_value_service.get_kpi_values_downsampled(
+        db, kpi_id, points, start_date, end_date, category_label
+    )
+
+
+@router.post("/values/batch", response_model=KPIValueBatchResult, status_code=status.HTTP_201_CREATED, summary="Add values of many KPIs", dependencies=[Depends(require_city_scope(cities_of_kpi_batch))])
+def batch_create_kpi_values(
+    batch_in: KPIValueBatchCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    Add values of many KPIs in one request and one transaction.
+    
+    Each item addresses a KPI by its database ID (`kpi_id`) or its unique ID
+    (`id_kpi`). All KPIs are looked up with a single query; if any is unknown
+    the whole batch is rejected with 404. Values duplicating a stored value
+    (same KPI, timestamp and category label) are skipped.
+    
+    **Request Body Fields:**
+    - `items`: up to 1,000 items (50,000 values in total), each containing:
+      - `kpi_id` (int) or `id_kpi` (str): the KPI to add values to
+      - `values`: List of values as for `/kpis/{kpi_id}/values/bulk`
+    
+    **Returns:**
+    - `created` / `skipped` (int): totals over the batch
+    - `kpis`: per KPI, its `kpi_id`, `id_kpi` and `created` / `skipped` counts
+    
+    **Errors:**
+    - 404: One or more KPIs not found (listed in the detail)
+    - 422: Invalid data, or an item with both or neither of `kpi_id` and `id_kpi`
+    
+    **Example Request:**
+    ```json
+    {
+      "items": [
+        {"kpi_id": 12, "values": [{"value": 25.5, "timestamp": "2024-01-01T10:00:00"}]},
+        {"id_kpi": "DIF_AIR_QUALITY", "values": [{"value": 41.0, "timestamp": "2024-01-01T10:00:00"}]}
+      ]
+    }
+    ```
+    """
+    return kpi_value_service.batch_create_kpi_values(db, batch_in)
+
+
+@router.post("/values/query", response_model=KPISeriesResponse, summary="Fetch several KPI series")
+@read_only_route
+async def query_kpi_series(
+    query: KPISeriesQuery,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Fetch the series of up to 50 KPIs in one request, e.g. all charts of a
+    dashboard. Each spec is either paged (`limit`, like `/kpis/{kpi_id}/values`;
+    `next_cursor` continues it there) or downsampled (`downsample` = maximum
+    number of points, like `/kpis/{kpi_id}/values/downsampled`). All paged
+    specs run as one query and all downsampled specs as another.
+    
+    **Errors:**
+    - 404: One or more KPIs not found (listed in the detail)
+    - 422: Invalid spec, or the same KPI twice
+    
+    **Example Request:**
+    ```json
+    {
+      "series": [
+        {"kpi_id": 12, "start_date": "2024-01-01T00:00:00", "limit": 500},
+        {"kpi_id": 13, "start_date": "2024-01-01T00:00:00", "downsample": 800}
+      ]
+    }
+    ```
+    """
+    return {"series": await async_kpi_value_service.query_kpi_series(db, query)}
+
+
+@router.post("/{kpi_id}/values", response_model=KPIValue, status_code=status.HTTP_201_CREATED, summary="Add KPI value", dependencies=[Depends(require_city_scope(city_of_kpi))])
 def create_kpi_value(
     kpi_id: int = Path(..., description="KPI ID"),
     value_in: KPIValueCreate = ...,
@@ -278,7 +466,7 @@ def create_kpi_value(
     return kpi_value_service.create_kpi_value(db, kpi_id, value_in)
 
 
-@router.post("/{kpi_id}/values/bulk", status_code=status.HTTP_201_CREATED, summary="Bulk add KPI values")
+@router.post("/{kpi_id}/values/bulk", response_model=KPIValueBulkResult, status_code=status.HTTP_201_CREATED, summary="Bulk add KPI values", dependencies=[Depends(require_city_scope(city_of_kpi))])
 def bulk_create_kpi_values(
     kpi_id: int = Path(..., description="KPI ID"),
     bulk_in: KPIValueBulkCreate = ...,
@@ -288,8 +476,9 @@ def bulk_create_kpi_values(
     Bulk add multiple KPI values for a KPI.
     
     This endpoint allows adding multiple time-series data points for an existing KPI 
-    in a single request. Duplicate entries (same timestamp for the same KPI) will be 
-    skipped to prevent integrity errors.
+    in a single request (up to 50,000 values). Values are written with one set-based
+    insert; entries duplicating a stored value (same timestamp and category label
+    for the same KPI), or another entry of the request, are skipped.
     
     **City IDs (for reference):**
     - 1: Torino | 2: Cascais | 3: Differdange | 4: Sofia
@@ -307,6 +496,7 @@ def bulk_create_kpi_values(
     **Returns:**
     - JSON object with:
       - `created` (int): Number of values successfully added
+      - `skipped` (int): Number of duplicate values skipped
       - `message` (str): Summary message
     
     **Errors:**
@@ -324,19 +514,23 @@ def bulk_create_kpi_values(
     }
     ```
     """
-    count = kpi_value_service.bulk_create_kpi_values(db, kpi_id, bulk_in)
-    return {"created": count, "message": f"Successfully created {count} KPI values"}
+    created, skipped = kpi_value_service.bulk_create_kpi_values(db, kpi_id, bulk_in)
+    return {
+        "created": created,
+        "skipped": skipped,
+        "message": f"Successfully created {created} KPI values, skipped {skipped} duplicates"
+    }
 
 
 # Legacy endpoint for backward compatibility - consolidated single endpoint instead of per-city
 @router.get("/city/{city_code}/kpi/{kpi_db_id}", response_model=List[KPIValue], summary="Get KPI values by city (legacy)")
-def get_kpi_values_by_city_legacy(
+async def get_kpi_values_by_city_legacy(
     city_code: str = Path(..., description="City code"),
     kpi_db_id: int = Path(..., description="KPI database ID"), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Legacy endpoint for getting KPI values by city code and KPI ID."""
     # This replaces all the individual city endpoints like /ioannina/kpi/, /maribor/kpi/, etc.
     params = KPIValueQueryParams(limit=1000, offset=0)
-    values, _ = kpi_value_service.get_kpi_values(db, kpi_db_id, params)
+    values, _, _ = await async_kpi_value_service.get_kpi_values(db, kpi_db_id, params)
     return values
\ No newline at end of file
@@ -5,24 +5,28 @@ Handles WMS layers and GeoJSON data for city maps.
 from typing import List, Union
 from fastapi import APIRouter, Depends, Query, HTTPException, status, Path, Body
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..core.database import get_db
-from ..core.security import KeycloakBearer
+from ..core.database import get_db, get_async_db
+from ..core.unit_of_work import UnitOfWorkRoute
+from ..core.security import KeycloakBearer, require_city_scope
 from ..schemas import WMS, WMSCreate, GeoJson, GeoJsonCreate
-from ..services import map_data_service
+from ..services import map_data_service, async_map_data_service
+from .scopes import cities_of_map_data, city_of_body
 
 router = APIRouter(
     prefix="/mapdata", 
     tags=["Map Data"],
-    dependencies=[Depends(KeycloakBearer())]
+    dependencies=[Depends(KeycloakBearer())],
+    route_class=UnitOfWorkRoute
 )
 
 
 @router.get("/city/{city_id}", response_model=List[Union[WMS, GeoJson]], summary="Get map data for city")
-def get_city_map_data(
+async def get_city_map_data(
     city_id: int = Path(..., description="City ID"),
     active_only: bool = Query(True, description="Return only active layers"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all map layers (WMS and GeoJSON) for a specific city.
@@ -41,14 +45,14 @@ def get_city_map_data(
     **Example:**
     - `/mapdata/city/8?active_only=true` - Get active layers for Ioannina
     """
-    return map_data_service.get_map_data_by_city(db, city_id, active_only)
+    return await async_map_data_service.get_map_data_by_city(db, city_id, active_only)
 
 
 @router.get("/city/code/{city_code}", response_model=List[Union[WMS, GeoJson]], summary="Get map data by city code")
-def get_city_map_data_by_code(
+async def get_city_map_data_by_code(
     city_code: str = Path(..., description="City code (e.g., 'ioannina', 'cascais')"),
     active_only: bool = Query(True, description="Return only active layers"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all map layers for a city by its code.
@@ -59,19 +63,19 @@ def get_city_map_data_by_code(
     **Example:**
     - `/mapdata/city/code/ioannina` - Get map layers for Ioannina
     """
-    return map_data_service.get_map_data_by_city_code(db, city_code, active_only)
+    return await async_map_data_service.get_map_data_by_city_code(db, city_code, active_only)
 
 
 @router.get("/{map_data_id}", response_model=Union[WMS, GeoJson], summary="Get map data by ID")
-def get_map_data(
+async def get_map_data(
     map_data_id: int = Path(..., description="Map data ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific map layer by ID."""
-    return map_data_service.get_map_data(db, map_data_id)
+    return await async_map_data_service.get_map_data(db, map_data_id)
 
 
-@router.post("/wms", response_model=WMS, status_code=status.HTTP_201_CREATED, summary="Create WMS layer")
+@router.post("/wms", response_model=WMS, status_code=status.HTTP_201_CREATED, summary="Create WMS layer", dependencies=[Depends(require_city_scope(city_of_body))])
 def create_wms_layer(
     wms_in: WMSCreate,
     db: Session = Depends(get_db)
@@ -110,7 +114,7 @@ def create_wms_layer(
     return map_data_service.create_wms_layer(db, wms_in)
 
 
-@router.post("/geojson", response_model=GeoJson, status_code=status.HTTP_201_CREATED, summary="Create GeoJSON layer")
+@router.post("/geojson", response_model=GeoJson, status_code=status.HTTP_201_CREATED, summary="Create GeoJSON layer", dependencies=[Depends(require_city_scope(city_of_body))])
 def create_geojson_layer(
     geojson_in: GeoJsonCreate,
     db: Session = Depends(get_db)
@@ -163,7 +167,7 @@ def create_geojson_layer(
     return map_data_service.create_geojson_layer(db, geojson_in)
 
 
-@router.put("/wms/{map_data_id}", response_model=WMS, summary="Update WMS layer")
+@router.put("/wms/{map_data_id}", response_model=WMS, summary="Update WMS layer", dependencies=[Depends(require_city_scope(cities_of_map_data))])
 def update_wms_layer(
     map_data_id: int = Path(..., description="Map data ID"),
     wms_in: WMSCreate = Body(...),
@@ -173,7 +177,7 @@ def update_wms_layer(
     return map_data_service.update_wms_layer(db, map_data_id, wms_in)
 
 
-@router.put("/geojson/{map_data_id}", response_model=GeoJson, summary="Update GeoJSON layer")
+@router.put("/geojson/{map_data_id}", response_model=GeoJson, summary="Update GeoJSON layer", dependencies=[Depends(require_city_scope(cities_of_map_data))])
 def update_geojson_layer(
     map_data_id: int = Path(..., description="Map data ID"),
     geojson_in: GeoJsonCreate = Body(...),
@@ -183,7 +187,7 @@ def update_geojson_layer(
     return map_data_service.update_geojson_layer(db, map_data_id, geojson_in)
 
 
-@router.delete("/{map_data_id}", summary="Delete map data")
+@router.delete("/{map_data_id}", summary="Delete map data", dependencies=[Depends(require_city_scope(cities_of_map_data))])
 def delete_map_data(
     map_data_id: int = Path(..., description="Map data ID"),
     db: Session = Depends(get_db)
@@ -197,7 +201,7 @@ def delete_map_data(
     return map_data_service.delete_map_data(db, map_data_id)
 
 
-@router.post("/geojson/upload-file", response_model=GeoJson, status_code=status.HTTP_201_CREATED, summary="Upload GeoJSON file")
+@router.post("/geojson/upload-file", response_model=GeoJson, status_code=status.HTTP_201_CREATED, summary="Upload GeoJSON file", dependencies=[Depends(require_city_scope(city_of_body))])
 def upload_geojson_file(
     title: str = Body(..., embed=True),
     city_id: int = Body(..., embed=True),
@@ -240,13 +244,13 @@ def upload_geojson_file(
 
 # Legacy endpoint for backward compatibility
 @router.get("/{city_code}/mapdata/", response_model=List[Union[WMS, GeoJson]], summary="Get map data (legacy)")
-def get_map_data_legacy(
+async def get_map_data_legacy(
     city_code: str = Path(..., description="City code"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     **Legacy endpoint** for backward compatibility with old frontend code.
     
     Maps to the new endpoint: `/mapdata/city/code/{city_code}`
     """
-    return map_data_service.get_map_data_by_city_code(db, city_code.lower(), active_only=True)
+    return await async_map_data_service.get_map_data_by_city_code(db, city_code.lower(), active_only=True)
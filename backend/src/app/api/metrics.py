@@ -0,0 +1,52 @@
+"""
+Monitoring API routes exposing in-process counters.
+"""
+from fastapi import APIRouter
+
+from ..core.database import replicas
+from ..core.http import keycloak_http
+from ..core.jwks import jwks_cache
+from ..core.partitions import kpi_value_partitions
+from ..core.query_budget import query_budget
+from ..core.pool_metrics import sync_pool_metrics, async_pool_metrics
+from ..core.response_cache import public_cache
+from ..core.token_cache import token_cache
+
+router = APIRouter(prefix="/metrics", tags=["Monitoring"])
+
+
+@router.get("/", summary="Runtime metrics")
+async def get_metrics():
+    """
+    Get runtime counters for this worker process.
+    
+    **Returns:**
+    - `auth.token_cache`: verified-token cache size, hits, misses and hit ratio
+    - `auth.jwks`: number of cached signing keys, key age and refresh counts
+    - `auth.keycloak_circuit`: circuit breaker state, failure rate, in-flight and rejected calls
+    - `public.response_cache`: cached public responses, hits, misses and 304s
+    - `database.pools`: per-engine checked-out connections, overflow in use,
+      checkout wait-time histogram (seconds) and checkout timeouts
+    - `database.replicas`: read replica health, reads served and primary fallbacks
+    - `database.query_budget`: statement timeouts and queries cancelled on client disconnect, per route
+    - `database.partitions`: kpi_values partition maintenance (partitions created, last check and error)
+    """
+    return {
+        "auth": {
+            "token_cache": token_cache.stats(),
+            "jwks": jwks_cache.stats(),
+            "keycloak_circuit": keycloak_http.breaker.stats(),
+        },
+        "public": {
+            "response_cache": public_cache.stats(),
+        },
+        "database": {
+            "pools": {
+                "sync": sync_pool_metrics.stats(),
+                "async": async_pool_metrics.stats(),
+            },
+            "replicas": replicas.stats(),
+            "query_budget": query_budget.stats(),
+            "partitions": kpi_value_partitions.stats(),
+        }
+    }
@@ -0,0 +1,168 @@
+"""
+Anonymous, read-only API for public dashboards.
+
+No Keycloak dependency: routes serve only data reachable from dashboards with
+`is_public` set. GET responses are cached in-process and sent with
+Cache-Control/ETag headers so browsers and proxies can cache them as well.
+"""
+from typing import List, Optional, Union
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query, HTTPException, status, Path, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.database import get_async_db
+from ..core.negotiation import preferred_media_type
+from ..core.pagination import set_next_cursor, set_total_count
+from ..core.response_cache import PublicCacheRoute
+from ..schemas import Dashboard, KPI, KPIValue, KPIValueQueryParams, KPIValueSeries, AnyVisualization, WMS, GeoJson
+from ..services import async_public_data_service
+from ..services.columnar import ENCODERS as SERIES_ENCODERS, JSON, SERIES_CONTENT, SERIES_MEDIA_TYPES
+
+router = APIRouter(
+    prefix="/public",
+    tags=["Public"],
+    route_class=PublicCacheRoute
+)
+
+
+@router.get("/cities/{city_code}/dashboards", response_model=List[Dashboard], summary="List public dashboards")
+async def list_public_dashboards(
+    city_code: str = Path(..., description="City code (e.g., 'ioannina', 'cascais')"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    List the public dashboards of a city.
+
+    **Example:**
+    - `/public/cities/ioannina/dashboards`
+    """
+    return await async_public_data_service.list_dashboards_by_city_code(db, city_code)
+
+
+@router.get("/cities/{city_code}/mapdata", response_model=List[Union[WMS, GeoJson]], summary="Get public map layers")
+async def get_public_map_data(
+    city_code: str = Path(..., description="City code (e.g., 'ioannina', 'cascais')"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the active map layers (WMS and GeoJSON) of a city with a public dashboard.
+
+    **Example:**
+    - `/public/cities/ioannina/mapdata`
+    """
+    return await async_public_data_service.get_map_data_by_city_code(db, city_code)
+
+
+@router.get("/dashboards/{dashboard_id}", response_model=Dashboard, summary="Get public dashboard")
+async def get_public_dashboard(
+    dashboard_id: int = Path(..., description="Dashboard ID"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a public dashboard with its sections."""
+    return await async_public_data_service.get_dashboard(db, dashboard_id)
+
+
+@router.get("/dashboards/{dashboard_id}/visualizations", response_model=List[AnyVisualization], summary="Get public dashboard visualizations")
+async def get_public_dashboard_visualizations(
+    dashboard_id: int = Path(..., description="Dashboard ID"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all visualizations of a public dashboard."""
+    return await async_public_data_service.list_visualizations(db, dashboard_id)
+
+
+@router.get("/kpis/{kpi_id}", response_model=KPI, summary="Get public KPI")
+async def get_public_kpi(
+    kpi_id: int = Path(..., description="KPI ID"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a KPI shown on a public dashboard."""
+    return await async_public_data_service.get_kpi(db, kpi_id)
+
+
+@router.get("/kpis/{kpi_id}/values", response_model=List[KPIValue], summary="Get public KPI values", responses={200: {"content": SERIES_CONTENT}})
+async def get_public_kpi_values(
+    kpi_id: int = Path(..., description="KPI ID"),
+    start_date: Optional[datetime] = Query(None, description="Start date for filtering"),
+    end_date: Optional[datetime] = Query(None, description="End date for filtering"),
+    category_label: Optional[str] = Query(None, description="Filter by category label"),
+    limit: int = Query(1000, ge=1, le=10000, description="Maximum number of values"),
+    offset: int = Query(0, ge=0, description="Number of values to skip"),
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch (from X-Next-Cursor)"),
+    include_total: bool = Query(False, description="Count the matching values (X-Total-Count header)"),
+    *,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the values of a KPI shown on a public dashboard.
+
+    Same filters, cursor pagination and columnar formats as `/kpis/{kpi_id}/values`.
+    """
+    params = KPIValueQueryParams(
+        start_date=start_date,
+        end_date=end_date,
+        category_label=category_label,
+        limit=limit,
+        offset=offset,
+        cursor=cursor,
+        include_total=include_total
+    )
+    media_type = preferred_media_type(request, SERIES_MEDIA_TYPES) or JSON
+    columnar = media_type != JSON
+    values, total, next_cursor = await async_public_data_service.get_kpi_values(db, kpi_id, params, as_rows=columnar)
+    if columnar:
+        response = Response(SERIES_ENCODERS[media_type](kpi_id, values), media_type=media_type)
+    response.headers["Vary"] = "Accept"
+    set_next_cursor(request, response, next_cursor)
+    set_total_count(response, total)
+    return response if columnar else values
+
+
+@router.get("/kpis/{kpi_id}/values/latest", response_model=KPIValue, summary="Get latest public KPI value")
+async def get_public_latest_kpi_value(
+    kpi_id: int = Path(..., description="KPI ID"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the most recent value of a KPI shown on a public dashboard."""
+    value = await async_public_data_service.get_latest_kpi_value(db, kpi_id)
+    if not value:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No values found for this KPI"
+        )
+    return value
+
+
+@router.get("/kpis/{kpi_id}/values/downsampled", response_model=KPIValueSeries, summary="Get downsampled public KPI values")
+async def get_public_kpi_values_downsampled(
+    kpi_id: int = Path(..., description="KPI ID"),
+    points: int = Query(800, ge=3, le=10000, description="Maximum number of points to return"),
+    start_date: Optional[datetime] = Query(None, description="Start date"),
+    end_date: Optional[datetime] = Query(None, description="End date"),
+    category_label: Optional[str] = Query(None, description="Filter by category"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get values of a KPI shown on a public dashboard, downsampled for charting.
+
+    Same parameters as `/kpis/{kpi_id}/values/downsampled`.
+    """
+    return await async_public_data_service.get_kpi_values_downsampled(
+        db, kpi_id, points, start_date, end_date, category_label
+    )
+
+
+@router.get("/kpis/{kpi_id}/values/aggregated", summary="Get aggregated public KPI values")
+async def get_public_kpi_values_aggregated(
+    kpi_id: int = Path(..., description="KPI ID"),
+    period: str = Query("day", description="Aggregation period: hour, day, week, month, year or a fixed width (5min, 15min, 6h, ...)"),
+    start_date: Optional[datetime] = Query(None, description="Start date"),
+    end_date: Optional[datetime] = Query(None, description="End date"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get aggregated values of a KPI shown on a public dashboard."""
+    return await async_public_data_service.get_kpi_values_aggregated(
+        db, kpi_id, period, start_date, end_date
+    )
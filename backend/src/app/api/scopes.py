@@ -0,0 +1,109 @@
+"""
+City resolvers for city-scoped write protection.
+
+Each resolver is a dependency returning the codes of the cities a request
+touches; combine it with `require_city_scope`:
+
+    @router.put("/{kpi_id}", dependencies=[Depends(require_city_scope(city_of_kpi))])
+"""
+from typing import List, Optional
+from fastapi import Depends, Path, Query, Request
+from sqlalchemy.orm import Session
+
+from ..core.database import get_db
+from ..models import City, Dashboard, DashboardSection, KPI, MapData, Visualization
+from ..repositories import city_repo
+
+
+async def _body_field(request: Request, field: str) -> Optional[object]:
+    """Read a top-level field of the JSON body (the body itself is validated by the route)."""
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body.get(field) if isinstance(body, dict) else None
+
+
+def city_of_path(
+    city_id: int = Path(..., description="City ID"),
+    db: Session = Depends(get_db)
+) -> List[str]:
+    """City addressed by a `city_id` path parameter."""
+    return city_repo.get_codes_owning(db, model=City, ids=[city_id])
+
+
+async def city_of_body(request: Request, db: Session = Depends(get_db)) -> List[str]:
+    """City referenced by the `city_id` field of the request body."""
+    city_id = await _body_field(request, "city_id")
+    if not isinstance(city_id, int):
+        return []
+    return city_repo.get_codes_owning(db, model=City, ids=[city_id])
+
+
+async def new_city(request: Request) -> List[str]:
+    """City about to be created (the `code` field of the request body)."""
+    code = await _body_field(request, "code")
+    return [code] if isinstance(code, str) else []
+
+
+def city_of_kpi(
+    kpi_id: int = Path(..., description="KPI ID"),
+    db: Session = Depends(get_db)
+) -> List[str]:
+    """City owning the KPI in the path."""
+    return city_repo.get_codes_owning(db, model=KPI, ids=[kpi_id])
+
+
+async def cities_of_kpi_batch(request: Request, db: Session = Depends(get_db)) -> List[str]:
+    """Cities owning the KPIs referenced by the `items` of a multi-KPI value batch."""
+    items = await _body_field(request, "items")
+    if not isinstance(items, list):
+        return []
+    items = [item for item in items if isinstance(item, dict)]
+    ids = [item["kpi_id"] for item in items if isinstance(item.get("kpi_id"), int)]
+    id_kpis = [item["id_kpi"] for item in items if isinstance(item.get("id_kpi"), str)]
+    return city_repo.get_codes_owning_kpis(db, ids=ids, id_kpis=id_kpis)
+
+
+def city_of_dashboard(
+    dashboard_id: int = Path(..., description="Dashboard ID"),
+    db: Session = Depends(get_db)
+) -> List[str]:
+    """City owning the dashboard in the path."""
+    return city_repo.get_codes_owning(db, model=Dashboard, ids=[dashboard_id])
+
+
+def city_of_section(
+    section_id: int = Path(..., description="Section ID"),
+    db: Session = Depends(get_db)
+) -> List[str]:
+    """City owning the dashboard section in the path."""
+    return city_repo.get_codes_owning(db, model=DashboardSection, ids=[section_id])
+
+
+def city_of_visualization(
+    vis_id: int = Path(..., description="Visualization ID"),
+    db: Session = Depends(get_db)
+) -> List[str]:
+    """City owning the visualization in the path."""
+    return city_repo.get_codes_owning(db, model=Visualization, ids=[vis_id])
+
+
+def cities_of_visualizations(
+    ids: List[int] = Query(..., description="List of visualization IDs"),
+    db: Session = Depends(get_db)
+) -> List[str]:
+    """Cities owning the visualizations listed in the `ids` query parameter."""
+    return city_repo.get_codes_owning(db, model=Visualization, ids=ids)
+
+
+async def cities_of_map_data(
+    request: Request,
+    map_data_id: int = Path(..., description="Map data ID"),
+    db: Session = Depends(get_db)
+) -> List[str]:
+    """City owning the map layer in the path, plus the city it is moved to (if any)."""
+    codes = city_repo.get_codes_owning(db, model=MapData, ids=[map_data_id])
+    if request.method in ("PUT", "PATCH"):
+        codes += await city_of_body(request, db)
+    return codes
@@ -0,0 +1,74 @@
+"""
+Authorization context derived from verified Keycloak token claims.
+"""
+from typing import Optional, Dict, Any, FrozenSet, Iterable, NamedTuple
+
+from .config import settings
+
+
+def _as_strings(value: Any) -> Iterable[str]:
+    """Accept a claim given as a list or as a comma/space separated string."""
+    if isinstance(value, str):
+        return value.replace(",", " ").split()
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [str(item) for item in value]
+    return ()
+
+
+class AuthContext(NamedTuple):
+    """
+    Immutable view of who the caller is and what they may touch.
+
+    Built once per verified token (and cached with it), attached to
+    ``request.state.auth`` so authorization checks are plain set lookups.
+    """
+    subject: Optional[str]
+    username: Optional[str]
+    realm_roles: FrozenSet[str]
+    client_roles: FrozenSet[str]
+    roles: FrozenSet[str]
+    city_scopes: FrozenSet[str]
+    all_cities: bool
+    claims: Dict[str, Any]
+
+    @classmethod
+    def from_claims(cls, claims: Dict[str, Any]) -> "AuthContext":
+        """
+        Build the context from a verified payload.
+
+        City scopes (lower-case city codes) come from the ``KEYCLOAK_CITY_CLAIM``
+        claim and from roles prefixed with ``KEYCLOAK_CITY_ROLE_PREFIX``
+        (e.g. ``city:ioannina``). ``KEYCLOAK_ADMIN_ROLES`` grant every city.
+        """
+        realm_roles = frozenset(_as_strings(claims.get("realm_access", {}).get("roles")))
+        client_access = claims.get("resource_access", {}).get(settings.KEYCLOAK_CLIENT_ID, {})
+        client_roles = frozenset(_as_strings(client_access.get("roles")))
+        roles = realm_roles | client_roles
+
+        prefix = settings.KEYCLOAK_CITY_ROLE_PREFIX
+        city_scopes = {code.lower() for code in _as_strings(claims.get(settings.KEYCLOAK_CITY_CLAIM))}
+        if prefix:
+            city_scopes.update(role[len(prefix):].lower() for role in roles if role.startswith(prefix))
+
+        return cls(
+            subject=claims.get("sub"),
+            username=claims.get("preferred_username"),
+            realm_roles=realm_roles,
+            client_roles=client_roles,
+            roles=roles,
+            city_scopes=frozenset(city_scopes),
+            all_cities=not roles.isdisjoint(settings.KEYCLOAK_ADMIN_ROLES),
+            claims=claims
+        )
+
+    def has_role(self, role: str) -> bool:
+        """Whether the caller has ``role`` (realm or client role)."""
+        return role in self.roles
+
+    def has_any_role(self, roles: FrozenSet[str]) -> bool:
+        """Whether the caller has at least one of ``roles``."""
+        return not self.roles.isdisjoint(roles)
+
+    def can_access_city(self, city_code: str) -> bool:
+        """Whether the caller may modify data of the city with ``city_code``."""
+        return self.all_cities or city_code.lower() in self.city_scopes
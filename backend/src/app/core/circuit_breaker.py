@@ -0,0 +1,168 @@
+"""
+Circuit breaker with a bulkhead for calls to external services.
+"""
+import logging
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Deque, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected without being attempted."""
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker with a bounded number of in-flight calls.
+
+    - closed: calls go through; outcomes are kept for the last ``window`` seconds.
+      Once at least ``minimum_calls`` were made and the failure rate reaches
+      ``failure_rate_threshold`` the circuit opens.
+    - open: calls are rejected immediately with ``CircuitOpenError``. After
+      ``reset_timeout`` seconds the circuit becomes half-open.
+    - half_open: up to ``half_open_max_calls`` probe calls are let through; a
+      successful probe closes the circuit, a failed one opens it again.
+
+    Independently of the state, a call is rejected when ``max_in_flight`` calls
+    are already running, so a slow dependency cannot tie up every worker.
+    The breaker is used from the event loop only and needs no locking.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float,
+        minimum_calls: int,
+        window: float,
+        reset_timeout: float,
+        half_open_max_calls: int,
+        max_in_flight: int
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(half_open_max_calls, 1)
+        self.max_in_flight = max_in_flight
+
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._in_flight = 0
+        self._probes = 0
+
+        self.times_opened = 0
+        self.rejected_open = 0
+        self.rejected_in_flight = 0
+
+    @property
+    def state(self) -> str:
+        """Current state; an open circuit turns half-open once ``reset_timeout`` has passed."""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+            logger.info(f"Circuit '{self.name}' half-open, probing")
+        return self._state
+
+    @property
+    def failure_rate(self) -> Optional[float]:
+        """Failure rate over the current window, None without calls."""
+        self._prune()
+        if not self._outcomes:
+            return None
+        return self._failures / len(self._outcomes)
+
+    def before_call(self) -> None:
+        """Reserve a slot for a call or raise ``CircuitOpenError``."""
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._probes >= self.half_open_max_calls):
+            self.rejected_open += 1
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+        if self._in_flight >= self.max_in_flight:
+            self.rejected_in_flight += 1
+            raise CircuitOpenError(f"Too many concurrent calls to '{self.name}'")
+
+        if state == self.HALF_OPEN:
+            self._probes += 1
+        self._in_flight += 1
+
+    def after_call(self, success: Optional[bool]) -> None:
+        """
+        Release the slot taken by ``before_call`` and record the outcome.
+        ``success=None`` (e.g. a cancelled call) releases without recording;
+        a half-open probe ending that way frees its slot for another probe.
+        """
+        self._in_flight -= 1
+        if success is None:
+            if self._state == self.HALF_OPEN:
+                self._probes = max(self._probes - 1, 0)
+            return
+
+        if self._state == self.HALF_OPEN:
+            if success:
+                self._close()
+            else:
+                self._open()
+            return
+
+        if self._state == self.OPEN:
+            # Outcome of a call started before the circuit opened
+            return
+
+        now = time.monotonic()
+        self._outcomes.append((now, success))
+        if not success:
+            self._failures += 1
+        self._prune(now)
+
+        if (
+            len(self._outcomes) >= self.minimum_calls
+            and self._failures / len(self._outcomes) >= self.failure_rate_threshold
+        ):
+            self._open()
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state and counters for monitoring."""
+        failure_rate = self.failure_rate
+        return {
+            "state": self.state,
+            "failure_rate": round(failure_rate, 4) if failure_rate is not None else None,
+            "window_calls": len(self._outcomes),
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "times_opened": self.times_opened,
+            "rejected_open": self.rejected_open,
+            "rejected_in_flight": self.rejected_in_flight,
+        }
+
+    def _prune(self, now: Optional[float] = None) -> None:
+        cutoff = (now if now is not None else time.monotonic()) - self.window
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            _, success = self._outcomes.popleft()
+            if not success:
+                self._failures -= 1
+
+    def _reset_window(self) -> None:
+        self._outcomes.clear()
+        self._failures = 0
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._reset_window()
+        self.times_opened += 1
+        logger.warning(f"Circuit '{self.name}' opened for {self.reset_timeout}s")
+
+    def _close(self) -> None:
+        self._state = self.CLOSED
+        self._reset_window()
+        logger.info(f"Circuit '{self.name}' closed")
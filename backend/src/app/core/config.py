@@ -21,12 +21,82 @@ class Settings(BaseSettings):
     DB_NAME: str = "root"
     DB_USER: str = "root"
     DB_PASSWORD: str = "password"
+
+    # Connection pools (per engine and worker process; timeout/recycle in seconds)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 300
+    DB_POOL_PRE_PING: bool = True
+
+    # Read replicas ("host" or "host:port", same credentials and database as
+    # the primary); selection is "round_robin" or "least_busy"
+    DB_REPLICA_HOSTS: list = []
+    DB_REPLICA_SELECTION: str = "round_robin"
+    DB_REPLICA_HEALTH_INTERVAL: float = 10.0
+
+    # Postgres statement_timeout (ms, 0 disables): default and per route path
+    DB_STATEMENT_TIMEOUT: int = 30000
+    DB_ROUTE_STATEMENT_TIMEOUTS: dict = {
+        "/kpis/{kpi_id}/values": 10000,
+        "/kpis/{kpi_id}/values/aggregated": 15000,
+        "/public/kpis/{kpi_id}/values": 5000,
+        "/public/kpis/{kpi_id}/values/aggregated": 10000,
+    }
+
+    # Totals of KPI value lists (include_total=true): Postgres planner estimates
+    # at or above this many rows are returned instead of an exact count (0 disables)
+    DB_COUNT_ESTIMATE_THRESHOLD: int = 100000
+
+    # Monthly range partitioning of kpi_values on timestamp (PostgreSQL): partitions
+    # of the current and next DB_PARTITION_MONTHS_AHEAD months are created at startup
+    # and every DB_PARTITION_CHECK_INTERVAL seconds; convert an existing table with
+    # partition_kpi_values.py
+    DB_PARTITION_KPI_VALUES: bool = False
+    DB_PARTITION_MONTHS_AHEAD: int = 3
+    DB_PARTITION_CHECK_INTERVAL: float = 21600.0
     
     # Keycloak
     KEYCLOAK_SERVER_URL: str = "https://auth.climaplatform.eu"
     KEYCLOAK_REALM: str = "climaborough"
     KEYCLOAK_CLIENT_ID: str = "climaborough-platform"
-    
+    # Accepted token audiences / authorized parties (azp); empty accepts any
+    KEYCLOAK_AUDIENCES: list = []
+    KEYCLOAK_AUTHORIZED_PARTIES: list = []
+    # City scopes: token claim with city codes, role prefix (e.g. "city:ioannina")
+    # and roles granting every city; write routes check them when enforced
+    KEYCLOAK_CITY_CLAIM: str = "cities"
+    KEYCLOAK_CITY_ROLE_PREFIX: str = "city:"
+    KEYCLOAK_ADMIN_ROLES: list = ["admin"]
+    ENFORCE_CITY_SCOPES: bool = False
+
+    # Keycloak HTTP client
+    KEYCLOAK_HTTP_TIMEOUT: float = 10.0
+    KEYCLOAK_HTTP_MAX_CONNECTIONS: int = 20
+    KEYCLOAK_HTTP_MAX_KEEPALIVE: int = 10
+    KEYCLOAK_HTTP_MAX_CONCURRENCY: int = 20
+
+    # Keycloak circuit breaker (rate 0-1, window and reset timeout in seconds)
+    KEYCLOAK_CB_FAILURE_RATE: float = 0.5
+    KEYCLOAK_CB_MIN_CALLS: int = 5
+    KEYCLOAK_CB_WINDOW: float = 30.0
+    KEYCLOAK_CB_RESET_TIMEOUT: float = 15.0
+    KEYCLOAK_CB_HALF_OPEN_CALLS: int = 1
+
+    # Keycloak JWKS cache (seconds)
+    JWKS_CACHE_TTL: int = 300
+    JWKS_STALE_TTL: int = 3600
+    JWKS_MIN_REFRESH_INTERVAL: int = 30
+    JWKS_FETCH_TIMEOUT: float = 10.0
+
+    # Verified token cache (max entries, 0 disables)
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    # Public (anonymous) API caching: in-process TTL and HTTP max-age (seconds)
+    PUBLIC_CACHE_TTL: int = 60
+    PUBLIC_CACHE_MAX_SIZE: int = 2048
+    PUBLIC_CACHE_MAX_AGE: int = 300
+
     # CORS
     ALLOWED_ORIGINS: list = [
         "http://localhost",
@@ -42,11 +112,42 @@ class Settings(BaseSettings):
             f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
         )
     
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        """Construct database URL for the async (asyncpg) engine."""
+        return (
+            f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}"
+            f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+        )
+    
+    def _replica_urls(self, scheme: str) -> list:
+        urls = []
+        for host in self.DB_REPLICA_HOSTS:
+            if ":" not in host:
+                host = f"{host}:{self.DB_PORT}"
+            urls.append(f"{scheme}://{self.DB_USER}:{self.DB_PASSWORD}@{host}/{self.DB_NAME}")
+        return urls
+    
+    @property
+    def DATABASE_REPLICA_URLS(self) -> list:
+        """Construct database URLs of the read replicas."""
+        return self._replica_urls("postgresql")
+    
+    @property
+    def ASYNC_DATABASE_REPLICA_URLS(self) -> list:
+        """Construct database URLs of the read replicas for the async engine."""
+        return self._replica_urls("postgresql+asyncpg")
+    
     @property
     def KEYCLOAK_AUTH_URL(self) -> str:
         """Construct Keycloak auth URL."""
         return f"{self.KEYCLOAK_SERVER_URL}/realms/{self.KEYCLOAK_REALM}"
-    
+
+    @property
+    def KEYCLOAK_CERTS_URL(self) -> str:
+        """Construct Keycloak JWKS (certs) URL."""
+        return f"{self.KEYCLOAK_AUTH_URL}/protocol/openid-connect/certs"
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,45 +1,234 @@
 """
 Database configuration and session management.
 """
-from sqlalchemy import create_engine
+import functools
+import inspect
+from typing import AsyncIterator, Callable, Optional, Union
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.sql import Select
 
 from .config import settings
+from .pool_metrics import sync_pool_metrics, async_pool_metrics
+from .replicas import ReplicaSet
+from .query_budget import STATEMENT_TIMEOUT, ROUTE_PATH, route_path, statement_timeout_for
+from .unit_of_work import LazySession, LazyAsyncSession, UNCOMMITTED_WRITES
+
+POOL_OPTIONS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
 
 # Create engine with connection pooling and optimizations
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_size=10,
-    max_overflow=20,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=settings.DEBUG
+    poolclass=sync_pool_metrics.pool_class(QueuePool),
+    echo=settings.DEBUG,
+    **POOL_OPTIONS
 )
+sync_pool_metrics.attach(engine)
+
+# Read replicas (empty unless DB_REPLICA_HOSTS is set)
+replicas = ReplicaSet.from_urls(
+    settings.DATABASE_REPLICA_URLS,
+    settings.ASYNC_DATABASE_REPLICA_URLS,
+    strategy=settings.DB_REPLICA_SELECTION,
+    health_interval=settings.DB_REPLICA_HEALTH_INTERVAL,
+    echo=settings.DEBUG,
+    **POOL_OPTIONS
+)
+
+# Session.info flags used for replica routing
+READ_FROM_REPLICA = "read_from_replica"
+PINNED_TO_PRIMARY = "pinned_to_primary"
+
+# Endpoint attribute set by read_only_route
+READ_ONLY_ROUTE = "read_only_route"
+
+
+class RoutingSession(Session):
+    """
+    Session that sends SELECTs issued by ``replica_read`` repository methods to
+    a read replica. Everything else, and every statement once the session has
+    written (read-your-writes), goes to the primary it is bound to.
+    """
+
+    use_async = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.info.get(READ_FROM_REPLICA)
+            and not self.info.get(PINNED_TO_PRIMARY)
+            and not self._flushing
+            and isinstance(clause, Select)
+        ):
+            replica = replicas.choose(self.use_async)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+class AsyncRoutingSession(RoutingSession):
+    """RoutingSession behind an AsyncSession (binds to the replicas' async engines)."""
+
+    use_async = True
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _pin_after_write(session: Session, flush_context) -> None:
+    session.info[PINNED_TO_PRIMARY] = True
+    session.info[UNCOMMITTED_WRITES] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def _clear_uncommitted_writes(session: Session, *args) -> None:
+    session.info.pop(UNCOMMITTED_WRITES, None)
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def _apply_statement_timeout(session: Session, transaction, connection) -> None:
+    timeout = session.info.get(STATEMENT_TIMEOUT)
+    if timeout and connection.dialect.name == "postgresql":
+        # Scoped to this transaction, so pooled connections keep the server default
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+
+def pin_to_primary(db: Union[Session, AsyncSession]) -> None:
+    """Send every further statement of this session to the primary."""
+    db.info[PINNED_TO_PRIMARY] = True
+
+
+def replica_read(method: Callable) -> Callable:
+    """
+    Mark a repository read method (``method(self, db, ...)``) as safe to serve
+    from a read replica.
+    """
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, db, *args, **kwargs):
+            previous = db.info.get(READ_FROM_REPLICA, False)
+            db.info[READ_FROM_REPLICA] = True
+            try:
+                return await method(self, db, *args, **kwargs)
+            finally:
+                db.info[READ_FROM_REPLICA] = previous
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, db, *args, **kwargs):
+        previous = db.info.get(READ_FROM_REPLICA, False)
+        db.info[READ_FROM_REPLICA] = True
+        try:
+            return method(self, db, *args, **kwargs)
+        finally:
+            db.info[READ_FROM_REPLICA] = previous
+    return wrapper
+
+
+def read_only_route(endpoint: Callable) -> Callable:
+    """
+    Mark a route endpoint that only reads although its method is not GET
+    (e.g. a query sent as a POST body), so its sessions may use read replicas.
+    Apply it below the router decorator.
+    """
+    setattr(endpoint, READ_ONLY_ROUTE, True)
+    return endpoint
+
+
+def _is_read_only(request: Request) -> bool:
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        return True
+    route = request.scope.get("route")
+    return getattr(getattr(route, "endpoint", None), READ_ONLY_ROUTE, False)
+
+
+def _session_info(request: Optional[Request]) -> dict:
+    path = route_path(request)
+    info = {ROUTE_PATH: path, STATEMENT_TIMEOUT: statement_timeout_for(path)}
+    # Sessions of write requests never read from a replica
+    if request is not None and not _is_read_only(request):
+        info[PINNED_TO_PRIMARY] = True
+    return info
+
 
 # Session factory
 SessionLocal = sessionmaker(
     autocommit=False, 
     autoflush=False, 
-    bind=engine
+    bind=engine,
+    class_=RoutingSession
+)
+
+# Async engine (asyncpg) for routes running on the event loop
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    poolclass=async_pool_metrics.pool_class(AsyncAdaptedQueuePool),
+    echo=settings.DEBUG,
+    **POOL_OPTIONS
+)
+async_pool_metrics.attach(async_engine.sync_engine)
+
+# Async session factory; objects stay usable after commit since async
+# sessions cannot lazy-load expired attributes during serialization
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    sync_session_class=AsyncRoutingSession,
+    autoflush=False,
+    expire_on_commit=False
 )
 
 # Base class for all database models
 Base = declarative_base()
 
 
-def get_db() -> Session:
+def get_db(request: Request = None) -> Session:
     """
     Dependency to get database session.
     Use this in FastAPI route dependencies.
+    
+    The session is created on first use and, on routers using UnitOfWorkRoute,
+    releases its connection when the endpoint returns.
+    Statements run under the route's statement timeout (DB_ROUTE_STATEMENT_TIMEOUTS).
+    Sessions of write requests (POST, PUT, ...) never read from a replica.
     """
-    db = SessionLocal()
+    db = LazySession(SessionLocal, info=_session_info(request))
     try:
         yield db
     finally:
         db.close()
 
 
+async def get_async_db(request: Request = None) -> AsyncIterator[AsyncSession]:
+    """
+    Dependency to get an async database session.
+    Use this in `async def` route handlers so queries do not block a threadpool thread.
+    Created on first use, like `get_db`.
+    """
+    db = LazyAsyncSession(AsyncSessionLocal, info=_session_info(request))
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def open_stream_session(request: Optional[Request] = None) -> AsyncSession:
+    """
+    Async session for a response body streamed after the endpoint has returned
+    (and its `get_async_db` session has been released). Every read may go to a
+    replica. The caller closes it, typically with `async with`.
+    """
+    return AsyncSessionLocal(info={**_session_info(request), READ_FROM_REPLICA: True})
+
+
 def init_db() -> None:
     """Initialize database tables."""
     Base.metadata.create_all(bind=engine)
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+Shared async HTTP client for calls to the identity provider (Keycloak).
+"""
+import asyncio
+from typing import Optional, Any
+
+import httpx
+
+from .circuit_breaker import CircuitBreaker
+from .config import settings
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class KeycloakHTTPClient:
+    """
+    Pooled async HTTP client.
+
+    One ``httpx.AsyncClient`` (keep-alive, HTTP/2 when ``h2`` is installed) is
+    shared by every request of the worker. Each call gets a timeout and goes
+    through a circuit breaker: errors and 5xx responses count as failures
+    (cancelled calls count as neither), and calls are rejected with ``CircuitOpenError`` while the
+    circuit is open or too many calls are in flight.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        max_connections: int,
+        max_keepalive_connections: int,
+        breaker: CircuitBreaker
+    ):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.breaker = breaker
+
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The underlying client, created on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                ),
+            )
+        return self._client
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        timeout: Optional[float] = None,
+        **kwargs: Any
+    ) -> httpx.Response:
+        """Send a request through the circuit breaker (raises ``CircuitOpenError`` if rejected)."""
+        self.breaker.before_call()
+        success = None
+        try:
+            response = await self.client.request(
+                method, url, timeout=timeout if timeout is not None else self.timeout, **kwargs
+            )
+            success = response.status_code < 500
+            return response
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. client disconnect): no outcome to record
+            raise
+        except BaseException:
+            success = False
+            raise
+        finally:
+            self.breaker.after_call(success)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a GET request."""
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a POST request."""
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        """Close pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global client shared by the JWKS cache and the authentication service
+keycloak_http = KeycloakHTTPClient(
+    timeout=settings.KEYCLOAK_HTTP_TIMEOUT,
+    max_connections=settings.KEYCLOAK_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.KEYCLOAK_HTTP_MAX_KEEPALIVE,
+    breaker=CircuitBreaker(
+        name="keycloak",
+        failure_rate_threshold=settings.KEYCLOAK_CB_FAILURE_RATE,
+        minimum_calls=settings.KEYCLOAK_CB_MIN_CALLS,
+        window=settings.KEYCLOAK_CB_WINDOW,
+        reset_timeout=settings.KEYCLOAK_CB_RESET_TIMEOUT,
+        half_open_max_calls=settings.KEYCLOAK_CB_HALF_OPEN_CALLS,
+        max_in_flight=settings.KEYCLOAK_HTTP_MAX_CONCURRENCY
+    )
+)
@@ -0,0 +1,199 @@
+"""
+Process-wide cache for the Keycloak JSON Web Key Set (JWKS).
+"""
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, Any, List
+
+from fastapi import HTTPException, status
+from jose import jwk
+from jose.backends.base import Key
+
+from .config import settings
+from .http import keycloak_http
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSCache:
+    """
+    TTL cache for the Keycloak signing keys.
+
+    Each JWK is parsed into a public key object once per refresh, so token
+    verification never rebuilds the key from its modulus and exponent.
+    Keys are served from memory. Once they are older than ``ttl`` they are still
+    served (for up to ``stale_ttl``) while a refresh runs in the background.
+    A token carrying an unknown ``kid`` triggers an early refresh, rate limited
+    by ``min_refresh_interval``. Concurrent refreshes share a single request.
+    While the Keycloak circuit is open, refreshes fail fast and the cached keys
+    keep being served.
+    """
+
+    def __init__(
+        self,
+        certs_url: str,
+        ttl: float,
+        stale_ttl: float,
+        min_refresh_interval: float,
+        timeout: float
+    ):
+        self.certs_url = certs_url
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+
+        self._keys: Dict[str, Key] = {}
+        self._fetched_at: float = 0.0
+        self._last_attempt: float = float("-inf")
+        self._inflight: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    @property
+    def age(self) -> float:
+        """Seconds since the keys were last fetched successfully."""
+        if not self._fetched_at:
+            return float("inf")
+        return time.monotonic() - self._fetched_at
+
+    async def get_key(self, kid: Optional[str]) -> Optional[Key]:
+        """
+        Return the public key matching ``kid``, or None if Keycloak does not publish it.
+        Raises 503 if no usable key set is available.
+        """
+        if not self._keys or self.age > self.stale_ttl:
+            # Nothing servable in memory: this request has to wait for Keycloak
+            if not await self.refresh() and (not self._keys or self.age > self.stale_ttl):
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Unable to verify token: Authentication service unavailable"
+                )
+        elif self.age > self.ttl:
+            # Stale-while-revalidate
+            self._refresh_in_background()
+
+        key = self._keys.get(kid)
+        if key is None and (self._refresh_running() or self._may_refresh_early()):
+            # Unknown kid, most likely a key rotation: refresh once and retry
+            await self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    def has_key(self, kid: Optional[str]) -> bool:
+        """Whether ``kid`` is in the current key set (no refresh)."""
+        return kid in self._keys
+
+    async def refresh(self) -> bool:
+        """
+        Refresh the key set, joining an in-flight refresh if there is one.
+        Returns False if the fetch failed (the previous keys are kept).
+        """
+        if not self._refresh_running():
+            self._inflight = asyncio.get_running_loop().create_task(self._fetch())
+        return await asyncio.shield(self._inflight)
+
+    def start(self) -> None:
+        """Start the background refresher that keeps the keys warm."""
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.get_running_loop().create_task(self._run_refresher())
+
+    async def stop(self) -> None:
+        """Stop the background refresher."""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    def clear(self) -> None:
+        """Forget all cached keys; the next lookup fetches the JWKS again."""
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._last_attempt = float("-inf")
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistics for monitoring."""
+        return {
+            "keys": len(self._keys),
+            "age_seconds": round(self.age, 3) if self._fetched_at else None,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
+
+    def _refresh_running(self) -> bool:
+        return self._inflight is not None and not self._inflight.done()
+
+    def _may_refresh_early(self) -> bool:
+        return time.monotonic() - self._last_attempt >= self.min_refresh_interval
+
+    def _refresh_in_background(self) -> None:
+        if not self._refresh_running():
+            self._inflight = asyncio.get_running_loop().create_task(self._fetch())
+
+    async def _run_refresher(self) -> None:
+        # Refresh before the TTL runs out so requests never see stale keys
+        interval = max(self.ttl * 0.8, 1.0)
+        while True:
+            await self.refresh()
+            await asyncio.sleep(interval)
+
+    async def _fetch(self) -> bool:
+        self._last_attempt = time.monotonic()
+        try:
+            jwks = await self._download()
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.error(f"Failed to fetch Keycloak JWKS: {e}")
+            return False
+
+        keys = self._parse_keys(jwks["keys"])
+        if not keys:
+            self.refresh_failures += 1
+            logger.error("No usable signing keys found in Keycloak JWKS")
+            return False
+
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+        self.refreshes += 1
+        logger.info(f"Successfully fetched {len(self._keys)} keys from Keycloak")
+        return True
+
+    @staticmethod
+    def _parse_keys(jwks_keys: List[Dict[str, Any]]) -> Dict[str, Key]:
+        keys = {}
+        for key in jwks_keys:
+            kid = key.get("kid")
+            # Keycloak also publishes encryption keys; only signing keys matter here
+            if not kid or key.get("use", "sig") != "sig":
+                continue
+            try:
+                keys[kid] = jwk.construct(key, algorithm=key.get("alg", "RS256"))
+            except Exception as e:
+                logger.warning(f"Skipping unusable JWKS key {kid}: {e}")
+        return keys
+
+    async def _download(self) -> Dict[str, Any]:
+        logger.info(f"Fetching JWKS from: {self.certs_url}")
+        response = await keycloak_http.get(self.certs_url, timeout=self.timeout)
+        response.raise_for_status()
+
+        jwks = response.json()
+        if not jwks.get("keys"):
+            raise ValueError("No keys found in JWKS")
+        return jwks
+
+
+# Global JWKS cache shared by all Keycloak dependencies
+jwks_cache = JWKSCache(
+    certs_url=settings.KEYCLOAK_CERTS_URL,
+    ttl=settings.JWKS_CACHE_TTL,
+    stale_ttl=settings.JWKS_STALE_TTL,
+    min_refresh_interval=settings.JWKS_MIN_REFRESH_INTERVAL,
+    timeout=settings.JWKS_FETCH_TIMEOUT
+)
@@ -0,0 +1,65 @@
+"""
+HTTP content negotiation on the ``Accept`` header.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+from fastapi import Request
+
+
+def _accepted(header: str) -> List[Tuple[str, float]]:
+    """Media ranges of an Accept header with their quality, in header order."""
+    ranges = []
+    for part in header.split(","):
+        media_range, *params = [item.strip() for item in part.split(";")]
+        if not media_range:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges.append((media_range.lower(), quality))
+    return ranges
+
+
+def _specificity(media_range: str, media_type: str) -> int:
+    """How specifically a media range names a type: 2 exact, 1 ``type/*``, 0 ``*/*``, -1 no match."""
+    if media_range == media_type:
+        return 2
+    if media_range.endswith("/*") and media_type.startswith(media_range[:-1]):
+        return 1
+    return 0 if media_range == "*/*" else -1
+
+
+def preferred_media_type(request: Request, offered: Sequence[str]) -> Optional[str]:
+    """
+    The type of ``offered`` the client prefers, or None if it accepts none of
+    them. Each type takes the quality of the most specific range naming it;
+    ties go to the type named explicitly, then to the order of ``offered``.
+    Without an Accept header the first offered type is used.
+    """
+    header = request.headers.get("accept")
+    if not header:
+        return offered[0]
+
+    ranges = _accepted(header)
+    best: Optional[Tuple[float, int, int]] = None
+    choice = None
+    for rank, media_type in enumerate(offered):
+        matches = [
+            (_specificity(media_range, media_type), quality)
+            for media_range, quality in ranges
+            if _specificity(media_range, media_type) >= 0
+        ]
+        if not matches:
+            continue
+        specificity, quality = max(matches)
+        if quality <= 0:
+            continue
+        score = (quality, specificity, -rank)
+        if best is None or score > best:
+            best, choice = score, media_type
+    return choice
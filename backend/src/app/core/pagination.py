@@ -0,0 +1,78 @@
+"""
+Opaque cursors and totals for paginated KPI value series.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+
+# Response headers carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+LINK_HEADER = "Link"
+
+# Response headers carrying the number of matching rows (include_total=true)
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_ESTIMATED_HEADER = "X-Total-Count-Estimated"
+
+
+class Cursor(NamedTuple):
+    """Position after the last row of a page, in ``(timestamp, id)`` order."""
+    timestamp: datetime
+    id: int
+
+
+def encode_cursor(timestamp: datetime, id: int) -> str:
+    """Encode a position as a URL-safe token clients pass back unchanged."""
+    payload = json.dumps([timestamp.isoformat(), id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Decode a token produced by ``encode_cursor``. Raises ValueError if it is malformed."""
+    try:
+        payload = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        timestamp, id = json.loads(payload)
+        return Cursor(datetime.fromisoformat(timestamp), int(id))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def keyset_position(cursor: Optional[str], offset: Optional[int]) -> Optional[Cursor]:
+    """Decode the ``cursor`` of a value query (400 if malformed or combined with ``offset``)."""
+    if cursor is None:
+        return None
+    if offset:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either cursor or offset, not both"
+        )
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def set_next_cursor(request: Request, response: Response, cursor: Optional[str]) -> None:
+    """
+    Advertise the next page: the raw token in ``X-Next-Cursor`` and the full
+    URL in a ``Link: rel="next"`` header. Nothing is set on the last page.
+    """
+    if cursor is None:
+        return
+    next_url = request.url.remove_query_params("offset").include_query_params(cursor=cursor)
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    response.headers[LINK_HEADER] = f'<{next_url}>; rel="next"'
+
+
+def set_total_count(response: Response, total: Optional[Tuple[int, bool]]) -> None:
+    """Report a ``(count, estimated)`` total in ``X-Total-Count`` headers; nothing if not requested."""
+    if total is None:
+        return
+    count, estimated = total
+    response.headers[TOTAL_COUNT_HEADER] = str(count)
+    response.headers[TOTAL_ESTIMATED_HEADER] = "true" if estimated else "false"
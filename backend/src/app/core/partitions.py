@@ -0,0 +1,272 @@
+"""
+Monthly range partitioning of kpi_values (PostgreSQL).
+
+With ``DB_PARTITION_KPI_VALUES`` the table is partitioned by range on
+``timestamp``, one partition per calendar month (``kpi_values_p2024_01``)
+plus a default partition for rows outside every month created so far.
+Indexes are defined on the parent, so PostgreSQL creates them on each
+partition. Range filters on ``timestamp`` prune partitions, and a month of
+history is dropped by detaching and dropping its partition.
+
+``KPIValuePartitions`` converts an existing table (``convert``), creates the
+partitions of the coming months (``ensure_ahead``, at startup and every
+``DB_PARTITION_CHECK_INTERVAL`` seconds) and drops old months
+(``drop_before``). Its methods take a sync ``Connection``; the background
+task runs them on the async engine with ``run_sync``. They serialize on a
+transaction-level advisory lock, so every worker can run the maintenance.
+"""
+import asyncio
+import logging
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.schema import CreateIndex
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+TABLE = "kpi_values"
+DEFAULT_PARTITION = f"{TABLE}_default"
+LEGACY_TABLE = f"{TABLE}_unpartitioned"
+
+# Transaction-level advisory lock serializing partition maintenance across
+# workers and the CLI
+_MAINTENANCE_LOCK = 0x6B7076  # "kpv"
+
+# Mirrors models.KPIValue; the partition key must be part of the primary key
+_PARTITIONED_DDL = f"""
+CREATE TABLE {TABLE} (
+    id INTEGER NOT NULL DEFAULT nextval('{{sequence}}'::regclass),
+    value DOUBLE PRECISION NOT NULL,
+    timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    category_label VARCHAR(100),
+    kpi_id INTEGER NOT NULL REFERENCES kpis (id),
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp)
+"""
+
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+class KPIValuePartitions:
+    """Creates, lists and drops the monthly partitions of kpi_values."""
+
+    def __init__(self, enabled: bool, months_ahead: int, check_interval: float):
+        self.enabled = enabled
+        self.months_ahead = months_ahead
+        self.check_interval = check_interval
+        self._maintainer: Optional[asyncio.Task] = None
+        self.partitions_created = 0
+        self.last_check: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    # Inspection
+
+    def is_partitioned(self, conn: Connection) -> bool:
+        if conn.dialect.name != "postgresql":
+            return False
+        return conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+        ), {"table": TABLE}).scalar()
+
+    def partitions(self, conn: Connection) -> List[Tuple[str, Optional[date]]]:
+        """(name, month) of every partition, months in order; the default partition has no month."""
+        names = conn.execute(text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = to_regclass(:table)"
+        ), {"table": TABLE}).scalars().all()
+        months = {name: self._month_of(name) for name in names}
+        return sorted(months.items(), key=lambda item: (item[1] is not None, item[1] or date.min))
+
+    @staticmethod
+    def _month_of(name: str) -> Optional[date]:
+        prefix = f"{TABLE}_p"
+        if not name.startswith(prefix):
+            return None
+        year, month = name[len(prefix):].split("_")
+        return date(int(year), int(month), 1)
+
+    # Maintenance
+
+    @staticmethod
+    def _lock(conn: Connection) -> None:
+        """Wait for other maintenance runs; held until the transaction ends (reentrant)."""
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _MAINTENANCE_LOCK})
+
+    def ensure(self, conn: Connection, months: Iterable[date]) -> int:
+        """
+        Create the partitions of ``months`` that do not exist yet and return
+        how many were created. Rows of those months already in the default
+        partition move into the new partition, which is then attached.
+        """
+        self._lock(conn)
+        existing = {month for _, month in self.partitions(conn)}
+        created = 0
+        for month in sorted(set(months) - existing):
+            name, lower, upper = partition_name(month), month, add_months(month, 1)
+            conn.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)"))
+            conn.execute(text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                f"WHERE timestamp >= :lower AND timestamp < :upper "
+                f"RETURNING id, value, timestamp, category_label, kpi_id) "
+                f"INSERT INTO {name} (id, value, timestamp, category_label, kpi_id) SELECT * FROM moved"
+            ), {"lower": lower, "upper": upper})
+            # ATTACH creates the parent's indexes and foreign key on the partition
+            conn.execute(text(
+                f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')"
+            ))
+            created += 1
+            logger.info(f"Created partition {name}")
+        self.partitions_created += created
+        return created
+
+    def ensure_ahead(self, conn: Connection, today: Optional[date] = None) -> int:
+        """Create the partitions of the current month and the next ``months_ahead`` months."""
+        current = month_start(today or datetime.utcnow())
+        return self.ensure(conn, [add_months(current, offset) for offset in range(self.months_ahead + 1)])
+
+    def drop_before(self, conn: Connection, month: date) -> List[str]:
+        """Detach and drop the partitions of the months before ``month``; returns their names."""
+        self._lock(conn)
+        dropped = []
+        for name, partition_month in self.partitions(conn):
+            if partition_month is not None and partition_month < month:
+                conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+                conn.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+                logger.info(f"Dropped partition {name}")
+        return dropped
+
+    # Conversion
+
+    def convert(self, conn: Connection, keep_legacy: bool = False) -> int:
+        """
+        Replace an unpartitioned kpi_values by a partitioned one holding the
+        same rows (and id sequence) and return the number of rows moved. Runs
+        in the caller's transaction and blocks kpi_values until it commits.
+        """
+        from ..models import KPIValue
+
+        self._lock(conn)
+        if self.is_partitioned(conn):
+            return 0
+
+        conn.execute(text(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE"))
+        # Another session may have converted the table while we waited for the lock
+        if self.is_partitioned(conn):
+            return 0
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": TABLE}).scalar()
+        if sequence is None:
+            raise RuntimeError(f"{TABLE}.id has no owned sequence; cannot partition {TABLE}")
+
+        # Free the table and index names for the partitioned table
+        indexes = conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table"
+        ), {"table": TABLE}).scalars().all()
+        conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {LEGACY_TABLE}"))
+        for index in indexes:
+            conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index[:50]}_unpartitioned"'))
+
+        conn.execute(text(_PARTITIONED_DDL.format(sequence=sequence)))
+        for index in KPIValue.__table__.indexes:
+            conn.execute(CreateIndex(index))
+        conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+        first, last = conn.execute(text(f"SELECT min(timestamp), max(timestamp) FROM {LEGACY_TABLE}")).one()
+        current = month_start(datetime.utcnow())
+        months = [add_months(current, offset) for offset in range(self.months_ahead + 1)]
+        if first is not None:
+            month = month_start(first)
+            while month <= month_start(last):
+                months.append(month)
+                month = add_months(month, 1)
+        self.ensure(conn, months)
+
+        moved = conn.execute(text(
+            f"INSERT INTO {TABLE} (id, value, timestamp, category_label, kpi_id) "
+            f"SELECT id, value, timestamp, category_label, kpi_id FROM {LEGACY_TABLE}"
+        )).rowcount
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id"))
+        if not keep_legacy:
+            conn.execute(text(f"DROP TABLE {LEGACY_TABLE}"))
+        return moved
+
+    def maintain(self, conn: Connection) -> None:
+        """Partition an empty kpi_values, then create the partitions of the coming months."""
+        if conn.dialect.name != "postgresql":
+            logger.warning("DB_PARTITION_KPI_VALUES is set but partitioning requires PostgreSQL")
+            return
+        # Every worker runs this; the first one to get the lock does the work
+        self._lock(conn)
+        if not self.is_partitioned(conn):
+            if conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {TABLE})")).scalar():
+                logger.warning(
+                    f"{TABLE} is not partitioned; run partition_kpi_values.py convert to move its rows"
+                )
+                return
+            # A fresh database has nothing to move
+            self.convert(conn)
+            logger.info(f"Partitioned empty table {TABLE}")
+        self.ensure_ahead(conn)
+
+    # Background maintenance
+
+    def start(self, async_engine: AsyncEngine) -> None:
+        """Create upcoming partitions now and every ``check_interval`` seconds (no-op unless enabled)."""
+        if self.enabled and (self._maintainer is None or self._maintainer.done()):
+            self._maintainer = asyncio.get_running_loop().create_task(self._run_maintainer(async_engine))
+
+    async def stop(self) -> None:
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+            try:
+                await self._maintainer
+            except asyncio.CancelledError:
+                pass
+            self._maintainer = None
+
+    async def _run_maintainer(self, async_engine: AsyncEngine) -> None:
+        while True:
+            try:
+                async with async_engine.begin() as conn:
+                    await conn.run_sync(self.maintain)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Partition maintenance failed: {e}")
+            self.last_check = time.time()
+            await asyncio.sleep(self.check_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        """Maintenance state for monitoring."""
+        return {
+            "enabled": self.enabled,
+            "months_ahead": self.months_ahead,
+            "partitions_created": self.partitions_created,
+            "last_check": self.last_check,
+            "last_error": self.last_error,
+        }
+
+
+kpi_value_partitions = KPIValuePartitions(
+    enabled=settings.DB_PARTITION_KPI_VALUES,
+    months_ahead=settings.DB_PARTITION_MONTHS_AHEAD,
+    check_interval=settings.DB_PARTITION_CHECK_INTERVAL
+)
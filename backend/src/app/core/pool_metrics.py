@@ -0,0 +1,136 @@
+"""
+Connection pool instrumentation built on SQLAlchemy pool events.
+"""
+import bisect
+import time
+from typing import Optional, Dict, Any, List, Sequence, Type
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+# Upper bounds (seconds) of the checkout wait-time histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class WaitHistogram:
+    """Cumulative histogram of wait times (Prometheus-style ``le`` buckets)."""
+
+    def __init__(self, buckets: Sequence[float] = WAIT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self._counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self._counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum_s": round(self.sum, 6),
+            "max_s": round(self.max, 6),
+            "avg_s": round(self.sum / self.count, 6) if self.count else None,
+            "buckets": buckets,
+        }
+
+
+class PoolMetrics:
+    """
+    Live counters for one engine's connection pool.
+
+    Checkouts, checkins, new connections and invalidations are counted with
+    pool events. Pool events fire only once a connection has been handed out,
+    so the time spent waiting for it (and checkouts that time out) is recorded
+    by the pool class returned from ``pool_class`` instead.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Optional[Engine] = None
+        self.wait_time = WaitHistogram()
+
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+
+    def pool_class(self, base: Type[Pool]) -> Type[Pool]:
+        """
+        Subclass of ``base`` that times every checkout.
+
+        The metrics live on the class, so the pool created by ``engine.dispose()``
+        (which re-instantiates ``pool.__class__``) keeps reporting here.
+        """
+        metrics = self
+
+        class InstrumentedPool(base):
+            def _do_get(self):
+                start = time.perf_counter()
+                try:
+                    connection = super()._do_get()
+                except exc.TimeoutError:
+                    metrics.timeouts += 1
+                    metrics.wait_time.observe(time.perf_counter() - start)
+                    raise
+                metrics.wait_time.observe(time.perf_counter() - start)
+                return connection
+
+        InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+        return InstrumentedPool
+
+    def attach(self, engine: Engine) -> None:
+        """Listen to ``engine``'s pool events (pass ``sync_engine`` for an AsyncEngine)."""
+        self.engine = engine
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        self.checkins += 1
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool occupancy and counters for monitoring."""
+        pool = self.engine.pool if self.engine is not None else None
+        size = pool.size() if hasattr(pool, "size") else None
+        overflow = pool.overflow() if hasattr(pool, "overflow") else None
+        return {
+            "pool_size": size,
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            # QueuePool.overflow() counts down from -pool_size until the pool is full
+            "overflow_in_use": max(overflow, 0) if overflow is not None else None,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "checkout_timeouts": self.timeouts,
+            "checkout_wait": self.wait_time.stats(),
+        }
+
+
+# Pool metrics of the sync and async engines in core.database
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
@@ -0,0 +1,70 @@
+"""
+Per-route statement timeouts for database queries.
+"""
+from collections import Counter
+from typing import Optional, Dict, Any
+
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
+
+from .config import settings
+
+# Session.info keys carrying the request's budget
+STATEMENT_TIMEOUT = "statement_timeout_ms"
+ROUTE_PATH = "route_path"
+
+# SQLSTATE of "canceling statement due to statement timeout"
+QUERY_CANCELED = "57014"
+
+
+def route_path(request: Optional[Request]) -> Optional[str]:
+    """Path template of the route serving ``request`` (e.g. ``/kpis/{kpi_id}/values``)."""
+    if request is None:
+        return None
+    route = request.scope.get("route")
+    return getattr(route, "path_format", None)
+
+
+def statement_timeout_for(path: Optional[str]) -> int:
+    """Statement timeout (ms) for a route: its DB_ROUTE_STATEMENT_TIMEOUTS entry or the default."""
+    if path is not None and path in settings.DB_ROUTE_STATEMENT_TIMEOUTS:
+        return int(settings.DB_ROUTE_STATEMENT_TIMEOUTS[path])
+    return settings.DB_STATEMENT_TIMEOUT
+
+
+def is_statement_timeout(exc: BaseException) -> bool:
+    """Whether a database error is Postgres cancelling a statement (timeout or cancel request)."""
+    if not isinstance(exc, DBAPIError):
+        return False
+    orig = exc.orig
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    return code == QUERY_CANCELED
+
+
+class QueryBudgetMetrics:
+    """Counts statement timeouts and queries abandoned by disconnected clients, per route."""
+
+    def __init__(self):
+        self.timeouts: Counter = Counter()
+        self.cancelled_on_disconnect: Counter = Counter()
+
+    def record_timeout(self, path: Optional[str]) -> None:
+        self.timeouts[path or "unknown"] += 1
+
+    def record_disconnect(self, path: Optional[str]) -> None:
+        self.cancelled_on_disconnect[path or "unknown"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring."""
+        return {
+            "default_timeout_ms": settings.DB_STATEMENT_TIMEOUT,
+            "route_timeouts_ms": dict(settings.DB_ROUTE_STATEMENT_TIMEOUTS),
+            "timeouts": sum(self.timeouts.values()),
+            "timeouts_by_route": dict(self.timeouts),
+            "cancelled_on_disconnect": sum(self.cancelled_on_disconnect.values()),
+            "cancelled_on_disconnect_by_route": dict(self.cancelled_on_disconnect),
+        }
+
+
+# Global query budget counters
+query_budget = QueryBudgetMetrics()
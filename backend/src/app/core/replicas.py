@@ -0,0 +1,178 @@
+"""
+Read replicas for repository reads.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Optional, Dict, Any, List
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+logger = logging.getLogger(__name__)
+
+
+class Replica:
+    """One read replica, reachable through a sync and an async engine."""
+
+    def __init__(self, name: str, engine: Engine, async_engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        self.healthy = True
+        self.down_since: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.reads = 0
+        self.failures = 0
+
+    def bind_for(self, use_async: bool) -> Engine:
+        """Engine a Session binds to (the sync core of the async engine for AsyncSession)."""
+        return self.async_engine.sync_engine if use_async else self.engine
+
+    def checked_out(self, use_async: bool) -> int:
+        pool = self.bind_for(use_async).pool
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+
+class ReplicaSet:
+    """
+    Replicas that repository reads are spread over.
+
+    ``strategy`` is ``round_robin`` or ``least_busy`` (fewest checked-out
+    connections). A replica whose connection fails is taken out of rotation
+    right away and reads fall back to the primary; the health checker started
+    with ``start`` probes it every ``health_interval`` seconds and puts it back
+    once it answers.
+    """
+
+    STRATEGIES = ("round_robin", "least_busy")
+
+    def __init__(self, replicas: List[Replica], strategy: str, health_interval: float):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown replica selection strategy '{strategy}'")
+        self.replicas = replicas
+        self.strategy = strategy
+        self.health_interval = health_interval
+        self._cycle = itertools.count()
+        self._checker: Optional[asyncio.Task] = None
+
+        self.primary_fallbacks = 0
+
+        for replica in replicas:
+            for engine in (replica.engine, replica.async_engine.sync_engine):
+                event.listen(engine, "handle_error", self._error_listener(replica))
+
+    @classmethod
+    def from_urls(
+        cls,
+        urls: List[str],
+        async_urls: List[str],
+        strategy: str,
+        health_interval: float,
+        **engine_options: Any
+    ) -> "ReplicaSet":
+        replicas = [
+            Replica(
+                name=url.rsplit("@", 1)[-1],
+                engine=create_engine(url, **engine_options),
+                async_engine=create_async_engine(async_url, **engine_options)
+            )
+            for url, async_url in zip(urls, async_urls)
+        ]
+        return cls(replicas, strategy, health_interval)
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self, use_async: bool = False) -> Optional[Engine]:
+        """Engine of the replica to read from, None to use the primary."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            if self.replicas:
+                self.primary_fallbacks += 1
+            return None
+
+        if self.strategy == "least_busy":
+            replica = min(healthy, key=lambda r: r.checked_out(use_async))
+        else:
+            replica = healthy[next(self._cycle) % len(healthy)]
+        replica.reads += 1
+        return replica.bind_for(use_async)
+
+    def mark_down(self, replica: Replica, error: Any) -> None:
+        """Take a replica out of rotation until a health check succeeds."""
+        replica.failures += 1
+        replica.last_error = str(error)
+        if replica.healthy:
+            replica.healthy = False
+            replica.down_since = time.monotonic()
+            logger.warning(f"Read replica {replica.name} marked unhealthy: {error}")
+
+    def _error_listener(self, replica: Replica):
+        def on_error(context) -> None:
+            # Connection failures only; statement errors say nothing about the replica
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(replica, context.original_exception)
+        return on_error
+
+    async def check_health(self) -> None:
+        """Probe every replica once."""
+        for replica in self.replicas:
+            try:
+                async with replica.async_engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except Exception as e:
+                self.mark_down(replica, e)
+                continue
+            if not replica.healthy:
+                replica.healthy = True
+                replica.down_since = None
+                logger.info(f"Read replica {replica.name} is healthy again")
+
+    def start(self) -> None:
+        """Start the background health checker (no-op without replicas)."""
+        if self.replicas and (self._checker is None or self._checker.done()):
+            self._checker = asyncio.get_running_loop().create_task(self._run_checker())
+
+    async def stop(self) -> None:
+        """Stop the health checker and close the replica pools."""
+        if self._checker is not None:
+            self._checker.cancel()
+            try:
+                await self._checker
+            except asyncio.CancelledError:
+                pass
+            self._checker = None
+        for replica in self.replicas:
+            replica.engine.dispose()
+            await replica.async_engine.dispose()
+
+    async def _run_checker(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+    def stats(self) -> Dict[str, Any]:
+        """Replica health and read counts for monitoring."""
+        return {
+            "strategy": self.strategy,
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "down_seconds": (
+                        round(time.monotonic() - replica.down_since, 3)
+                        if replica.down_since is not None else None
+                    ),
+                    "reads": replica.reads,
+                    "failures": replica.failures,
+                    "last_error": replica.last_error,
+                    "checked_out": replica.checked_out(False),
+                    "checked_out_async": replica.checked_out(True),
+                }
+                for replica in self.replicas
+            ],
+        }
@@ -0,0 +1,188 @@
+"""
+In-process cache of rendered responses for anonymous, read-only routes.
+"""
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Dict, Any, NamedTuple, Awaitable
+
+from fastapi import Request, Response, status
+
+from .config import settings
+from .pagination import LINK_HEADER, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, TOTAL_ESTIMATED_HEADER
+from .unit_of_work import UnitOfWorkRoute
+
+# Headers set by endpoints that are stored and replayed with the body
+REPLAYED_HEADERS = (LINK_HEADER, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, TOTAL_ESTIMATED_HEADER)
+
+
+class CachedResponse(NamedTuple):
+    """A rendered response body and the headers needed to replay it."""
+    body: bytes
+    media_type: Optional[str]
+    etag: str
+    expires_at: float
+    headers: Dict[str, str]
+
+
+class ResponseCache:
+    """
+    Bounded LRU of rendered GET responses keyed by path and query string.
+
+    Concurrent misses for the same key are collapsed into a single render, so an
+    expired entry on a busy public dashboard costs one database round trip.
+    """
+
+    def __init__(self, ttl: int, max_size: int, max_age: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.max_age = max_age
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Future[Optional[CachedResponse]]"] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    @property
+    def cache_control(self) -> str:
+        """Cache-Control header for shared caches (browsers, CDN, reverse proxy)."""
+        return f"public, max-age={self.max_age}, stale-while-revalidate={self.max_age}"
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+        # Routes may negotiate the representation (Vary: Accept)
+        return f"{request.url.path}?{query}#{request.headers.get('accept', '')}"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Return the cached response for ``key`` if it is still fresh."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, response: Response) -> Optional[CachedResponse]:
+        """Cache a successful response body; other responses are not cached."""
+        if response.status_code != status.HTTP_200_OK or not hasattr(response, "body"):
+            return None
+
+        entry = CachedResponse(
+            body=response.body,
+            media_type=response.media_type,
+            etag=f'"{hashlib.sha1(response.body).hexdigest()}"',
+            expires_at=time.monotonic() + self.ttl,
+            headers={name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers}
+        )
+        if self.ttl <= 0 or self.max_size <= 0:
+            return entry
+
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def render(self, request: Request, entry: CachedResponse, hit: bool) -> Response:
+        """Build the response for a cached entry, honouring ``If-None-Match``."""
+        headers = {
+            **entry.headers,
+            "Vary": "Accept",
+            "Cache-Control": self.cache_control,
+            "ETag": entry.etag,
+            "X-Cache": "HIT" if hit else "MISS",
+        }
+        if request.headers.get("if-none-match") == entry.etag:
+            self.not_modified += 1
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+    async def fetch(
+        self,
+        request: Request,
+        render: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        """Serve ``request`` from the cache, rendering it at most once per key."""
+        key = self.key_for(request)
+        entry = self.get(key)
+        if entry is not None:
+            self.hits += 1
+            return self.render(request, entry, hit=True)
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            entry = await asyncio.shield(pending)
+            if entry is not None:
+                self.hits += 1
+                return self.render(request, entry, hit=True)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await render(request)
+            entry = self.put(key, response)
+        except BaseException:
+            future.set_result(None)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        future.set_result(entry)
+        if entry is None:
+            return response
+        return self.render(request, entry, hit=False)
+
+    def clear(self) -> None:
+        """Drop all cached responses."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistics for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+# Global cache for the anonymous /public API
+public_cache = ResponseCache(
+    ttl=settings.PUBLIC_CACHE_TTL,
+    max_size=settings.PUBLIC_CACHE_MAX_SIZE,
+    max_age=settings.PUBLIC_CACHE_MAX_AGE
+)
+
+
+class PublicCacheRoute(UnitOfWorkRoute):
+    """
+    Route class serving GET requests from ``public_cache``.
+
+    A cache hit returns before the endpoint's dependencies are resolved, so no
+    database session is opened for it.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+
+        async def cached_handler(request: Request) -> Response:
+            if request.method != "GET":
+                return await handler(request)
+            return await public_cache.fetch(request, handler)
+
+        return cached_handler
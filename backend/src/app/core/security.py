@@ -2,18 +2,52 @@
 Security utilities for Keycloak token verification.
 """
 import logging
-from typing import Optional, Dict, Any
-from fastapi import HTTPException, status, Request
+from typing import Optional, Dict, Any, Iterable, Callable
+from fastapi import HTTPException, status, Request, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
-import requests
-from functools import lru_cache
 
+from .auth_context import AuthContext
 from .config import settings
+from .jwks import jwks_cache
+from .token_cache import token_cache
 
 logger = logging.getLogger(__name__)
 
 
+class AudiencePolicy:
+    """
+    Accepted token audiences, resolved once from settings.
+    
+    A token is accepted if its `aud` contains one of the accepted audiences or
+    its `azp` is one of the authorized parties. With both lists empty every
+    audience is accepted (Keycloak access tokens often carry only `account`).
+    """
+    
+    def __init__(self, audiences: Iterable[str] = (), authorized_parties: Iterable[str] = ()):
+        self.audiences = frozenset(audiences)
+        self.authorized_parties = frozenset(authorized_parties)
+        self.enforced = bool(self.audiences or self.authorized_parties)
+    
+    def allows(self, payload: Dict[str, Any]) -> bool:
+        """Check the `aud`/`azp` claims of a verified payload."""
+        if not self.enforced:
+            return True
+        
+        if payload.get("azp") in self.authorized_parties:
+            return True
+        
+        aud = payload.get("aud")
+        token_audiences = {aud} if isinstance(aud, str) else set(aud or ())
+        return not self.audiences.isdisjoint(token_audiences)
+
+
+audience_policy = AudiencePolicy(
+    audiences=settings.KEYCLOAK_AUDIENCES,
+    authorized_parties=settings.KEYCLOAK_AUTHORIZED_PARTIES
+)
+
+
 class KeycloakBearer(HTTPBearer):
     """
     Keycloak JWT Bearer token authentication.
@@ -24,31 +58,63 @@ class KeycloakBearer(HTTPBearer):
         super().__init__(auto_error=auto_error)
         self.realm_url = settings.KEYCLOAK_AUTH_URL
         self.client_id = settings.KEYCLOAK_CLIENT_ID
-        self._public_key: Optional[str] = None
+        self.audience_policy = audience_policy
     
-    def get_jwks(self) -> dict:
+    async def authenticate(self, token: str) -> AuthContext:
         """
-        Fetch JWKS (JSON Web Key Set) from Keycloak.
+        Verify a raw JWT against the cached Keycloak keys.
+        Returns the authorization context built from its claims.
         """
-        try:
-            certs_url = f"{self.realm_url}/protocol/openid-connect/certs"
-            logger.info(f"Fetching JWKS from: {certs_url}")
-            response = requests.get(certs_url, timeout=10)
-            response.raise_for_status()
-            
-            jwks = response.json()
-            if not jwks.get("keys"):
-                raise ValueError("No keys found in JWKS")
-            
-            logger.info(f"Successfully fetched {len(jwks['keys'])} keys from Keycloak")
-            return jwks
-            
-        except Exception as e:
-            logger.error(f"Failed to fetch Keycloak JWKS: {e}")
+        # Tokens seen before skip verification (and claim parsing) until they
+        # expire, as long as the signing key is still published
+        cached = token_cache.get(token)
+        if cached is not None:
+            if jwks_cache.has_key(cached.kid) and cached.context is not None:
+                return cached.context
+            token_cache.discard(token)
+        
+        # Decode token header to get the key ID (kid)
+        unverified_header = jwt.get_unverified_header(token)
+        kid = unverified_header.get('kid')
+        
+        # Find the matching key (pre-parsed, served from the process-wide JWKS cache)
+        public_key = await jwks_cache.get_key(kid)
+        
+        if not public_key:
+            logger.warning(f"No matching key found for kid: {kid}")
             raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Unable to verify token: Authentication service unavailable"
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token key",
+                headers={"WWW-Authenticate": "Bearer"},
             )
+        
+        # Decode and verify the token once; the audience is checked against
+        # the resolved policy instead of retrying the decode without it
+        payload = jwt.decode(
+            token,
+            public_key,
+            algorithms=["RS256"],
+            options={
+                "verify_signature": True,
+                "verify_aud": False,
+                "verify_exp": True,
+            }
+        )
+        
+        if not self.audience_policy.allows(payload):
+            raise jwt.JWTClaimsError("Invalid audience")
+        
+        context = AuthContext.from_claims(payload)
+        token_cache.put(token, payload, kid, context)
+        return context
+    
+    async def verify_token(self, token: str) -> Dict[str, Any]:
+        """
+        Verify a raw JWT against the cached Keycloak keys.
+        Returns the decoded token payload if valid.
+        """
+        context = await self.authenticate(token)
+        return context.claims
     
     async def __call__(self, request: Request) -> Dict[str, Any]:
         """
@@ -66,60 +132,13 @@ class KeycloakBearer(HTTPBearer):
                 )
             
             try:
-                # Get JWKS
-                jwks = self.get_jwks()
-                
-                # Decode token header to get the key ID (kid)
-                unverified_header = jwt.get_unverified_header(credentials.credentials)
-                kid = unverified_header.get('kid')
-                
-                # Find the matching key
-                rsa_key = None
-                for key in jwks["keys"]:
-                    if key.get('kid') == kid:
-                        rsa_key = key
-                        break
-                
-                if not rsa_key:
-                    logger.warning(f"No matching key found for kid: {kid}")
-                    raise HTTPException(
-                        status_code=status.HTTP_401_UNAUTHORIZED,
-                        detail="Invalid token key",
-                        headers={"WWW-Authenticate": "Bearer"},
-                    )
-                
-                # Decode and verify the token
-                # First, try without audience verification (some Keycloak configs don't include aud)
-                try:
-                    payload = jwt.decode(
-                        credentials.credentials,
-                        rsa_key,
-                        algorithms=["RS256"],
-                        audience=self.client_id,
-                        options={
-                            "verify_signature": True,
-                            "verify_aud": True,
-                            "verify_exp": True,
-                        }
-                    )
-                except jwt.JWTClaimsError:
-                    # If audience verification fails, try without it
-                    logger.info("Retrying token verification without audience check")
-                    payload = jwt.decode(
-                        credentials.credentials,
-                        rsa_key,
-                        algorithms=["RS256"],
-                        options={
-                            "verify_signature": True,
-                            "verify_aud": False,
-                            "verify_exp": True,
-                        }
-                    )
+                context = await self.authenticate(credentials.credentials)
                 
-                # Store user info in request state for later use
-                request.state.user = payload
-                logger.info(f"Successfully authenticated user: {payload.get('preferred_username', 'unknown')}")
-                return payload
+                # Store user info and authorization context in request state for later use
+                request.state.user = context.claims
+                request.state.auth = context
+                logger.info(f"Successfully authenticated user: {context.username or 'unknown'}")
+                return context.claims
                 
             except jwt.ExpiredSignatureError:
                 logger.warning("Token has expired")
@@ -180,53 +199,12 @@ class OptionalKeycloakBearer(KeycloakBearer):
             if credentials.scheme != "Bearer":
                 return None
             
-            # Get JWKS
-            jwks = self.get_jwks()
+            context = await self.authenticate(credentials.credentials)
             
-            # Decode token header to get the key ID (kid)
-            unverified_header = jwt.get_unverified_header(credentials.credentials)
-            kid = unverified_header.get('kid')
-            
-            # Find the matching key
-            rsa_key = None
-            for key in jwks["keys"]:
-                if key.get('kid') == kid:
-                    rsa_key = key
-                    break
-            
-            if not rsa_key:
-                logger.debug(f"No matching key found for kid: {kid}")
-                return None
-            
-            # Decode and verify the token
-            try:
-                payload = jwt.decode(
-                    credentials.credentials,
-                    rsa_key,
-                    algorithms=["RS256"],
-                    audience=self.client_id,
-                    options={
-                        "verify_signature": True,
-                        "verify_aud": True,
-                        "verify_exp": True,
-                    }
-                )
-            except jwt.JWTClaimsError:
-                # Try without audience verification
-                payload = jwt.decode(
-                    credentials.credentials,
-                    rsa_key,
-                    algorithms=["RS256"],
-                    options={
-                        "verify_signature": True,
-                        "verify_aud": False,
-                        "verify_exp": True,
-                    }
-                )
-            
-            # Store user info in request state
-            request.state.user = payload
-            return payload
+            # Store user info and authorization context in request state
+            request.state.user = context.claims
+            request.state.auth = context
+            return context.claims
             
         except Exception as e:
             logger.debug(f"Optional auth failed: {e}")
@@ -252,34 +230,77 @@ def get_current_user(request: Request) -> Dict[str, Any]:
     )
 
 
-def require_role(required_role: str):
+def get_auth_context(request: Request) -> AuthContext:
     """
-    Dependency factory to check if user has a specific role.
+    Get the authorization context of the current request.
+    Built once per token by KeycloakBearer; use it for role and city checks.
+    """
+    context = getattr(request.state, "auth", None)
+    if context is not None:
+        return context
+    
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Not authenticated"
+    )
+
+
+def require_any_role(*roles: str):
+    """
+    Dependency factory to check if the user has at least one of the given roles
+    (realm or client roles).
     
     Usage:
-        @router.delete("/admin-only", dependencies=[Depends(require_role("admin"))])
-        def admin_route():
-            return {"message": "Admin access granted"}
+        @router.post("/", dependencies=[Depends(require_any_role("admin", "editor"))])
     """
+    required = frozenset(roles)
+    
     def role_checker(request: Request) -> None:
-        user = get_current_user(request)
-        
-        # Keycloak stores roles in different places
-        user_roles = []
-        
-        # Check realm roles
-        if "realm_access" in user:
-            user_roles.extend(user["realm_access"].get("roles", []))
-        
-        # Check client roles
-        if "resource_access" in user:
-            client_access = user["resource_access"].get(settings.KEYCLOAK_CLIENT_ID, {})
-            user_roles.extend(client_access.get("roles", []))
-        
-        if required_role not in user_roles:
+        if not get_auth_context(request).has_any_role(required):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"User does not have the required role: {required_role}"
+                detail=f"User does not have any of the required roles: {', '.join(sorted(required))}"
             )
     
     return role_checker
+
+
+def require_role(required_role: str):
+    """
+    Dependency factory to check if user has a specific role.
+    
+    Usage:
+        @router.delete("/admin-only", dependencies=[Depends(require_role("admin"))])
+        def admin_route():
+            return {"message": "Admin access granted"}
+    """
+    return require_any_role(required_role)
+
+
+def require_city_scope(city_resolver: Callable[..., Iterable[str]]):
+    """
+    Dependency factory to check that the user may modify the cities a request touches.
+    
+    `city_resolver` is itself a dependency returning the codes of the affected
+    cities (see `app.api.scopes`). Unknown records resolve to no city and are
+    left to the route's own 404. Without `ENFORCE_CITY_SCOPES` the check (and
+    the resolver) is skipped.
+    
+    Usage:
+        @router.put("/{kpi_id}", dependencies=[Depends(require_city_scope(city_of_kpi))])
+    """
+    if not settings.ENFORCE_CITY_SCOPES:
+        def scope_not_enforced() -> None:
+            return None
+        return scope_not_enforced
+    
+    def scope_checker(request: Request, city_codes: Iterable[str] = Depends(city_resolver)) -> None:
+        context = get_auth_context(request)
+        for city_code in city_codes:
+            if not context.can_access_city(city_code):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail=f"User may not modify data of city '{city_code}'"
+                )
+    
+    return scope_checker
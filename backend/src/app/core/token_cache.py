@@ -0,0 +1,98 @@
+"""
+Cache of verified Keycloak access tokens.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, NamedTuple
+
+from .config import settings
+
+
+class CachedToken(NamedTuple):
+    """A verified token payload, the key that signed it and its authorization context."""
+    payload: Dict[str, Any]
+    kid: Optional[str]
+    expires_at: float
+    context: Any = None
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified token payloads.
+
+    Entries are keyed by the SHA-256 digest of the raw token (the token itself is
+    never stored) and dropped once the token's ``exp`` has passed, so a repeat
+    request with the same bearer token skips signature verification.
+    Cached payloads and contexts are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, CachedToken]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[CachedToken]:
+        """Return the cached entry for ``token`` if it has not expired."""
+        key = self._digest(token)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, token: str, payload: Dict[str, Any], kid: Optional[str], context: Any = None) -> None:
+        """Cache a verified payload (and its derived context) until the token expires."""
+        exp = payload.get("exp")
+        if self.max_size <= 0 or not isinstance(exp, (int, float)):
+            return
+
+        key = self._digest(token)
+        self._entries[key] = CachedToken(
+            payload=payload, kid=kid, expires_at=float(exp), context=context
+        )
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, token: str) -> None:
+        """Remove a token from the cache."""
+        self._entries.pop(self._digest(token), None)
+
+    def clear(self) -> None:
+        """Drop all cached tokens."""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistics for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+# Global verified-token cache shared by all Keycloak dependencies
+token_cache = VerifiedTokenCache(max_size=settings.TOKEN_CACHE_MAX_SIZE)
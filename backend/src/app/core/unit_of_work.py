@@ -0,0 +1,204 @@
+"""
+Lazily created database sessions that give their connection back as soon as
+the route handler's unit of work is done.
+"""
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .query_budget import query_budget
+
+# Session.info flag set while flushed changes are not committed yet
+UNCOMMITTED_WRITES = "uncommitted_writes"
+
+
+class LazySession:
+    """
+    Stand-in for a ``Session`` that creates it on first use.
+
+    Requests that fail before touching the database (validation, auth, cache
+    hits) never build a session. ``release`` ends the transaction and returns
+    the connection to the pool while keeping loaded objects usable, so
+    response serialization does not hold a pooled connection.
+    """
+
+    def __init__(self, factory: Callable[..., Session], **options: Any):
+        self._factory = factory
+        self._options = options
+        self._session: Optional[Session] = None
+
+    @property
+    def started(self) -> bool:
+        """Whether the session has been created."""
+        return self._session is not None
+
+    @property
+    def session(self) -> Session:
+        if self._session is None:
+            self._session = self._factory(**self._options)
+        return self._session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    def release(self) -> None:
+        """
+        Give the connection back to the pool. Objects keep their loaded state;
+        touching an unloaded attribute later checks a connection out again.
+        Flushed but uncommitted changes, and transactions that failed, are
+        left for ``close`` to roll back.
+        """
+        session = self._session
+        if session is None or not session.in_transaction() or session.info.get(UNCOMMITTED_WRITES):
+            return
+        if not session.get_transaction().is_active:
+            # A failed flush: committing would raise PendingRollbackError
+            return
+        if session.new or session.dirty or session.deleted:
+            return
+
+        expire_on_commit = session.expire_on_commit
+        session.expire_on_commit = False
+        try:
+            # Nothing was written: the commit only ends the read transaction
+            session.commit()
+        finally:
+            session.expire_on_commit = expire_on_commit
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+
+
+class LazyAsyncSession:
+    """
+    Stand-in for an ``AsyncSession`` that creates it on first use.
+
+    Async sessions load everything a response needs eagerly, so ``release``
+    simply closes the session; its objects stay readable while detached.
+    """
+
+    def __init__(self, factory: Callable[..., AsyncSession], **options: Any):
+        self._factory = factory
+        self._options = options
+        self._session: Optional[AsyncSession] = None
+
+    @property
+    def started(self) -> bool:
+        """Whether the session has been created."""
+        return self._session is not None
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._factory(**self._options)
+        return self._session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    async def release(self) -> None:
+        """Give the connection back to the pool (uncommitted changes are rolled back)."""
+        if self._session is not None:
+            await self._session.close()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+
+async def _release_all(values: Iterable[Any]) -> None:
+    for value in values:
+        if isinstance(value, LazyAsyncSession):
+            await value.release()
+        elif isinstance(value, LazySession):
+            value.release()
+
+
+def _release_sessions_after(endpoint: Callable) -> Callable:
+    """Wrap a route endpoint so the lazy sessions it received are released when it returns."""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_endpoint(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                await _release_all(kwargs.values())
+        return async_endpoint
+
+    @functools.wraps(endpoint)
+    def sync_endpoint(*args, **kwargs):
+        result = endpoint(*args, **kwargs)
+        # Sync endpoints run in a worker thread, release there as well. Sessions
+        # of endpoints that raised are rolled back by their dependency instead.
+        for value in kwargs.values():
+            if isinstance(value, LazySession):
+                value.release()
+        return result
+    return sync_endpoint
+
+
+# Status logged for requests abandoned by the client (nginx convention)
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+class UnitOfWorkRoute(APIRoute):
+    """
+    Route class that releases the endpoint's database sessions as soon as the
+    endpoint returns, before the response model is serialized. The sessions
+    are still closed by their dependency once the response has been sent.
+
+    GET requests to ``async def`` endpoints are cancelled when the client
+    disconnects; asyncpg then cancels the running query on the server and
+    the connection goes back to the pool. Sync endpoints run in a worker
+    thread that cannot be interrupted and are bounded by the statement
+    timeout only.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        self.cancel_on_disconnect = inspect.iscoroutinefunction(endpoint)
+        super().__init__(path, _release_sessions_after(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        handler = super().get_route_handler()
+        if not self.cancel_on_disconnect:
+            return handler
+
+        async def disconnect_aware_handler(request: Request) -> Response:
+            if request.method not in ("GET", "HEAD"):
+                return await handler(request)
+
+            work = asyncio.ensure_future(handler(request))
+            disconnect = asyncio.ensure_future(_wait_for_disconnect(request))
+            try:
+                await asyncio.wait({work, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+            except asyncio.CancelledError:
+                work.cancel()
+                raise
+            finally:
+                disconnect.cancel()
+
+            if not work.done():
+                work.cancel()
+                try:
+                    await work
+                except asyncio.CancelledError:
+                    pass
+                query_budget.record_disconnect(self.path_format)
+                return Response(status_code=CLIENT_CLOSED_REQUEST)
+            return work.result()
+
+        return disconnect_aware_handler
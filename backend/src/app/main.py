@@ -4,13 +4,18 @@ Main FastAPI application with improved architecture.
 from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.exc import DBAPIError, IntegrityError, SQLAlchemyError
 import logging
 import time
 
 from .core.config import settings
-from .core.database import init_db
-from .api import auth, cities, kpis, dashboards, mapdata
+from .core.database import init_db, async_engine, replicas
+from .core.http import keycloak_http
+from .core.jwks import jwks_cache
+from .core.partitions import kpi_value_partitions
+from .core.pagination import LINK_HEADER, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, TOTAL_ESTIMATED_HEADER
+from .core.query_budget import query_budget, is_statement_timeout, route_path
+from .api import auth, cities, kpis, dashboards, mapdata, metrics, public
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -38,6 +43,9 @@ app = FastAPI(
     ### Authentication
     Most endpoints require authentication. Use the `/auth/token` endpoint to get an access token,
     then include it in the Authorization header: `Bearer <your_token>`
+    
+    Public dashboards, their KPI values and map layers are also available without
+    authentication under `/public`.
     """
 )
 
@@ -48,6 +56,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, LINK_HEADER, TOTAL_COUNT_HEADER, TOTAL_ESTIMATED_HEADER],
 )
 
 
@@ -94,6 +103,26 @@ async def integrity_error_handler(request: Request, exc: IntegrityError):
     )
 
 
+@app.exception_handler(DBAPIError)
+async def dbapi_error_handler(request: Request, exc: DBAPIError):
+    """Handle driver errors; statement timeouts become 503."""
+    if not is_statement_timeout(exc):
+        return await sqlalchemy_error_handler(request, exc)
+    
+    path = route_path(request)
+    logger.warning(f"Statement timeout on {request.method} {path}")
+    query_budget.record_timeout(path)
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "5"},
+        content={
+            "error": "Service Unavailable",
+            "message": "Query exceeded its time budget",
+            "detail": "Narrow the date range or use a coarser aggregation period"
+        }
+    )
+
+
 @app.exception_handler(SQLAlchemyError)
 async def sqlalchemy_error_handler(request: Request, exc: SQLAlchemyError):
     """Handle general SQLAlchemy errors."""
@@ -127,6 +156,8 @@ app.include_router(cities.router)
 app.include_router(kpis.router)
 app.include_router(dashboards.router)
 app.include_router(mapdata.router)
+app.include_router(public.router)
+app.include_router(metrics.router)
 
 
 @app.on_event("startup")
@@ -142,6 +173,15 @@ async def startup_event():
         logger.error(f"Failed to initialize database: {e}")
         raise
     
+    # Keep the Keycloak signing keys warm off the request path
+    jwks_cache.start()
+    
+    # Re-admit read replicas after failures
+    replicas.start()
+    
+    # Create the kpi_values partitions of the coming months (DB_PARTITION_KPI_VALUES)
+    kpi_value_partitions.start(async_engine)
+    
     logger.info("Application startup completed")
 
 
@@ -149,6 +189,11 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown."""
     logger.info("Shutting down Climaborough API...")
+    await jwks_cache.stop()
+    await keycloak_http.aclose()
+    await replicas.stop()
+    await kpi_value_partitions.stop()
+    await async_engine.dispose()
 
 
 @app.get("/", summary="Root endpoint")
@@ -3,8 +3,8 @@ Improved database models with proper relationships and constraints.
 """
 from typing import List, Optional, Dict, Any
 from sqlalchemy import (
-    Column, Integer, String, Float, Boolean, DateTime, 
-    ForeignKey, Text, JSON, Index, UniqueConstraint
+    Column, Integer, BigInteger, String, Float, Boolean, DateTime, 
+    ForeignKey, Text, JSON, Index, UniqueConstraint, func, literal_column
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from datetime import datetime
@@ -129,6 +129,12 @@ class KPI(Base, TimestampMixin):
     values: Mapped[List["KPIValue"]] = relationship(
         "KPIValue", back_populates="kpi", cascade="all, delete-orphan"
     )
+    rollups: Mapped[List["KPIValueRollup"]] = relationship(
+        "KPIValueRollup", cascade="all, delete-orphan"
+    )
+    latest_value: Mapped[Optional["KPILatestValue"]] = relationship(
+        "KPILatestValue", cascade="all, delete-orphan"
+    )
     visualizations: Mapped[List["Visualization"]] = relationship(
         "Visualization", back_populates="kpi"
     )
@@ -155,11 +161,52 @@ class KPIValue(Base):
     
     # Composite indexes for efficient time series queries
     __table_args__ = (
-        Index("idx_kpivalue_kpi_timestamp", "kpi_id", "timestamp"),
+        # id breaks timestamp ties for keyset pagination on (timestamp, id)
+        Index("idx_kpivalue_kpi_timestamp", "kpi_id", "timestamp", "id"),
         Index("idx_kpivalue_timestamp_desc", "timestamp", postgresql_using="btree"),
     )
 
 
+# One value per (kpi_id, timestamp, category_label), values without a label
+# included; bulk ingestion skips rows that conflict with it
+KPI_VALUE_IDENTITY = Index(
+    "uq_kpivalue_kpi_timestamp_label",
+    KPIValue.kpi_id, KPIValue.timestamp, func.coalesce(KPIValue.category_label, literal_column("''")),
+    unique=True,
+)
+
+
+class KPIValueRollup(Base):
+    """
+    Pre-aggregated KPI values per calendar bucket (hour, day, week, month,
+    year), maintained on ingest. Values without a category label are rolled up
+    under an empty label so the key has no NULLs.
+    """
+    __tablename__ = "kpi_value_rollups"
+    
+    kpi_id: Mapped[int] = mapped_column(ForeignKey("kpis.id"), primary_key=True)
+    granularity: Mapped[str] = mapped_column(String(10), primary_key=True)
+    bucket: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    category_label: Mapped[str] = mapped_column(String(100), primary_key=True, default="")
+    sum: Mapped[float] = mapped_column(Float, nullable=False)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    min: Mapped[float] = mapped_column(Float, nullable=False)
+    max: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class KPILatestValue(Base):
+    """
+    Pointer to the latest value of each KPI (greatest timestamp, then id),
+    maintained on ingest so latest-value reads are key lookups. Reads join on
+    (value_id, timestamp) so a partitioned kpi_values is searched in one month.
+    """
+    __tablename__ = "kpi_latest_values"
+    
+    kpi_id: Mapped[int] = mapped_column(ForeignKey("kpis.id"), primary_key=True)
+    value_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    timestamp: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
 class Visualization(Base, TimestampMixin):
     """Base visualization model using table per class inheritance."""
     __tablename__ = "visualizations"
@@ -1,14 +1,23 @@
 """
 Specific repositories for each model.
 """
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, or_, select, text, tuple_
 from datetime import datetime, timedelta
 
 from .base import BaseRepository
+from .estimates import Explain, TotalCount, plan_rows, supports_estimates
+from . import latest_values
+from .ingest import insert_new_values
+from .rollups import (
+    ROLLUP_UNITS, aggregate_queries, backfill_statement, clear_statement,
+    merge_aggregates, rollup_deltas, upsert_statement
+)
+from .time_buckets import parse_bucket
+from ..core.database import replica_read
 from ..models import (
-    City, Dashboard, DashboardSection, KPI, KPIValue, Visualization,
+    City, Dashboard, DashboardSection, KPI, KPILatestValue, KPIValue, Visualization,
     LineChart, BarChart, PieChart, StatChart, Table, Map,
     TableColumn, MapData, WMS, GeoJson, FreeTextField, Timeline, TimelineEvent
 )
@@ -33,6 +42,31 @@ class CityRepository(BaseRepository[City, CityCreate, CityUpdate]):
         """Get city by name (case insensitive)."""
         return db.query(City).filter(func.lower(City.name) == func.lower(name)).first()
     
+    def get_codes_owning(self, db: Session, *, model: Any, ids: List[int]) -> List[str]:
+        """
+        Get the codes of the cities owning the given records of `model`
+        (the cities themselves, records with a `city_id`, or records of a dashboard).
+        """
+        query = db.query(City.code).distinct()
+        if model is City:
+            query = query.filter(City.id.in_(ids))
+        elif hasattr(model, "city_id"):
+            query = query.join(model, model.city_id == City.id).filter(model.id.in_(ids))
+        else:
+            query = query.join(Dashboard, Dashboard.city_id == City.id).join(
+                model, model.dashboard_id == Dashboard.id
+            ).filter(model.id.in_(ids))
+        return [row[0] for row in query.all()]
+    
+    def get_codes_owning_kpis(self, db: Session, *, ids: List[int], id_kpis: List[str]) -> List[str]:
+        """Get the codes of the cities owning the KPIs with any of the given database IDs or unique IDs."""
+        if not ids and not id_kpis:
+            return []
+        query = db.query(City.code).distinct().join(KPI, KPI.city_id == City.id).filter(
+            or_(KPI.id.in_(ids), KPI.id_kpi.in_(id_kpis))
+        )
+        return [row[0] for row in query.all()]
+    
     def get_with_stats(self, db: Session, *, city_id: int) -> Optional[Dict[str, Any]]:
         """Get city with dashboard and KPI counts."""
         city = self.get(db, city_id)
@@ -130,6 +164,12 @@ class KPIRepository(BaseRepository[KPI, KPICreate, KPIUpdate]):
         """Get KPI by its unique ID."""
         return db.query(KPI).filter(KPI.id_kpi == id_kpi).first()
     
+    def get_by_references(self, db: Session, *, ids: List[int], id_kpis: List[str]) -> List[KPI]:
+        """Get the KPIs with any of the given database IDs or unique IDs, in one query."""
+        if not ids and not id_kpis:
+            return []
+        return db.query(KPI).filter(or_(KPI.id.in_(ids), KPI.id_kpi.in_(id_kpis))).all()
+    
     def get_by_city_and_category(
         self, 
         db: Session, 
@@ -163,9 +203,11 @@ class KPIRepository(BaseRepository[KPI, KPICreate, KPIUpdate]):
         if not kpi:
             return None
         
-        latest_value = db.query(KPIValue).filter(
-            KPIValue.kpi_id == kpi_id
-        ).order_by(KPIValue.timestamp.desc()).first()
+        latest_value = db.query(KPIValue).join(
+            KPILatestValue, and_(
+                KPILatestValue.value_id == KPIValue.id, KPILatestValue.timestamp == KPIValue.timestamp
+            )
+        ).filter(KPILatestValue.kpi_id == kpi_id).first()
         
         return {
             "kpi": kpi,
@@ -179,6 +221,7 @@ class KPIValueRepository(BaseRepository[KPIValue, KPIValueCreate, None]):
     def __init__(self):
         super().__init__(KPIValue)
     
+    @replica_read
     def get_by_kpi_and_timerange(
         self,
         db: Session,
@@ -188,9 +231,15 @@ class KPIValueRepository(BaseRepository[KPIValue, KPIValueCreate, None]):
         end_date: Optional[datetime] = None,
         category_label: Optional[str] = None,
         limit: int = 1000,
-        offset: int = 0
+        offset: int = 0,
+        after: Optional[Tuple[datetime, int]] = None
     ) -> List[KPIValue]:
-        """Get KPI values within time range."""
+        """
+        Get KPI values within time range, ordered by (timestamp, id).
+        
+        `after` is a keyset position: only values past that (timestamp, id)
+        are returned, so deep pages cost the same as the first one.
+        """
         query = db.query(KPIValue).filter(KPIValue.kpi_id == kpi_id)
         
         if start_date:
@@ -202,79 +251,151 @@ class KPIValueRepository(BaseRepository[KPIValue, KPIValueCreate, None]):
         if category_label:
             query = query.filter(KPIValue.category_label == category_label)
         
-        return query.order_by(KPIValue.timestamp).offset(offset).limit(limit).all()
+        if after is not None:
+            query = query.filter(tuple_(KPIValue.timestamp, KPIValue.id) > tuple_(*after))
+        
+        return query.order_by(KPIValue.timestamp, KPIValue.id).offset(offset).limit(limit).all()
+    
+    @replica_read
+    def count_by_kpi_and_timerange(
+        self,
+        db: Session,
+        *,
+        kpi_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_label: Optional[str] = None,
+        estimate_above: int = 0
+    ) -> TotalCount:
+        """
+        Count the KPI values `get_by_kpi_and_timerange` pages through.
+        
+        On PostgreSQL, when the planner expects at least `estimate_above` rows
+        (0 disables), its estimate is returned instead of counting them.
+        """
+        conditions = [KPIValue.kpi_id == kpi_id]
+        
+        if start_date:
+            conditions.append(KPIValue.timestamp >= start_date)
+        
+        if end_date:
+            conditions.append(KPIValue.timestamp <= end_date)
+        
+        if category_label:
+            conditions.append(KPIValue.category_label == category_label)
+        
+        if estimate_above > 0 and supports_estimates(db.get_bind().dialect.name):
+            plan = db.execute(Explain(select(KPIValue.id).where(*conditions))).scalar()
+            estimate = plan_rows(plan)
+            if estimate is not None and estimate >= estimate_above:
+                return TotalCount(estimate, estimated=True)
+        
+        return TotalCount(db.query(func.count(KPIValue.id)).filter(*conditions).scalar())
     
     def get_latest_by_kpi(self, db: Session, *, kpi_id: int) -> Optional[KPIValue]:
-        """Get the latest value for a KPI."""
-        return db.query(KPIValue).filter(
-            KPIValue.kpi_id == kpi_id
-        ).order_by(KPIValue.timestamp.desc()).first()
+        """Get the latest value for a KPI (a key lookup in kpi_latest_values)."""
+        return db.query(KPIValue).join(
+            KPILatestValue, and_(
+                KPILatestValue.value_id == KPIValue.id, KPILatestValue.timestamp == KPIValue.timestamp
+            )
+        ).filter(KPILatestValue.kpi_id == kpi_id).first()
     
+    @replica_read
     def get_aggregated_by_period(
         self,
         db: Session,
         *,
         kpi_id: int,
-        period: str = "day",  # day, week, month, year
+        period: str = "day",  # hour, day, week, month, year or a fixed width (e.g. 15min)
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None
     ) -> List[Dict[str, Any]]:
-        """Get aggregated KPI values by time period."""
+        """Get aggregated KPI values by time period (ValueError for an unknown period)."""
         if not start_date:
             start_date = datetime.utcnow() - timedelta(days=30)
         if not end_date:
             end_date = datetime.utcnow()
         
-        # PostgreSQL date_trunc function
-        if period == "day":
-            trunc_field = func.date_trunc('day', KPIValue.timestamp)
-        elif period == "week":
-            trunc_field = func.date_trunc('week', KPIValue.timestamp)
-        elif period == "month":
-            trunc_field = func.date_trunc('month', KPIValue.timestamp)
-        elif period == "year":
-            trunc_field = func.date_trunc('year', KPIValue.timestamp)
-        else:
-            trunc_field = func.date_trunc('day', KPIValue.timestamp)
-        
-        result = db.query(
-            trunc_field.label('period'),
-            func.avg(KPIValue.value).label('avg_value'),
-            func.min(KPIValue.value).label('min_value'),
-            func.max(KPIValue.value).label('max_value'),
-            func.count(KPIValue.id).label('count')
-        ).filter(
-            and_(
-                KPIValue.kpi_id == kpi_id,
-                KPIValue.timestamp >= start_date,
-                KPIValue.timestamp <= end_date
-            )
-        ).group_by(trunc_field).order_by(trunc_field).all()
-        
-        return [
-            {
-                "period": row.period,
-                "avg_value": float(row.avg_value) if row.avg_value else 0,
-                "min_value": float(row.min_value) if row.min_value else 0,
-                "max_value": float(row.max_value) if row.max_value else 0,
-                "count": row.count
-            }
-            for row in result
-        ]
+        queries = aggregate_queries(parse_bucket(period), kpi_id, start_date, end_date)
+        return merge_aggregates(row for query in queries for row in db.execute(query))
+    
+    def create(self, db: Session, *, obj_in: KPIValueCreate) -> KPIValue:
+        """Create a KPI value and record it in the rollups and latest values in the same transaction."""
+        obj_in_data = obj_in.dict() if hasattr(obj_in, 'dict') else obj_in
+        db_obj = KPIValue(**obj_in_data)
+        db.add(db_obj)
+        db.flush()
+        self._record_inserted(db, [{
+            "id": db_obj.id, "kpi_id": db_obj.kpi_id, "timestamp": db_obj.timestamp,
+            "value": db_obj.value, "category_label": db_obj.category_label
+        }])
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
     
     def bulk_create(self, db: Session, *, values: List) -> int:
-        """Bulk create KPI values."""
-        db_objects = []
+        """
+        Bulk create KPI values in one set-based INSERT, skipping values whose
+        (kpi_id, timestamp, category_label) is already stored. Returns the
+        number of values inserted.
+        """
+        # Handle both Pydantic objects and dictionaries
+        rows = []
         for value in values:
-            # Handle both Pydantic objects and dictionaries
-            if isinstance(value, dict):
-                db_objects.append(KPIValue(**value))
-            else:
-                db_objects.append(KPIValue(**value.dict()))
+            value = value if isinstance(value, dict) else value.dict()
+            rows.append({
+                "kpi_id": value["kpi_id"],
+                "timestamp": value["timestamp"],
+                "value": value["value"],
+                "category_label": value.get("category_label"),
+            })
         
-        db.add_all(db_objects)
+        return len(self.bulk_insert(db, values=rows))
+    
+    def bulk_insert(self, db: Session, *, values: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Insert value dicts (kpi_id, timestamp, value, category_label) of any
+        number of KPIs in one transaction, skipping duplicates; returns the
+        rows inserted.
+        """
+        inserted = insert_new_values(db, values)
+        self._record_inserted(db, inserted)
         db.commit()
-        return len(db_objects)
+        return inserted
+    
+    def _record_inserted(self, db: Session, values: List[Dict[str, Any]]) -> None:
+        """Fold newly inserted values (dicts with id) into the rollups and latest values."""
+        if not values:
+            return
+        dialect_name = db.get_bind().dialect.name
+        db.execute(upsert_statement(dialect_name), rollup_deltas(values))
+        db.execute(latest_values.upsert_statement(dialect_name), latest_values.latest_candidates(values))
+    
+    def rebuild_rollups(self, db: Session, *, kpi_ids: Optional[List[int]] = None) -> int:
+        """
+        Recompute the rollups of the given KPIs (all if None) from their raw
+        values and return the number of rollup rows written.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            # Ingests wait instead of upserting into rows being rebuilt; the
+            # deltas of values committed after the backfill read are applied after it
+            db.execute(text("LOCK TABLE kpi_value_rollups IN EXCLUSIVE MODE"))
+        db.execute(clear_statement(kpi_ids))
+        written = sum(db.execute(backfill_statement(unit, kpi_ids)).rowcount for unit in ROLLUP_UNITS)
+        db.commit()
+        return written
+    
+    def rebuild_latest_values(self, db: Session, *, kpi_ids: Optional[List[int]] = None) -> int:
+        """
+        Recompute the latest value of the given KPIs (all if None) from their
+        raw values and return the number of KPIs that have one.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("LOCK TABLE kpi_latest_values IN EXCLUSIVE MODE"))
+        db.execute(latest_values.clear_statement(kpi_ids))
+        written = db.execute(latest_values.backfill_statement(kpi_ids)).rowcount
+        db.commit()
+        return written
 
 
 class VisualizationRepository(BaseRepository[Visualization, VisualizationCreate, VisualizationUpdate]):
@@ -407,6 +528,7 @@ class MapDataRepository(BaseRepository[MapData, None, None]):
     def __init__(self):
         super().__init__(MapData)
     
+    @replica_read
     def get_by_city(self, db: Session, *, city_id: int, active_only: bool = True) -> List[MapData]:
         """Get map data by city."""
         query = db.query(MapData).filter(MapData.city_id == city_id)
@@ -430,4 +552,9 @@ pie_chart_repo = PieChartRepository()
 stat_chart_repo = StatChartRepository()
 table_repo = TableRepository()
 map_repo = MapRepository()
-map_data_repo = MapDataRepository()
\ No newline at end of file
+map_data_repo = MapDataRepository()
+
+from .async_repositories import (  # noqa: E402
+    async_city_repo, async_dashboard_repo, async_section_repo, async_kpi_repo,
+    async_kpi_value_repo, async_visualization_repo, async_map_data_repo
+)
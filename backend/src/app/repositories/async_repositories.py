@@ -0,0 +1,524 @@
+"""
+Async repositories (AsyncSession) mirroring the sync repositories.
+
+Used by the hot read routes so they run on the event loop instead of
+holding a threadpool thread while waiting on the database. They only read:
+writes go through the sync repositories, which also maintain the tables
+derived from KPI values (rollups, latest values).
+"""
+from typing import AsyncIterator, List, Optional, Dict, Any, Sequence, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, with_polymorphic
+from sqlalchemy import Row, select, func, and_, or_, tuple_, literal, union_all
+from sqlalchemy.sql import Select
+from datetime import datetime, timedelta
+
+from .base import AsyncBaseRepository
+from .estimates import Explain, TotalCount, plan_rows, supports_estimates
+from .rollups import aggregate_queries, merge_aggregates
+from .time_buckets import parse_bucket
+from ..core.database import replica_read
+from ..models import (
+    City, Dashboard, DashboardSection, KPI, KPILatestValue, KPIValue, Visualization, MapData
+)
+from ..schemas import (
+    CityCreate, CityUpdate, DashboardCreate, DashboardUpdate,
+    DashboardSectionCreate, DashboardSectionUpdate,
+    KPICreate, KPISeriesSpec, KPIUpdate, KPIValueCreate, VisualizationCreate, VisualizationUpdate
+)
+
+# Load every visualization / map layer subclass (and the collections their
+# response schemas include) in the same round trip
+AnyVisualizationEntity = with_polymorphic(Visualization, "*")
+AnyMapDataEntity = with_polymorphic(MapData, "*")
+
+
+class AsyncCityRepository(AsyncBaseRepository[City, CityCreate, CityUpdate]):
+    """Async repository for City model."""
+
+    def __init__(self):
+        super().__init__(City)
+
+    async def get_by_code(self, db: AsyncSession, *, code: str) -> Optional[City]:
+        """Get city by code."""
+        result = await db.execute(select(City).where(City.code == code))
+        return result.scalars().first()
+
+    async def get_by_name(self, db: AsyncSession, *, name: str) -> Optional[City]:
+        """Get city by name (case insensitive)."""
+        result = await db.execute(select(City).where(func.lower(City.name) == func.lower(name)))
+        return result.scalars().first()
+
+    async def has_public_dashboard(self, db: AsyncSession, *, city_id: int) -> bool:
+        """Whether the city has at least one public dashboard."""
+        stmt = select(
+            select(Dashboard.id).where(
+                and_(Dashboard.city_id == city_id, Dashboard.is_public == True)
+            ).exists()
+        )
+        return (await db.execute(stmt)).scalar()
+
+
+class AsyncDashboardRepository(AsyncBaseRepository[Dashboard, DashboardCreate, DashboardUpdate]):
+    """Async repository for Dashboard model."""
+
+    def __init__(self):
+        super().__init__(Dashboard)
+
+    def _select(self) -> Select:
+        return select(Dashboard).options(
+            selectinload(Dashboard.city), selectinload(Dashboard.sections)
+        )
+
+    async def get_by_city_code(self, db: AsyncSession, *, city_code: str) -> Optional[Dashboard]:
+        """Get dashboard by city code."""
+        result = await db.execute(self._select().join(City).where(City.code == city_code))
+        return result.scalars().first()
+
+    async def get_public(self, db: AsyncSession, *, dashboard_id: int) -> Optional[Dashboard]:
+        """Get a dashboard by ID only if it is public."""
+        result = await db.execute(self._select().where(
+            and_(Dashboard.id == dashboard_id, Dashboard.is_public == True)
+        ))
+        return result.scalars().first()
+
+    async def get_public_by_city_code(self, db: AsyncSession, *, city_code: str) -> List[Dashboard]:
+        """Get all public dashboards for a city by city code."""
+        result = await db.execute(self._select().join(City).where(
+            and_(City.code == city_code, Dashboard.is_public == True)
+        ).order_by(Dashboard.id))
+        return list(result.scalars().all())
+
+
+class AsyncSectionRepository(AsyncBaseRepository[DashboardSection, DashboardSectionCreate, DashboardSectionUpdate]):
+    """Async repository for DashboardSection model."""
+
+    def __init__(self):
+        super().__init__(DashboardSection)
+
+    async def get_by_dashboard(self, db: AsyncSession, *, dashboard_id: int) -> List[DashboardSection]:
+        """Get all sections for a dashboard ordered by order."""
+        result = await db.execute(select(DashboardSection).where(
+            DashboardSection.dashboard_id == dashboard_id
+        ).order_by(DashboardSection.order, DashboardSection.id))
+        return list(result.scalars().all())
+
+    async def get_by_dashboard_and_name(self, db: AsyncSession, *, dashboard_id: int, name: str) -> Optional[DashboardSection]:
+        """Get section by dashboard and name."""
+        result = await db.execute(select(DashboardSection).where(
+            and_(
+                DashboardSection.dashboard_id == dashboard_id,
+                DashboardSection.name == name
+            )
+        ))
+        return result.scalars().first()
+
+    async def get_max_order(self, db: AsyncSession, *, dashboard_id: int) -> Optional[int]:
+        """Get the maximum order value for sections in a dashboard."""
+        result = await db.execute(select(func.max(DashboardSection.order)).where(
+            DashboardSection.dashboard_id == dashboard_id
+        ))
+        return result.scalar()
+
+
+class AsyncKPIRepository(AsyncBaseRepository[KPI, KPICreate, KPIUpdate]):
+    """Async repository for KPI model."""
+
+    def __init__(self):
+        super().__init__(KPI)
+
+    def _select(self) -> Select:
+        return select(KPI).options(selectinload(KPI.city))
+
+    async def get_by_kpi_id(self, db: AsyncSession, *, id_kpi: str) -> Optional[KPI]:
+        """Get KPI by its unique ID."""
+        result = await db.execute(self._select().where(KPI.id_kpi == id_kpi))
+        return result.scalars().first()
+
+    async def get_by_city_and_category(
+        self,
+        db: AsyncSession,
+        *,
+        city_id: int,
+        category: Optional[str] = None,
+        active_only: bool = True
+    ) -> List[KPI]:
+        """Get KPIs by city and optionally category."""
+        stmt = self._select().where(KPI.city_id == city_id)
+
+        if active_only:
+            stmt = stmt.where(KPI.is_active == True)
+
+        if category:
+            stmt = stmt.where(KPI.category == category)
+
+        return list((await db.execute(stmt)).scalars().all())
+
+    async def get_categories_by_city(self, db: AsyncSession, *, city_id: int) -> List[str]:
+        """Get all KPI categories for a city."""
+        result = await db.execute(select(KPI.category).where(
+            and_(KPI.city_id == city_id, KPI.is_active == True)
+        ).distinct())
+        return list(result.scalars().all())
+
+    async def exists_by_id(self, db: AsyncSession, *, kpi_id: int) -> bool:
+        """Whether a KPI with this ID exists (without loading it)."""
+        result = await db.execute(select(KPI.id).where(KPI.id == kpi_id))
+        return result.first() is not None
+
+    async def get_existing_ids(self, db: AsyncSession, *, kpi_ids: Sequence[int]) -> List[int]:
+        """The IDs among `kpi_ids` that belong to a KPI, in one query."""
+        result = await db.execute(select(KPI.id).where(KPI.id.in_(kpi_ids)))
+        return list(result.scalars().all())
+
+    async def is_on_public_dashboard(self, db: AsyncSession, *, kpi_id: int) -> bool:
+        """Whether an active KPI is shown by any visualization on a public dashboard."""
+        stmt = select(
+            select(Visualization.id).join(Dashboard).join(KPI, Visualization.kpi_id == KPI.id).where(
+                and_(
+                    Visualization.kpi_id == kpi_id,
+                    Dashboard.is_public == True,
+                    KPI.is_active == True
+                )
+            ).exists()
+        )
+        return (await db.execute(stmt)).scalar()
+
+
+class AsyncKPIValueRepository(AsyncBaseRepository[KPIValue, KPIValueCreate, None]):
+    """Async repository for KPIValue model."""
+
+    def __init__(self):
+        super().__init__(KPIValue)
+
+    @replica_read
+    async def get_by_kpi_and_timerange(
+        self,
+        db: AsyncSession,
+        *,
+        kpi_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_label: Optional[str] = None,
+        limit: int = 1000,
+        offset: int = 0,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[KPIValue]:
+        """
+        Get KPI values within time range, ordered by (timestamp, id).
+
+        `after` is a keyset position: only values past that (timestamp, id)
+        are returned, so deep pages cost the same as the first one.
+        """
+        stmt = self._page(
+            select(KPIValue), kpi_id, start_date, end_date, category_label, limit, offset, after
+        )
+        return list((await db.execute(stmt)).scalars().all())
+
+    @replica_read
+    async def get_rows_by_kpi_and_timerange(
+        self,
+        db: AsyncSession,
+        *,
+        kpi_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_label: Optional[str] = None,
+        limit: int = 1000,
+        offset: int = 0,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[Row]:
+        """
+        Same page as `get_by_kpi_and_timerange` as (id, timestamp, value,
+        category_label) rows, without loading ORM objects.
+        """
+        stmt = self._page(
+            select(KPIValue.id, KPIValue.timestamp, KPIValue.value, KPIValue.category_label),
+            kpi_id, start_date, end_date, category_label, limit, offset, after
+        )
+        return list((await db.execute(stmt)).all())
+
+    @replica_read
+    async def get_pages_by_kpis(self, db: AsyncSession, *, pages: Sequence[KPISeriesSpec]) -> List[Row]:
+        """
+        The first `limit` values of each range as (kpi_id, id, timestamp,
+        value, category_label) rows, in one query: a UNION ALL of per-range
+        index scans, each stopping at its own limit. Rows come grouped by range
+        in request order, then by (timestamp, id).
+        """
+        columns = (KPIValue.kpi_id, KPIValue.id, KPIValue.timestamp, KPIValue.value, KPIValue.category_label)
+        branches = [
+            select(*self._page(
+                select(literal(index).label("range_index"), *columns),
+                page.kpi_id, page.start_date, page.end_date, page.category_label, page.limit, 0, None
+            ).subquery().c)
+            for index, page in enumerate(pages)
+        ]
+        pages_query = union_all(*branches).subquery()
+        result = await db.execute(
+            select(*[pages_query.c[column.key] for column in columns]).order_by(
+                pages_query.c.range_index, pages_query.c.timestamp, pages_query.c.id
+            )
+        )
+        return list(result.all())
+
+    @staticmethod
+    def _page(
+        stmt: Select,
+        kpi_id: int,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_label: Optional[str],
+        limit: int,
+        offset: int,
+        after: Optional[Tuple[datetime, int]]
+    ) -> Select:
+        stmt = stmt.where(KPIValue.kpi_id == kpi_id)
+
+        if start_date:
+            stmt = stmt.where(KPIValue.timestamp >= start_date)
+
+        if end_date:
+            stmt = stmt.where(KPIValue.timestamp <= end_date)
+
+        if category_label:
+            stmt = stmt.where(KPIValue.category_label == category_label)
+
+        if after is not None:
+            stmt = stmt.where(tuple_(KPIValue.timestamp, KPIValue.id) > tuple_(*after))
+
+        return stmt.order_by(KPIValue.timestamp, KPIValue.id).offset(offset).limit(limit)
+
+    @replica_read
+    async def count_by_kpi_and_timerange(
+        self,
+        db: AsyncSession,
+        *,
+        kpi_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_label: Optional[str] = None,
+        estimate_above: int = 0
+    ) -> TotalCount:
+        """
+        Count the KPI values `get_by_kpi_and_timerange` pages through.
+
+        On PostgreSQL, when the planner expects at least `estimate_above` rows
+        (0 disables), its estimate is returned instead of counting them.
+        """
+        conditions = [KPIValue.kpi_id == kpi_id]
+
+        if start_date:
+            conditions.append(KPIValue.timestamp >= start_date)
+
+        if end_date:
+            conditions.append(KPIValue.timestamp <= end_date)
+
+        if category_label:
+            conditions.append(KPIValue.category_label == category_label)
+
+        if estimate_above > 0 and supports_estimates(db.get_bind().dialect.name):
+            plan = (await db.execute(Explain(select(KPIValue.id).where(*conditions)))).scalar()
+            estimate = plan_rows(plan)
+            if estimate is not None and estimate >= estimate_above:
+                return TotalCount(estimate, estimated=True)
+
+        stmt = select(func.count()).select_from(KPIValue).where(*conditions)
+        return TotalCount((await db.execute(stmt)).scalar())
+
+    @replica_read
+    async def get_series_by_kpi_and_timerange(
+        self,
+        db: AsyncSession,
+        *,
+        kpi_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_label: Optional[str] = None
+    ) -> List[Tuple[datetime, float]]:
+        """Get (timestamp, value) rows of a KPI in time order, without loading ORM objects."""
+        stmt = select(KPIValue.timestamp, KPIValue.value).where(KPIValue.kpi_id == kpi_id)
+
+        if start_date:
+            stmt = stmt.where(KPIValue.timestamp >= start_date)
+
+        if end_date:
+            stmt = stmt.where(KPIValue.timestamp <= end_date)
+
+        if category_label:
+            stmt = stmt.where(KPIValue.category_label == category_label)
+
+        result = await db.execute(stmt.order_by(KPIValue.timestamp))
+        return [tuple(row) for row in result]
+
+    @replica_read
+    async def get_series_by_kpis(
+        self, db: AsyncSession, *, ranges: Sequence[KPISeriesSpec]
+    ) -> Dict[int, List[Tuple[datetime, float]]]:
+        """
+        (timestamp, value) rows of several KPIs, each within its own range,
+        in one query; keyed by KPI ID, in time order.
+        """
+        conditions = []
+        for series in ranges:
+            condition = [KPIValue.kpi_id == series.kpi_id]
+            if series.start_date:
+                condition.append(KPIValue.timestamp >= series.start_date)
+            if series.end_date:
+                condition.append(KPIValue.timestamp <= series.end_date)
+            if series.category_label:
+                condition.append(KPIValue.category_label == series.category_label)
+            conditions.append(and_(*condition))
+
+        result = await db.execute(
+            select(KPIValue.kpi_id, KPIValue.timestamp, KPIValue.value).where(
+                or_(*conditions)
+            ).order_by(KPIValue.kpi_id, KPIValue.timestamp)
+        )
+        series_by_kpi: Dict[int, List[Tuple[datetime, float]]] = {series.kpi_id: [] for series in ranges}
+        for kpi_id, timestamp, value in result:
+            series_by_kpi[kpi_id].append((timestamp, value))
+        return series_by_kpi
+
+    async def stream_by_kpi_and_timerange(
+        self,
+        db: AsyncSession,
+        *,
+        kpi_id: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_label: Optional[str] = None,
+        batch_size: int = 5000
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Yield (timestamp, value, category_label) rows of a KPI in time order,
+        `batch_size` at a time, from a server-side cursor. Only one batch is
+        held in memory, however long the range.
+        """
+        stmt = select(
+            KPIValue.timestamp, KPIValue.value, KPIValue.category_label
+        ).where(KPIValue.kpi_id == kpi_id)
+
+        if start_date:
+            stmt = stmt.where(KPIValue.timestamp >= start_date)
+
+        if end_date:
+            stmt = stmt.where(KPIValue.timestamp <= end_date)
+
+        if category_label:
+            stmt = stmt.where(KPIValue.category_label == category_label)
+
+        stmt = stmt.order_by(KPIValue.timestamp, KPIValue.id).execution_options(yield_per=batch_size)
+        result = await db.stream(stmt)
+        try:
+            async for rows in result.partitions():
+                yield rows
+        finally:
+            await result.close()
+
+    async def get_latest_by_kpi(self, db: AsyncSession, *, kpi_id: int) -> Optional[KPIValue]:
+        """Get the latest value for a KPI (a key lookup in kpi_latest_values)."""
+        result = await db.execute(select(KPIValue).join(
+            KPILatestValue, and_(
+                KPILatestValue.value_id == KPIValue.id, KPILatestValue.timestamp == KPIValue.timestamp
+            )
+        ).where(KPILatestValue.kpi_id == kpi_id))
+        return result.scalars().first()
+
+    async def get_latest_by_city(self, db: AsyncSession, *, city_id: int) -> List[KPIValue]:
+        """Get the latest value of every KPI of a city that has one, in one query."""
+        result = await db.execute(select(KPIValue).join(
+            KPILatestValue, and_(
+                KPILatestValue.value_id == KPIValue.id, KPILatestValue.timestamp == KPIValue.timestamp
+            )
+        ).join(
+            KPI, KPI.id == KPILatestValue.kpi_id
+        ).where(KPI.city_id == city_id).order_by(KPI.id))
+        return list(result.scalars().all())
+
+    @replica_read
+    async def get_aggregated_by_period(
+        self,
+        db: AsyncSession,
+        *,
+        kpi_id: int,
+        period: str = "day",  # hour, day, week, month, year or a fixed width (e.g. 15min)
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Get aggregated KPI values by time period (ValueError for an unknown period)."""
+        if not start_date:
+            start_date = datetime.utcnow() - timedelta(days=30)
+        if not end_date:
+            end_date = datetime.utcnow()
+
+        queries = aggregate_queries(parse_bucket(period), kpi_id, start_date, end_date)
+        rows = []
+        for query in queries:
+            rows.extend((await db.execute(query)).all())
+        return merge_aggregates(rows)
+
+
+class AsyncVisualizationRepository(AsyncBaseRepository[Visualization, VisualizationCreate, VisualizationUpdate]):
+    """Async repository for Visualization model."""
+
+    def __init__(self):
+        super().__init__(Visualization)
+
+    def _select(self) -> Select:
+        return select(AnyVisualizationEntity).options(
+            selectinload(AnyVisualizationEntity.Table.columns),
+            selectinload(AnyVisualizationEntity.Timeline.events)
+        )
+
+    async def get_by_dashboard(self, db: AsyncSession, *, dashboard_id: int) -> List[Visualization]:
+        """Get all visualizations for a dashboard."""
+        result = await db.execute(self._select().where(
+            AnyVisualizationEntity.dashboard_id == dashboard_id
+        ))
+        return list(result.scalars().all())
+
+    async def get_by_city_code(self, db: AsyncSession, *, city_code: str) -> List[Visualization]:
+        """Get all visualizations for a city by city code."""
+        result = await db.execute(
+            self._select().join(Dashboard, AnyVisualizationEntity.dashboard_id == Dashboard.id)
+            .join(City).where(City.code == city_code)
+        )
+        return list(result.scalars().all())
+
+    async def get_by_section(self, db: AsyncSession, *, section_id: int) -> List[Visualization]:
+        """Get all visualizations for a section."""
+        result = await db.execute(self._select().where(
+            AnyVisualizationEntity.section_id == section_id
+        ))
+        return list(result.scalars().all())
+
+
+class AsyncMapDataRepository(AsyncBaseRepository[MapData, None, None]):
+    """Async repository for MapData (WMS and GeoJSON layers)."""
+
+    def __init__(self):
+        super().__init__(MapData)
+
+    def _select(self) -> Select:
+        return select(AnyMapDataEntity)
+
+    @replica_read
+    async def get_by_city(self, db: AsyncSession, *, city_id: int, active_only: bool = True) -> List[MapData]:
+        """Get map data by city."""
+        stmt = self._select().where(AnyMapDataEntity.city_id == city_id)
+
+        if active_only:
+            stmt = stmt.where(AnyMapDataEntity.is_active == True)
+
+        return list((await db.execute(stmt)).scalars().all())
+
+
+# Async repository instances (singletons)
+async_city_repo = AsyncCityRepository()
+async_dashboard_repo = AsyncDashboardRepository()
+async_section_repo = AsyncSectionRepository()
+async_kpi_repo = AsyncKPIRepository()
+async_kpi_value_repo = AsyncKPIValueRepository()
+async_visualization_repo = AsyncVisualizationRepository()
+async_map_data_repo = AsyncMapDataRepository()
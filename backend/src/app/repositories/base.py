@@ -3,10 +3,12 @@ Base repository with common CRUD operations.
 """
 from typing import Generic, TypeVar, Type, List, Optional, Any, Dict
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, asc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, desc, asc, func, select
+from sqlalchemy.sql import Select
 from datetime import datetime
 
-from ..core.database import Base
+from ..core.database import Base, replica_read
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType")
@@ -20,10 +22,12 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         """Initialize repository with model class."""
         self.model = model
     
+    @replica_read
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
         """Get single record by ID."""
         return db.query(self.model).filter(self.model.id == id).first()
     
+    @replica_read
     def get_multi(
         self,
         db: Session,
@@ -118,4 +122,74 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             if hasattr(self.model, key):
                 query = query.filter(getattr(self.model, key) == value)
         
-        return query.first() is not None
\ No newline at end of file
+        return query.first() is not None
+
+
+class AsyncBaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    """
+    Async counterpart of BaseRepository's reads for use with an AsyncSession.
+    
+    Async sessions cannot lazy-load, so subclasses that return objects with
+    relationships used by the response schema eager-load them in `_select`.
+    """
+    
+    def __init__(self, model: Type[ModelType]):
+        """Initialize repository with model class."""
+        self.model = model
+    
+    def _select(self) -> Select:
+        """Base SELECT for this model (override to add eager loading)."""
+        return select(self.model)
+    
+    def _apply_filters(self, stmt: Select, filters: Optional[Dict[str, Any]]) -> Select:
+        if filters:
+            for key, value in filters.items():
+                if hasattr(self.model, key) and value is not None:
+                    if isinstance(value, str):
+                        stmt = stmt.where(getattr(self.model, key).ilike(f"%{value}%"))
+                    else:
+                        stmt = stmt.where(getattr(self.model, key) == value)
+        return stmt
+    
+    @replica_read
+    async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        """Get single record by ID."""
+        result = await db.execute(self._select().where(self.model.id == id))
+        return result.scalars().first()
+    
+    @replica_read
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        filters: Optional[Dict[str, Any]] = None,
+        order_by: Optional[str] = None,
+        order_desc: bool = False
+    ) -> List[ModelType]:
+        """Get multiple records with filtering and pagination."""
+        stmt = self._apply_filters(self._select(), filters)
+        
+        # Apply ordering
+        if order_by and hasattr(self.model, order_by):
+            order_column = getattr(self.model, order_by)
+            stmt = stmt.order_by(desc(order_column) if order_desc else asc(order_column))
+        
+        result = await db.execute(stmt.offset(skip).limit(limit))
+        return list(result.scalars().all())
+    
+    async def count(self, db: AsyncSession, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Count records with optional filtering."""
+        stmt = self._apply_filters(select(func.count(self.model.id)), filters)
+        return (await db.execute(stmt)).scalar()
+    
+    async def exists(self, db: AsyncSession, **filters) -> bool:
+        """Check if record exists with given filters."""
+        stmt = select(self.model.id)
+        
+        for key, value in filters.items():
+            if hasattr(self.model, key):
+                stmt = stmt.where(getattr(self.model, key) == value)
+        
+        return (await db.execute(stmt.limit(1))).first() is not None
@@ -0,0 +1,53 @@
+"""
+Planner row estimates for counts that are too expensive to run exactly.
+
+``Explain`` wraps a SELECT in ``EXPLAIN (FORMAT JSON)`` on PostgreSQL; the
+top plan node's ``Plan Rows`` is the planner's estimate of how many rows the
+statement returns, read from table statistics without touching the rows.
+"""
+import json
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.expression import ClauseElement, Select
+
+
+class TotalCount(NamedTuple):
+    """Number of rows matching a query; ``estimated`` if it comes from the planner."""
+    value: int
+    estimated: bool = False
+
+
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON)`` of a statement (PostgreSQL only)."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_default(element: Explain, compiler, **kw) -> str:
+    raise CompileError(f"Row estimates are not supported on {compiler.dialect.name}")
+
+
+@compiles(Explain, "postgresql")
+def _compile_postgresql(element: Explain, compiler, **kw) -> str:
+    return f"EXPLAIN (FORMAT JSON) {compiler.process(element.statement, **kw)}"
+
+
+def supports_estimates(dialect_name: str) -> bool:
+    return dialect_name == "postgresql"
+
+
+def plan_rows(plan: Any) -> Optional[int]:
+    """Row estimate of an ``EXPLAIN (FORMAT JSON)`` result (a JSON string or the decoded list)."""
+    if isinstance(plan, (str, bytes)):
+        plan = json.loads(plan)
+    try:
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,38 @@
+"""
+Set-based ingestion of KPI values.
+
+New values are written with one multi-row ``INSERT ... ON CONFLICT DO
+NOTHING`` per batch (SQLAlchemy splits large parameter lists into multi-row
+VALUES statements). Rows matching an existing value on ``(kpi_id, timestamp,
+category_label)`` are skipped by the database, and ``RETURNING`` reports the
+rows actually inserted so the rollups and latest values only see those.
+"""
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Insert
+
+from ..models import KPI_VALUE_IDENTITY, KPIValue
+
+# Columns returned for each inserted row (the input of rollup_deltas and latest_candidates)
+INSERTED_COLUMNS = (KPIValue.id, KPIValue.kpi_id, KPIValue.timestamp, KPIValue.value, KPIValue.category_label)
+
+
+def insert_new_values_statement(dialect_name: str) -> Insert:
+    """INSERT of KPI values that skips duplicates and returns the inserted rows."""
+    if dialect_name == "postgresql":
+        stmt = postgresql.insert(KPIValue)
+    elif dialect_name == "sqlite":
+        stmt = sqlite.insert(KPIValue)
+    else:
+        raise NotImplementedError(f"Bulk ingestion is not supported on {dialect_name}")
+    return stmt.on_conflict_do_nothing(index_elements=KPI_VALUE_IDENTITY.expressions).returning(*INSERTED_COLUMNS)
+
+
+def insert_new_values(db: Session, values: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert ``values`` (dicts with kpi_id, timestamp, value, category_label); return those not already stored."""
+    if not values:
+        return []
+    result = db.execute(insert_new_values_statement(db.get_bind().dialect.name), values)
+    return [row._asdict() for row in result]
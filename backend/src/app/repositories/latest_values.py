@@ -0,0 +1,69 @@
+"""
+Latest value of each KPI.
+
+``kpi_latest_values`` points at the value with the greatest ``(timestamp,
+id)`` of each KPI. Ingest upserts the newest inserted value per KPI in the
+same transaction; the upsert only replaces a row with a newer one, so late
+values never overwrite the latest and concurrent ingests agree on the winner.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql import Delete, Insert
+
+from ..models import KPILatestValue, KPIValue
+
+
+def latest_candidates(values: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    The newest of ``values`` (dicts with id, kpi_id and timestamp) for each
+    KPI, as kpi_latest_values rows sorted by KPI so concurrent ingests lock
+    rows in the same order.
+    """
+    newest: Dict[int, Dict[str, Any]] = {}
+    for value in values:
+        current = newest.get(value["kpi_id"])
+        if current is None or (value["timestamp"], value["id"]) > (current["timestamp"], current["id"]):
+            newest[value["kpi_id"]] = value
+    return [
+        {"kpi_id": kpi_id, "value_id": value["id"], "timestamp": value["timestamp"]}
+        for kpi_id, value in sorted(newest.items())
+    ]
+
+
+def upsert_statement(dialect_name: str) -> Insert:
+    """INSERT of latest-value candidates that only replaces older rows (PostgreSQL and SQLite)."""
+    if dialect_name == "postgresql":
+        stmt = postgresql.insert(KPILatestValue)
+    elif dialect_name == "sqlite":
+        stmt = sqlite.insert(KPILatestValue)
+    else:
+        raise NotImplementedError(f"Latest values are not supported on {dialect_name}")
+
+    table = KPILatestValue.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.kpi_id],
+        set_={"value_id": stmt.excluded.value_id, "timestamp": stmt.excluded.timestamp},
+        where=tuple_(table.c.timestamp, table.c.value_id) < tuple_(stmt.excluded.timestamp, stmt.excluded.value_id),
+    )
+
+
+def clear_statement(kpi_ids: Optional[Sequence[int]] = None) -> Delete:
+    stmt = delete(KPILatestValue)
+    if kpi_ids:
+        stmt = stmt.where(KPILatestValue.kpi_id.in_(kpi_ids))
+    return stmt
+
+
+def backfill_statement(kpi_ids: Optional[Sequence[int]] = None) -> Insert:
+    """INSERT ... SELECT of the newest value of each KPI from kpi_values."""
+    rank = func.row_number().over(
+        partition_by=KPIValue.kpi_id, order_by=(KPIValue.timestamp.desc(), KPIValue.id.desc())
+    ).label("rank")
+    ranked = select(KPIValue.kpi_id, KPIValue.id, KPIValue.timestamp, rank)
+    if kpi_ids:
+        ranked = ranked.where(KPIValue.kpi_id.in_(kpi_ids))
+    ranked = ranked.subquery()
+    source = select(ranked.c.kpi_id, ranked.c.id, ranked.c.timestamp).where(ranked.c.rank == 1)
+    return insert(KPILatestValue).from_select(["kpi_id", "value_id", "timestamp"], source)
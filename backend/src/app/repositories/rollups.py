@@ -0,0 +1,213 @@
+"""
+Rollups of KPI values per calendar bucket.
+
+``kpi_value_rollups`` holds sum, count, min and max of the values of each
+(kpi_id, granularity, bucket, category_label). Ingest adds the deltas of new
+values with an upsert in the same transaction; all four aggregates merge by
+addition / min / max, so late and out-of-order values need no special care.
+
+Aggregation queries read whole buckets from the rollups and only the partial
+buckets at the edges of the requested range from ``kpi_values``.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.sql import Delete, Insert, Select
+
+from ..models import KPIValue, KPIValueRollup
+from .time_buckets import CALENDAR_UNITS, Bucket, TimeBucket
+
+# Granularities kept in kpi_value_rollups
+ROLLUP_UNITS = CALENDAR_UNITS
+
+# Stored category label of values without one
+NO_LABEL = ""
+
+
+def truncate(timestamp: datetime, unit: str) -> datetime:
+    """Start of the ``unit`` bucket containing ``timestamp`` (same as TimeBucket; weeks start on Monday)."""
+    timestamp = timestamp.replace(tzinfo=None)
+    if unit == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "day":
+        return day
+    if unit == "week":
+        return day - timedelta(days=day.weekday())
+    if unit == "month":
+        return day.replace(day=1)
+    if unit == "year":
+        return day.replace(month=1, day=1)
+    raise ValueError(f"Unknown rollup granularity '{unit}'")
+
+
+def next_bucket(bucket: datetime, unit: str) -> datetime:
+    """Start of the bucket after ``bucket``."""
+    if unit == "hour":
+        return bucket + timedelta(hours=1)
+    if unit == "day":
+        return bucket + timedelta(days=1)
+    if unit == "week":
+        return bucket + timedelta(weeks=1)
+    if unit == "month":
+        return bucket.replace(year=bucket.year + bucket.month // 12, month=bucket.month % 12 + 1)
+    if unit == "year":
+        return bucket.replace(year=bucket.year + 1)
+    raise ValueError(f"Unknown rollup granularity '{unit}'")
+
+
+def rollup_deltas(values: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Rollup rows adding ``values`` (dicts with kpi_id, timestamp, value and
+    category_label) to every granularity, sorted by key so concurrent
+    ingests lock rollup rows in the same order.
+    """
+    deltas: Dict[Tuple, List[float]] = defaultdict(lambda: [0.0, 0, float("inf"), float("-inf")])
+    for value in values:
+        label = value.get("category_label") or NO_LABEL
+        for unit in ROLLUP_UNITS:
+            delta = deltas[(value["kpi_id"], unit, truncate(value["timestamp"], unit), label)]
+            delta[0] += value["value"]
+            delta[1] += 1
+            delta[2] = min(delta[2], value["value"])
+            delta[3] = max(delta[3], value["value"])
+
+    return [
+        {
+            "kpi_id": kpi_id, "granularity": unit, "bucket": bucket, "category_label": label,
+            "sum": total, "count": count, "min": minimum, "max": maximum,
+        }
+        for (kpi_id, unit, bucket, label), (total, count, minimum, maximum) in sorted(deltas.items())
+    ]
+
+
+def upsert_statement(dialect_name: str) -> Insert:
+    """INSERT of rollup deltas that merges into existing rows (PostgreSQL and SQLite)."""
+    if dialect_name == "postgresql":
+        stmt = postgresql.insert(KPIValueRollup)
+        smaller, larger = func.least, func.greatest
+    elif dialect_name == "sqlite":
+        # Two-argument min()/max() are scalar functions in SQLite
+        stmt = sqlite.insert(KPIValueRollup)
+        smaller, larger = func.min, func.max
+    else:
+        raise NotImplementedError(f"Rollups are not supported on {dialect_name}")
+
+    table = KPIValueRollup.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=[c.name for c in table.primary_key.columns],
+        set_={
+            "sum": table.c.sum + stmt.excluded.sum,
+            "count": table.c.count + stmt.excluded.count,
+            "min": smaller(table.c.min, stmt.excluded.min),
+            "max": larger(table.c.max, stmt.excluded.max),
+        }
+    )
+
+
+def clear_statement(kpi_ids: Optional[Sequence[int]] = None) -> Delete:
+    stmt = delete(KPIValueRollup)
+    if kpi_ids:
+        stmt = stmt.where(KPIValueRollup.kpi_id.in_(kpi_ids))
+    return stmt
+
+
+def backfill_statement(unit: str, kpi_ids: Optional[Sequence[int]] = None) -> Insert:
+    """INSERT ... SELECT recomputing the ``unit`` rollups from kpi_values."""
+    bucket = TimeBucket(Bucket(unit=unit), KPIValue.timestamp)
+    label = func.coalesce(KPIValue.category_label, NO_LABEL)
+    source = select(
+        KPIValue.kpi_id, literal(unit), bucket, label,
+        func.sum(KPIValue.value), func.count(KPIValue.id), func.min(KPIValue.value), func.max(KPIValue.value)
+    ).group_by(KPIValue.kpi_id, bucket, label)
+    if kpi_ids:
+        source = source.where(KPIValue.kpi_id.in_(kpi_ids))
+    return insert(KPIValueRollup).from_select(
+        ["kpi_id", "granularity", "bucket", "category_label", "sum", "count", "min", "max"], source
+    )
+
+
+def covered_buckets(unit: str, start_date: datetime, end_date: datetime) -> Optional[Tuple[datetime, datetime]]:
+    """
+    ``[first, stop)``: the buckets lying entirely inside ``[start_date,
+    end_date]``, or None if there are none. Values before ``first`` and from
+    ``stop`` on are in partial buckets and must be aggregated from raw rows.
+    """
+    first = truncate(start_date, unit)
+    if first < start_date:
+        first = next_bucket(first, unit)
+    # end_date is inclusive: the bucket starting right after it is the first one not covered
+    stop = truncate(end_date + timedelta(microseconds=1), unit)
+    if first >= stop:
+        return None
+    return first, stop
+
+
+def rollup_select(kpi_id: int, unit: str, first: datetime, stop: datetime) -> Select:
+    """Aggregates per bucket in ``[first, stop)``, merged over category labels."""
+    return select(
+        KPIValueRollup.bucket.label("period"),
+        func.sum(KPIValueRollup.sum).label("sum"),
+        func.sum(KPIValueRollup.count).label("count"),
+        func.min(KPIValueRollup.min).label("min_value"),
+        func.max(KPIValueRollup.max).label("max_value"),
+    ).where(
+        KPIValueRollup.kpi_id == kpi_id,
+        KPIValueRollup.granularity == unit,
+        KPIValueRollup.bucket >= first,
+        KPIValueRollup.bucket < stop,
+    ).group_by(KPIValueRollup.bucket)
+
+
+def raw_select(bucket: Bucket, kpi_id: int, start: datetime, end: datetime, end_inclusive: bool) -> Select:
+    """Aggregates per bucket computed from kpi_values in ``[start, end]`` (or ``[start, end)``)."""
+    period = TimeBucket(bucket, KPIValue.timestamp)
+    upper = KPIValue.timestamp <= end if end_inclusive else KPIValue.timestamp < end
+    return select(
+        period.label("period"),
+        func.sum(KPIValue.value).label("sum"),
+        func.count(KPIValue.id).label("count"),
+        func.min(KPIValue.value).label("min_value"),
+        func.max(KPIValue.value).label("max_value"),
+    ).where(
+        KPIValue.kpi_id == kpi_id,
+        KPIValue.timestamp >= start,
+        upper,
+    ).group_by(period)
+
+
+def aggregate_queries(bucket: Bucket, kpi_id: int, start_date: datetime, end_date: datetime) -> List[Select]:
+    """
+    Queries whose rows together make up the aggregation of ``[start_date,
+    end_date]``: rollups for the whole buckets, raw values for the partial
+    ones. Fixed-width buckets are not rolled up and always read raw values.
+    """
+    start_date, end_date = start_date.replace(tzinfo=None), end_date.replace(tzinfo=None)
+    covered = covered_buckets(bucket.unit, start_date, end_date) if bucket.unit in ROLLUP_UNITS else None
+    if covered is None:
+        return [raw_select(bucket, kpi_id, start_date, end_date, end_inclusive=True)]
+
+    first, stop = covered
+    queries = [rollup_select(kpi_id, bucket.unit, first, stop)]
+    if start_date < first:
+        queries.append(raw_select(bucket, kpi_id, start_date, first, end_inclusive=False))
+    if stop <= end_date:
+        queries.append(raw_select(bucket, kpi_id, stop, end_date, end_inclusive=True))
+    return queries
+
+
+def merge_aggregates(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Results of ``aggregate_queries`` as the aggregation endpoint's rows, in bucket order."""
+    return [
+        {
+            "period": row.period,
+            "avg_value": float(row.sum) / row.count if row.count else 0,
+            "min_value": float(row.min_value) if row.min_value else 0,
+            "max_value": float(row.max_value) if row.max_value else 0,
+            "count": row.count
+        }
+        for row in sorted(rows, key=lambda row: row.period)
+    ]
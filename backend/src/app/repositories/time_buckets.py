@@ -0,0 +1,108 @@
+"""
+Dialect-portable time bucketing for aggregation queries.
+
+``TimeBucket`` truncates a timestamp column to a calendar unit (``hour``,
+``day``, ``week``, ``month``, ``year``) or to a fixed width such as ``5min``,
+``15min`` or ``6h``. PostgreSQL gets ``date_trunc`` / ``date_bin``; SQLite
+gets ``strftime`` / integer-epoch arithmetic, so the same repository code runs
+against an in-memory database in the benchmarks.
+"""
+import re
+from typing import NamedTuple, Optional
+
+from sqlalchemy import DateTime
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+CALENDAR_UNITS = ("hour", "day", "week", "month", "year")
+
+_FIXED_WIDTH = re.compile(r"^(\d+)\s*(s|sec|m|min|h|hour|d|day)s?$")
+_UNIT_SECONDS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+# Fixed-width buckets are aligned to the Unix epoch on every dialect
+EPOCH = "1970-01-01 00:00:00"
+
+# SQLite strftime formats truncating to a calendar unit (week handled separately).
+# They match SQLAlchemy's DateTime storage format, so buckets written to a
+# table (rollups) compare correctly with bound datetimes.
+_SQLITE_FORMATS = {
+    "hour": "%Y-%m-%d %H:00:00.000000",
+    "day": "%Y-%m-%d 00:00:00.000000",
+    "month": "%Y-%m-01 00:00:00.000000",
+    "year": "%Y-01-01 00:00:00.000000",
+}
+
+
+class Bucket(NamedTuple):
+    """A calendar unit (``unit``) or a fixed width in seconds (``seconds``)."""
+    unit: Optional[str] = None
+    seconds: Optional[int] = None
+
+
+def parse_bucket(spec: str) -> Bucket:
+    """
+    Parse a bucket specification: a calendar unit or ``<n><s|min|h|d>``.
+    Raises ValueError for anything else.
+    """
+    spec = spec.strip().lower()
+    if spec in CALENDAR_UNITS:
+        return Bucket(unit=spec)
+
+    match = _FIXED_WIDTH.match(spec)
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(
+            f"Invalid period '{spec}': use one of {', '.join(CALENDAR_UNITS)} "
+            "or a fixed width such as 5min, 15min, 6h, 2d"
+        )
+    return Bucket(seconds=int(match.group(1)) * _UNIT_SECONDS[match.group(2)])
+
+
+class TimeBucket(ColumnElement):
+    """Start of the bucket containing ``expr``, as a timestamp."""
+
+    inherit_cache = True
+    _traverse_internals = [
+        ("expr", InternalTraversal.dp_clauseelement),
+        ("unit", InternalTraversal.dp_string),
+        ("seconds", InternalTraversal.dp_plain_obj),
+    ]
+    type = DateTime()
+
+    def __init__(self, bucket: Bucket, expr: ColumnElement):
+        self.expr = expr
+        self.unit = bucket.unit
+        self.seconds = bucket.seconds
+
+    @property
+    def _from_objects(self):
+        return self.expr._from_objects
+
+
+@compiles(TimeBucket)
+def _compile_default(element: TimeBucket, compiler, **kw) -> str:
+    raise CompileError(f"Time buckets are not supported on {compiler.dialect.name}")
+
+
+@compiles(TimeBucket, "postgresql")
+def _compile_postgresql(element: TimeBucket, compiler, **kw) -> str:
+    expr = compiler.process(element.expr, **kw)
+    if element.unit:
+        return f"date_trunc('{element.unit}', {expr})"
+    return f"date_bin(INTERVAL '{element.seconds} seconds', {expr}, TIMESTAMP '{EPOCH}')"
+
+
+@compiles(TimeBucket, "sqlite")
+def _compile_sqlite(element: TimeBucket, compiler, **kw) -> str:
+    expr = compiler.process(element.expr, **kw)
+    if element.seconds:
+        n = element.seconds
+        return f"strftime('%Y-%m-%d %H:%M:%S.000000', (CAST(strftime('%s', {expr}) AS INTEGER) / {n}) * {n}, 'unixepoch')"
+    if element.unit == "week":
+        # ISO weeks start on Monday; %w is 0 for Sunday
+        return (
+            f"strftime('%Y-%m-%d 00:00:00.000000', {expr}, "
+            f"'-' || ((CAST(strftime('%w', {expr}) AS INTEGER) + 6) % 7) || ' days')"
+        )
+    return f"strftime('{_SQLITE_FORMATS[element.unit]}', {expr})"
@@ -1,7 +1,7 @@
 """
 Pydantic schemas for request/response validation.
 """
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import List, Optional, Dict, Any, Union, Literal, Literal
 from datetime import datetime
 from enum import Enum
@@ -205,10 +205,56 @@ class KPIValueCreate(KPIValueBase):
 
 class KPIValueBulkCreate(BaseSchema):
     """For bulk inserting KPI values."""
-    values: List[KPIValueBase] = Field(..., min_items=1, max_items=1000)
+    values: List[KPIValueBase] = Field(..., min_items=1, max_items=50000)
     # kpi_id: int = Field(..., gt=0)
 
 
+class KPIValueBulkResult(BaseSchema):
+    """Outcome of a bulk insert; duplicates of stored values are skipped."""
+    created: int
+    skipped: int
+    message: str
+
+
+class KPIValueBatchItem(BaseSchema):
+    """Values of one KPI in a multi-KPI batch, addressed by database ID or by `id_kpi`."""
+    kpi_id: Optional[int] = Field(None, gt=0)
+    id_kpi: Optional[str] = Field(None, min_length=1, max_length=100)
+    values: List[KPIValueBase] = Field(..., min_items=1)
+    
+    @model_validator(mode='after')
+    def validate_reference(self):
+        if (self.kpi_id is None) == (self.id_kpi is None):
+            raise ValueError('exactly one of kpi_id and id_kpi is required')
+        return self
+
+
+class KPIValueBatchCreate(BaseSchema):
+    """For inserting values of many KPIs in one transaction."""
+    items: List[KPIValueBatchItem] = Field(..., min_items=1, max_items=1000)
+    
+    @field_validator('items')
+    @classmethod
+    def validate_total_values(cls, v):
+        if sum(len(item.values) for item in v) > 50000:
+            raise ValueError('a batch may contain at most 50000 values')
+        return v
+
+
+class KPIValueBatchItemResult(BaseSchema):
+    kpi_id: int
+    id_kpi: str
+    created: int
+    skipped: int
+
+
+class KPIValueBatchResult(BaseSchema):
+    """Outcome of a multi-KPI batch, per KPI and in total."""
+    created: int
+    skipped: int
+    kpis: List[KPIValueBatchItemResult]
+
+
 class KPIValue(KPIValueBase):
     id: int
     kpi_id: int
@@ -218,6 +264,67 @@ class KPIValueWithKPI(KPIValue):
     kpi: KPISummary
 
 
+class KPIValuePoint(BaseSchema):
+    """A single (timestamp, value) point of a chart series."""
+    timestamp: datetime
+    value: float
+
+
+class KPIValueSeries(BaseSchema):
+    """A KPI value series reduced for plotting."""
+    kpi_id: int
+    source_points: int
+    points: List[KPIValuePoint]
+
+
+class KPISeriesSpec(BaseSchema):
+    """One series of a multi-series query: a KPI value range, paged or downsampled."""
+    kpi_id: int = Field(..., gt=0)
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    category_label: Optional[str] = None
+    limit: int = Field(1000, ge=1, le=10000)
+    downsample: Optional[int] = Field(None, ge=3, le=10000, description="Reduce to at most this many points (LTTB) instead of paging")
+    
+    @field_validator('end_date')
+    @classmethod
+    def validate_date_range(cls, v, info):
+        if v is not None and info.data.get('start_date') is not None:
+            if v <= info.data['start_date']:
+                raise ValueError('end_date must be after start_date')
+        return v
+
+
+class KPISeriesQuery(BaseSchema):
+    """Series of several KPIs fetched in one request (one spec per KPI)."""
+    series: List[KPISeriesSpec] = Field(..., min_items=1, max_items=50)
+    
+    @field_validator('series')
+    @classmethod
+    def validate_unique_kpis(cls, v):
+        kpi_ids = [spec.kpi_id for spec in v]
+        if len(set(kpi_ids)) != len(kpi_ids):
+            raise ValueError('each KPI may appear only once')
+        return v
+
+
+class KPISeriesResult(BaseSchema):
+    """
+    A series of a multi-series query: `values` (and `next_cursor` if more
+    follow) for a paged spec, `points` and `source_points` for a downsampled one.
+    """
+    kpi_id: int
+    values: Optional[List[KPIValue]] = None
+    next_cursor: Optional[str] = None
+    source_points: Optional[int] = None
+    points: Optional[List[KPIValuePoint]] = None
+
+
+class KPISeriesResponse(BaseSchema):
+    """Series of a multi-series query keyed by KPI ID."""
+    series: Dict[int, KPISeriesResult]
+
+
 # Visualization schemas
 class VisualizationBase(BaseSchema):
     type: VisualizationType
@@ -469,6 +576,8 @@ class KPIValueQueryParams(BaseSchema):
     category_label: Optional[str] = None
     limit: int = Field(1000, ge=1, le=10000)
     offset: int = Field(0, ge=0)
+    cursor: Optional[str] = None
+    include_total: bool = False
     
     @field_validator('end_date')
     @classmethod
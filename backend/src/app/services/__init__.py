@@ -2,20 +2,26 @@
 Service layer for business logic and data operations.
 """
 from typing import List, Optional, Dict, Any, Tuple
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
 
+from ..models import KPI_VALUE_IDENTITY
 from ..repositories import (
     city_repo, dashboard_repo, section_repo, kpi_repo, kpi_value_repo, 
     visualization_repo, map_data_repo
 )
+from ..repositories.estimates import TotalCount
+from ..repositories.time_buckets import parse_bucket
+from ..core.config import settings
+from ..core.pagination import keyset_position
 from ..schemas import (
     CityCreate, CityUpdate, City,
     DashboardCreate, DashboardUpdate, Dashboard, DashboardWithSections,
     DashboardSection, DashboardSectionCreate, DashboardSectionUpdate,
     KPICreate, KPIUpdate, KPI, KPIQueryParams,
-    KPIValueCreate, KPIValue, KPIValueQueryParams, KPIValueBulkCreate,
+    KPIValueCreate, KPIValue, KPIValueQueryParams, KPIValueBulkCreate, KPIValueBatchCreate,
     VisualizationCreate, VisualizationUpdate, Visualization,
     WMS, WMSCreate, GeoJson, GeoJsonCreate,
     PaginatedResponse
@@ -427,8 +433,8 @@ class KPIValueService:
         db: Session, 
         kpi_id: int, 
         params: KPIValueQueryParams
-    ) -> Tuple[List[KPIValue], int]:
-        """Get KPI values with filtering."""
+    ) -> Tuple[List[KPIValue], Optional[TotalCount]]:
+        """Get KPI values with filtering; the total only if `params.include_total` is set."""
         # Verify KPI exists
         kpi = kpi_repo.get(db, kpi_id)
         if not kpi:
@@ -444,14 +450,20 @@ class KPIValueService:
             end_date=params.end_date,
             category_label=params.category_label,
             limit=params.limit,
-            offset=params.offset
+            offset=params.offset,
+            after=keyset_position(params.cursor, params.offset)
         )
         
-        # Count total for pagination
-        total_filters = {"kpi_id": kpi_id}
-        if params.category_label:
-            total_filters["category_label"] = params.category_label
-        total = kpi_value_repo.count(db, filters=total_filters)
+        total = None
+        if params.include_total:
+            total = kpi_value_repo.count_by_kpi_and_timerange(
+                db,
+                kpi_id=kpi_id,
+                start_date=params.start_date,
+                end_date=params.end_date,
+                category_label=params.category_label,
+                estimate_above=settings.DB_COUNT_ESTIMATE_THRESHOLD
+            )
         
         return values, total
     
@@ -472,10 +484,12 @@ class KPIValueService:
                 detail="KPI not found"
             )
         
-        if period not in ["day", "week", "month", "year"]:
+        try:
+            parse_bucket(period)
+        except ValueError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Period must be one of: day, week, month, year"
+                detail=str(e)
             )
         
         return kpi_value_repo.get_aggregated_by_period(
@@ -500,10 +514,20 @@ class KPIValueService:
         value_dict = value_in.dict()
         value_dict["kpi_id"] = kpi_id
         
-        return kpi_value_repo.create(db, obj_in=value_dict)
+        try:
+            return kpi_value_repo.create(db, obj_in=value_dict)
+        except IntegrityError as e:
+            # Other violations are left to the application's IntegrityError handler
+            if KPI_VALUE_IDENTITY.name not in str(e.orig):
+                raise
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A value with this timestamp and category label already exists for this KPI"
+            )
     
-    def bulk_create_kpi_values(self, db: Session, kpi_id: int, bulk_in: KPIValueBulkCreate) -> int:
-        """Bulk create KPI values."""
+    def bulk_create_kpi_values(self, db: Session, kpi_id: int, bulk_in: KPIValueBulkCreate) -> Tuple[int, int]:
+        """Bulk create KPI values; returns the numbers of values created and skipped as duplicates."""
         # Verify KPI exists
         kpi = kpi_repo.get(db, kpi_id)
         if not kpi:
@@ -519,7 +543,57 @@ class KPIValueService:
             value_dict["kpi_id"] = kpi_id
             values_with_kpi.append(value_dict)
         
-        return kpi_value_repo.bulk_create(db, values=values_with_kpi)
+        created = kpi_value_repo.bulk_create(db, values=values_with_kpi)
+        return created, len(values_with_kpi) - created
+    
+    def batch_create_kpi_values(self, db: Session, batch_in: KPIValueBatchCreate) -> Dict[str, Any]:
+        """
+        Create values of many KPIs in one transaction, skipping duplicates.
+        All KPIs are resolved with one query; any unknown KPI fails the whole batch.
+        """
+        ids = {item.kpi_id for item in batch_in.items if item.kpi_id is not None}
+        id_kpis = {item.id_kpi for item in batch_in.items if item.id_kpi is not None}
+        kpis = kpi_repo.get_by_references(db, ids=list(ids), id_kpis=list(id_kpis))
+        by_id = {kpi.id: kpi for kpi in kpis}
+        by_id_kpi = {kpi.id_kpi: kpi for kpi in kpis}
+        
+        missing = [str(kpi_id) for kpi_id in sorted(ids - by_id.keys())] + sorted(id_kpis - by_id_kpi.keys())
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"KPIs not found: {', '.join(missing)}"
+            )
+        
+        # Read before the commit expires the KPI objects
+        id_kpi_of = {kpi.id: kpi.id_kpi for kpi in kpis}
+        submitted: Dict[int, int] = {}
+        values = []
+        for item in batch_in.items:
+            kpi_id = item.kpi_id if item.kpi_id is not None else by_id_kpi[item.id_kpi].id
+            submitted[kpi_id] = submitted.get(kpi_id, 0) + len(item.values)
+            for value in item.values:
+                value_dict = value.dict()
+                value_dict["kpi_id"] = kpi_id
+                values.append(value_dict)
+        
+        created: Dict[int, int] = {}
+        for row in kpi_value_repo.bulk_insert(db, values=values):
+            created[row["kpi_id"]] = created.get(row["kpi_id"], 0) + 1
+        
+        results = [
+            {
+                "kpi_id": kpi_id,
+                "id_kpi": id_kpi_of[kpi_id],
+                "created": created.get(kpi_id, 0),
+                "skipped": count - created.get(kpi_id, 0)
+            }
+            for kpi_id, count in submitted.items()
+        ]
+        return {
+            "created": sum(result["created"] for result in results),
+            "skipped": sum(result["skipped"] for result in results),
+            "kpis": results
+        }
     
     def get_latest_kpi_value(self, db: Session, kpi_id: int) -> Optional[KPIValue]:
         """Get the latest KPI value."""
@@ -801,3 +875,8 @@ kpi_service = KPIService()
 kpi_value_service = KPIValueService()
 visualization_service = VisualizationService()
 map_data_service = MapDataService()
+
+from .async_services import (  # noqa: E402
+    async_dashboard_service, async_section_service, async_kpi_value_service,
+    async_visualization_service, async_map_data_service, async_public_data_service
+)
@@ -0,0 +1,502 @@
+"""
+Async services for the hot read paths (KPI values, dashboards, map data).
+
+Same behaviour and errors as their sync counterparts, on an AsyncSession.
+"""
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime
+
+from ..repositories import (
+    async_city_repo, async_dashboard_repo, async_section_repo, async_kpi_repo,
+    async_kpi_value_repo, async_visualization_repo, async_map_data_repo
+)
+from ..repositories.estimates import TotalCount
+from ..repositories.time_buckets import parse_bucket
+from ..core.config import settings
+from ..core.pagination import encode_cursor, keyset_position
+from ..schemas import (
+    Dashboard, DashboardWithSections, DashboardSection,
+    KPI, KPISeriesQuery, KPISeriesResult, KPIValue, KPIValueQueryParams, KPIValueSeries, Visualization
+)
+from .downsampling import downsample_rows
+from .exports import ENCODERS, EXPORT_FORMATS, csv_header
+
+
+async def _total(db: AsyncSession, kpi_id: int, params: KPIValueQueryParams) -> Optional[TotalCount]:
+    """Count the values matching `params` if the client asked for it (`include_total`)."""
+    if not params.include_total:
+        return None
+    return await async_kpi_value_repo.count_by_kpi_and_timerange(
+        db,
+        kpi_id=kpi_id,
+        start_date=params.start_date,
+        end_date=params.end_date,
+        category_label=params.category_label,
+        estimate_above=settings.DB_COUNT_ESTIMATE_THRESHOLD
+    )
+
+
+async def _fetch_page(db: AsyncSession, kpi_id: int, params: KPIValueQueryParams, as_rows: bool) -> list:
+    """The page `params` selects plus one look-ahead row, as ORM objects or bare rows."""
+    fetch = (
+        async_kpi_value_repo.get_rows_by_kpi_and_timerange if as_rows
+        else async_kpi_value_repo.get_by_kpi_and_timerange
+    )
+    return await fetch(
+        db,
+        kpi_id=kpi_id,
+        start_date=params.start_date,
+        end_date=params.end_date,
+        category_label=params.category_label,
+        limit=params.limit + 1,
+        offset=params.offset,
+        after=keyset_position(params.cursor, params.offset)
+    )
+
+
+def _split_page(values: list, limit: int) -> Tuple[list, Optional[str]]:
+    """Drop the look-ahead row fetched past `limit`; if it was there, return the next page's cursor."""
+    if len(values) <= limit:
+        return values, None
+    values = values[:limit]
+    return values, encode_cursor(values[-1].timestamp, values[-1].id)
+
+
+class AsyncDashboardService:
+    """Async service for dashboard reads."""
+
+    async def get_dashboard(self, db: AsyncSession, dashboard_id: int) -> Dashboard:
+        """Get dashboard by ID."""
+        dashboard = await async_dashboard_repo.get(db, dashboard_id)
+        if not dashboard:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Dashboard not found"
+            )
+        return dashboard
+
+    async def get_dashboard_by_city_code(self, db: AsyncSession, city_code: str) -> Dashboard:
+        """Get dashboard by city code."""
+        dashboard = await async_dashboard_repo.get_by_city_code(db, city_code=city_code)
+        if not dashboard:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Dashboard for city '{city_code}' not found"
+            )
+        return dashboard
+
+    async def list_dashboards_by_city(
+        self,
+        db: AsyncSession,
+        city_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        public_only: bool = True
+    ) -> Tuple[List[Dashboard], int]:
+        """List dashboards for a city."""
+        filters = {"city_id": city_id}
+        if public_only:
+            filters["is_public"] = True
+
+        dashboards = await async_dashboard_repo.get_multi(db, skip=skip, limit=limit, filters=filters)
+        total = await async_dashboard_repo.count(db, filters=filters)
+        return dashboards, total
+
+    async def get_dashboard_with_sections_and_visualizations(self, db: AsyncSession, dashboard_id: int) -> DashboardWithSections:
+        """Get dashboard with all its sections and visualizations."""
+        # Sections are always eager-loaded by the async dashboard repository
+        return await self.get_dashboard(db, dashboard_id)
+
+
+class AsyncSectionService:
+    """Async service for dashboard section reads."""
+
+    async def list_sections_by_dashboard(self, db: AsyncSession, dashboard_id: int) -> List[DashboardSection]:
+        """List sections for a dashboard."""
+        if not await async_dashboard_repo.exists(db, id=dashboard_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Dashboard not found"
+            )
+
+        return await async_section_repo.get_by_dashboard(db, dashboard_id=dashboard_id)
+
+
+class AsyncKPIValueService:
+    """Async service for KPI value reads."""
+
+    async def _ensure_kpi(self, db: AsyncSession, kpi_id: int) -> None:
+        if not await async_kpi_repo.exists_by_id(db, kpi_id=kpi_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="KPI not found"
+            )
+
+    async def get_kpi_values(
+        self,
+        db: AsyncSession,
+        kpi_id: int,
+        params: KPIValueQueryParams,
+        as_rows: bool = False
+    ) -> Tuple[List[KPIValue], Optional[TotalCount], Optional[str]]:
+        """
+        Get KPI values with filtering and the cursor of the next page. The
+        total is only counted when `params.include_total` is set. With
+        `as_rows` the values are (id, timestamp, value, category_label) rows
+        for columnar encodings instead of ORM objects.
+        """
+        values = await _fetch_page(db, kpi_id, params, as_rows)
+        if not values:
+            # Only an empty page needs to tell a missing KPI from an empty range
+            await self._ensure_kpi(db, kpi_id)
+        values, next_cursor = _split_page(values, params.limit)
+        return values, await _total(db, kpi_id, params), next_cursor
+
+    async def export_kpi_values(
+        self,
+        db: AsyncSession,
+        stream_db: AsyncSession,
+        kpi_id: int,
+        format: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_label: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Check the KPI with `db`, then return the chunks of its values encoded as
+        `format` (csv or ndjson). The chunks are read lazily from a server-side
+        cursor on `stream_db`, which is closed once the export is consumed.
+        """
+        if format not in EXPORT_FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid format '{format}': use one of {', '.join(EXPORT_FORMATS)}"
+            )
+        await self._ensure_kpi(db, kpi_id)
+        return self._export_chunks(stream_db, kpi_id, format, start_date, end_date, category_label)
+
+    async def _export_chunks(
+        self,
+        db: AsyncSession,
+        kpi_id: int,
+        format: str,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_label: Optional[str]
+    ) -> AsyncIterator[str]:
+        encode = ENCODERS[format]
+        async with db:
+            if format == "csv":
+                # Sent before the query runs, so clients see the first byte at once
+                yield csv_header()
+            async for rows in async_kpi_value_repo.stream_by_kpi_and_timerange(
+                db,
+                kpi_id=kpi_id,
+                start_date=start_date,
+                end_date=end_date,
+                category_label=category_label
+            ):
+                yield encode(rows)
+
+    async def get_kpi_values_aggregated(
+        self,
+        db: AsyncSession,
+        kpi_id: int,
+        period: str = "day",
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Get aggregated KPI values by period."""
+        await self._ensure_kpi(db, kpi_id)
+
+        try:
+            parse_bucket(period)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
+        return await async_kpi_value_repo.get_aggregated_by_period(
+            db,
+            kpi_id=kpi_id,
+            period=period,
+            start_date=start_date,
+            end_date=end_date
+        )
+
+    async def get_kpi_values_downsampled(
+        self,
+        db: AsyncSession,
+        kpi_id: int,
+        points: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_label: Optional[str] = None
+    ) -> KPIValueSeries:
+        """Get KPI values in a time range reduced to at most `points` points with LTTB."""
+        await self._ensure_kpi(db, kpi_id)
+        return await self._downsample(db, kpi_id, points, start_date, end_date, category_label)
+
+    async def _downsample(
+        self,
+        db: AsyncSession,
+        kpi_id: int,
+        points: int,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_label: Optional[str]
+    ) -> KPIValueSeries:
+        rows = await async_kpi_value_repo.get_series_by_kpi_and_timerange(
+            db,
+            kpi_id=kpi_id,
+            start_date=start_date,
+            end_date=end_date,
+            category_label=category_label
+        )
+        # NumPy work on long series stays off the event loop
+        kept = await run_in_threadpool(downsample_rows, rows, points)
+        return KPIValueSeries(
+            kpi_id=kpi_id,
+            source_points=len(rows),
+            points=[{"timestamp": timestamp, "value": value} for timestamp, value in kept]
+        )
+
+    async def query_kpi_series(self, db: AsyncSession, query: KPISeriesQuery) -> Dict[int, KPISeriesResult]:
+        """
+        Fetch the series of several KPIs: one query for all paged specs, one
+        for all downsampled specs, and a KPI check only if some series is empty.
+        """
+        paged = [spec for spec in query.series if spec.downsample is None]
+        downsampled = [spec for spec in query.series if spec.downsample is not None]
+        results: Dict[int, KPISeriesResult] = {}
+
+        if paged:
+            rows_by_kpi: Dict[int, list] = {spec.kpi_id: [] for spec in paged}
+            for row in await async_kpi_value_repo.get_pages_by_kpis(
+                db, pages=[spec.model_copy(update={"limit": spec.limit + 1}) for spec in paged]
+            ):
+                rows_by_kpi[row.kpi_id].append(row)
+            for spec in paged:
+                values, next_cursor = _split_page(rows_by_kpi[spec.kpi_id], spec.limit)
+                results[spec.kpi_id] = KPISeriesResult(kpi_id=spec.kpi_id, values=values, next_cursor=next_cursor)
+
+        if downsampled:
+            series_by_kpi = await async_kpi_value_repo.get_series_by_kpis(db, ranges=downsampled)
+            # NumPy work on long series stays off the event loop
+            kept = await run_in_threadpool(
+                lambda: {spec.kpi_id: downsample_rows(series_by_kpi[spec.kpi_id], spec.downsample) for spec in downsampled}
+            )
+            for spec in downsampled:
+                results[spec.kpi_id] = KPISeriesResult(
+                    kpi_id=spec.kpi_id,
+                    source_points=len(series_by_kpi[spec.kpi_id]),
+                    points=[{"timestamp": timestamp, "value": value} for timestamp, value in kept[spec.kpi_id]]
+                )
+
+        # Only empty series need to tell a missing KPI from an empty range
+        empty = [kpi_id for kpi_id, result in results.items() if not (result.values or result.source_points)]
+        if empty:
+            missing = set(empty) - set(await async_kpi_repo.get_existing_ids(db, kpi_ids=empty))
+            if missing:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"KPIs not found: {', '.join(map(str, sorted(missing)))}"
+                )
+
+        return {spec.kpi_id: results[spec.kpi_id] for spec in query.series}
+
+    async def get_latest_kpi_value(self, db: AsyncSession, kpi_id: int) -> Optional[KPIValue]:
+        """Get the latest KPI value."""
+        return await async_kpi_value_repo.get_latest_by_kpi(db, kpi_id=kpi_id)
+
+    async def get_latest_kpi_values_by_city(self, db: AsyncSession, city_id: int) -> List[KPIValue]:
+        """Get the latest value of every KPI of a city."""
+        values = await async_kpi_value_repo.get_latest_by_city(db, city_id=city_id)
+        if not values and not await async_city_repo.exists(db, id=city_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="City not found"
+            )
+        return values
+
+
+class AsyncVisualizationService:
+    """Async service for visualization reads."""
+
+    async def get_visualization(self, db: AsyncSession, vis_id: int) -> Visualization:
+        """Get visualization by ID."""
+        vis = await async_visualization_repo.get(db, vis_id)
+        if not vis:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Visualization not found"
+            )
+        return vis
+
+    async def list_visualizations_by_dashboard(self, db: AsyncSession, dashboard_id: int) -> List[Visualization]:
+        """List visualizations for a dashboard."""
+        if not await async_dashboard_repo.exists(db, id=dashboard_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Dashboard not found"
+            )
+
+        return await async_visualization_repo.get_by_dashboard(db, dashboard_id=dashboard_id)
+
+    async def list_visualizations_by_city(self, db: AsyncSession, city_code: str) -> List[Visualization]:
+        """List all visualizations for a city by code."""
+        if not await async_city_repo.exists(db, code=city_code):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"City with code '{city_code}' not found"
+            )
+
+        return await async_visualization_repo.get_by_city_code(db, city_code=city_code)
+
+
+class AsyncMapDataService:
+    """Async service for map layer reads."""
+
+    async def get_map_data(self, db: AsyncSession, map_data_id: int):
+        """Get map data by ID."""
+        map_data = await async_map_data_repo.get(db, map_data_id)
+        if not map_data:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Map data not found"
+            )
+        return map_data
+
+    async def get_map_data_by_city(self, db: AsyncSession, city_id: int, active_only: bool = True) -> List[Any]:
+        """Get all map layers for a city."""
+        if not await async_city_repo.exists(db, id=city_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="City not found"
+            )
+
+        return await async_map_data_repo.get_by_city(db, city_id=city_id, active_only=active_only)
+
+    async def get_map_data_by_city_code(self, db: AsyncSession, city_code: str, active_only: bool = True) -> List[Any]:
+        """Get all map layers for a city by code."""
+        city = await async_city_repo.get_by_code(db, code=city_code.lower())
+        if not city:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"City with code '{city_code}' not found"
+            )
+
+        return await async_map_data_repo.get_by_city(db, city_id=city.id, active_only=active_only)
+
+
+class AsyncPublicDataService:
+    """
+    Read-only access to data shown on public dashboards.
+
+    Anything not reachable from a public dashboard is reported as not found,
+    so private dashboards, KPIs and cities are not disclosed.
+    """
+
+    async def list_dashboards_by_city_code(self, db: AsyncSession, city_code: str) -> List[Dashboard]:
+        """List public dashboards for a city by code."""
+        dashboards = await async_dashboard_repo.get_public_by_city_code(db, city_code=city_code.lower())
+        if not dashboards:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No public dashboards for city '{city_code}'"
+            )
+        return dashboards
+
+    async def get_dashboard(self, db: AsyncSession, dashboard_id: int) -> Dashboard:
+        """Get a public dashboard by ID."""
+        dashboard = await async_dashboard_repo.get_public(db, dashboard_id=dashboard_id)
+        if not dashboard:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Dashboard not found"
+            )
+        return dashboard
+
+    async def list_visualizations(self, db: AsyncSession, dashboard_id: int) -> List[Visualization]:
+        """List visualizations of a public dashboard."""
+        await self.get_dashboard(db, dashboard_id)
+        return await async_visualization_repo.get_by_dashboard(db, dashboard_id=dashboard_id)
+
+    async def _ensure_public_kpi(self, db: AsyncSession, kpi_id: int) -> None:
+        if not await async_kpi_repo.is_on_public_dashboard(db, kpi_id=kpi_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="KPI not found"
+            )
+
+    async def get_kpi(self, db: AsyncSession, kpi_id: int) -> KPI:
+        """Get a KPI shown on a public dashboard."""
+        await self._ensure_public_kpi(db, kpi_id)
+        return await async_kpi_repo.get(db, kpi_id)
+
+    async def get_kpi_values(
+        self,
+        db: AsyncSession,
+        kpi_id: int,
+        params: KPIValueQueryParams,
+        as_rows: bool = False
+    ) -> Tuple[List[KPIValue], Optional[TotalCount], Optional[str]]:
+        """Get values of a KPI shown on a public dashboard, their total (if asked for) and the next cursor."""
+        await self._ensure_public_kpi(db, kpi_id)
+        values = await _fetch_page(db, kpi_id, params, as_rows)
+        values, next_cursor = _split_page(values, params.limit)
+        return values, await _total(db, kpi_id, params), next_cursor
+
+    async def get_kpi_values_downsampled(
+        self,
+        db: AsyncSession,
+        kpi_id: int,
+        points: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        category_label: Optional[str] = None
+    ) -> KPIValueSeries:
+        """Get downsampled values of a KPI shown on a public dashboard."""
+        await self._ensure_public_kpi(db, kpi_id)
+        return await async_kpi_value_service._downsample(db, kpi_id, points, start_date, end_date, category_label)
+
+    async def get_latest_kpi_value(self, db: AsyncSession, kpi_id: int) -> Optional[KPIValue]:
+        """Get the latest value of a KPI shown on a public dashboard."""
+        await self._ensure_public_kpi(db, kpi_id)
+        return await async_kpi_value_repo.get_latest_by_kpi(db, kpi_id=kpi_id)
+
+    async def get_kpi_values_aggregated(
+        self,
+        db: AsyncSession,
+        kpi_id: int,
+        period: str = "day",
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Get aggregated values of a KPI shown on a public dashboard."""
+        await self._ensure_public_kpi(db, kpi_id)
+        return await async_kpi_value_service.get_kpi_values_aggregated(db, kpi_id, period, start_date, end_date)
+
+    async def get_map_data_by_city_code(self, db: AsyncSession, city_code: str) -> List[Any]:
+        """Get active map layers for a city that has a public dashboard."""
+        city = await async_city_repo.get_by_code(db, code=city_code.lower())
+        if not city or not await async_city_repo.has_public_dashboard(db, city_id=city.id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"City with code '{city_code}' not found"
+            )
+
+        return await async_map_data_repo.get_by_city(db, city_id=city.id, active_only=True)
+
+
+# Async service instances
+async_dashboard_service = AsyncDashboardService()
+async_section_service = AsyncSectionService()
+async_kpi_value_service = AsyncKPIValueService()
+async_visualization_service = AsyncVisualizationService()
+async_map_data_service = AsyncMapDataService()
+async_public_data_service = AsyncPublicDataService()
@@ -1,11 +1,13 @@
 """
 Authentication service for handling Keycloak integration.
 """
-import requests
+import httpx
 from typing import Optional, Dict, Any
 from fastapi import HTTPException, status
 
+from ..core.circuit_breaker import CircuitOpenError
 from ..core.config import settings
+from ..core.http import keycloak_http
 from ..schemas import TokenRequest, TokenResponse, RefreshTokenRequest
 
 
@@ -29,7 +31,7 @@ class AuthenticationService:
                 'scope': 'openid'
             }
             
-            response = requests.post(self.token_url, data=data, timeout=10)
+            response = await keycloak_http.post(self.token_url, data=data)
             
             if response.status_code == 200:
                 token_data = response.json()
@@ -52,7 +54,9 @@ class AuthenticationService:
                     detail=error_detail
                 )
                 
-        except requests.RequestException as e:
+        except HTTPException:
+            raise
+        except (httpx.HTTPError, CircuitOpenError) as e:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Authentication service unavailable"
@@ -74,7 +78,7 @@ class AuthenticationService:
                 'refresh_token': request.refresh_token,
             }
             
-            response = requests.post(self.token_url, data=data, timeout=10)
+            response = await keycloak_http.post(self.token_url, data=data)
             
             if response.status_code == 200:
                 token_data = response.json()
@@ -90,7 +94,9 @@ class AuthenticationService:
                     detail="Invalid refresh token"
                 )
                 
-        except requests.RequestException as e:
+        except HTTPException:
+            raise
+        except (httpx.HTTPError, CircuitOpenError) as e:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Authentication service unavailable"
@@ -107,7 +113,7 @@ class AuthenticationService:
         """
         try:
             headers = {"Authorization": f"Bearer {access_token}"}
-            response = requests.get(self.userinfo_url, headers=headers, timeout=10)
+            response = await keycloak_http.get(self.userinfo_url, headers=headers)
             
             if response.status_code == 200:
                 return response.json()
@@ -117,7 +123,9 @@ class AuthenticationService:
                     detail="Invalid access token"
                 )
                 
-        except requests.RequestException as e:
+        except HTTPException:
+            raise
+        except (httpx.HTTPError, CircuitOpenError) as e:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Authentication service unavailable"
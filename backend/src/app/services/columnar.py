@@ -0,0 +1,83 @@
+"""
+Columnar encodings of KPI value series.
+
+A list of KPI value objects repeats every key name and an ISO timestamp per
+row. The columnar encodings send one array per column instead, with
+timestamps as int64 milliseconds since the Unix epoch (UTC):
+
+- ``application/vnd.kpi-columns+json``: a JSON object of arrays
+- ``application/vnd.apache.arrow.stream``: an Apache Arrow IPC stream
+  (``timestamp[ms, UTC]``, ``float64``, ``utf8``), when ``pyarrow`` is installed
+"""
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+JSON = "application/json"
+COLUMNS_JSON = "application/vnd.kpi-columns+json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# Representations of a KPI value page, the default (list of objects) first
+SERIES_MEDIA_TYPES = (JSON, COLUMNS_JSON) + ((ARROW_STREAM,) if ARROW_AVAILABLE else ())
+
+# OpenAPI description of the columnar alternatives
+SERIES_CONTENT = {
+    COLUMNS_JSON: {"example": {"kpi_id": 1, "timestamp": [1704067200000], "value": [25.5], "category_label": None}},
+    ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}},
+}
+
+SeriesRow = Tuple[int, datetime, float, Optional[str]]
+
+
+def _columns(rows: Sequence[SeriesRow]) -> Tuple[np.ndarray, np.ndarray, List[Optional[str]]]:
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64), []
+    _, timestamps, values, labels = zip(*rows)
+    return (
+        np.array(timestamps, dtype="datetime64[ms]").astype(np.int64),
+        np.array(values, dtype=np.float64),
+        list(labels),
+    )
+
+
+def encode_columns_json(kpi_id: int, rows: Sequence[SeriesRow]) -> bytes:
+    """
+    ``{"kpi_id", "timestamp": [...], "value": [...], "category_label": [...]}``;
+    ``category_label`` is null rather than an array when no row has one.
+    """
+    timestamps, values, labels = _columns(rows)
+    body: Dict[str, Any] = {
+        "kpi_id": kpi_id,
+        "timestamp": timestamps.tolist(),
+        "value": values.tolist(),
+        "category_label": labels if any(label is not None for label in labels) else None,
+    }
+    return json.dumps(body, separators=(",", ":")).encode()
+
+
+def encode_arrow(kpi_id: int, rows: Sequence[SeriesRow]) -> bytes:
+    """One-batch Arrow IPC stream; the KPI id is in the schema metadata."""
+    timestamps, values, labels = _columns(rows)
+    table = pa.table(
+        {
+            "timestamp": pa.array(timestamps, type=pa.timestamp("ms", tz="UTC")),
+            "value": pa.array(values, type=pa.float64()),
+            "category_label": pa.array(labels, type=pa.string()),
+        },
+        metadata={"kpi_id": str(kpi_id)},
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+ENCODERS = {COLUMNS_JSON: encode_columns_json, ARROW_STREAM: encode_arrow}
@@ -0,0 +1,64 @@
+"""
+Largest-Triangle-Three-Buckets (LTTB) downsampling of time series.
+"""
+from datetime import datetime
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of the ``threshold`` points LTTB keeps from the series ``(x, y)``.
+
+    ``x`` must be sorted ascending. The first and last points are always kept;
+    the points in between are split into ``threshold - 2`` equal buckets and
+    each bucket keeps the point forming the largest triangle with the point
+    kept from the previous bucket and the average of the next bucket, which
+    preserves peaks and troughs. Bucket averages come from prefix sums and the
+    triangle areas of a bucket are computed in one vectorised step, so the
+    Python loop runs once per output point rather than once per input point.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket b covers [edges[b], edges[b + 1]) of the inner points 1 .. n-2
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+
+    # Average of every bucket, with the last point as the bucket after the last one
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = np.maximum(edges[1:] - edges[:-1], 1)
+    avg_x = np.append((x_sums[edges[1:]] - x_sums[edges[:-1]]) / sizes, x[-1])
+    avg_y = np.append((y_sums[edges[1:]] - y_sums[edges[:-1]]) / sizes, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for b in range(threshold - 2):
+        start, end = edges[b], max(edges[b + 1], edges[b] + 1)
+        ax, ay = x[a], y[a]
+        cx, cy = avg_x[b + 1], avg_y[b + 1]
+        # Twice the triangle area; the factor does not change the argmax
+        areas = np.abs((ax - cx) * (y[start:end] - ay) - (ax - x[start:end]) * (cy - ay))
+        a = start + int(np.argmax(areas))
+        selected[b + 1] = a
+
+    return selected
+
+
+def downsample_rows(rows: Sequence[Tuple[datetime, float]], threshold: int) -> List[Tuple[datetime, float]]:
+    """LTTB-reduce time-ordered ``(timestamp, value)`` rows to at most ``threshold`` rows."""
+    if len(rows) <= threshold:
+        return list(rows)
+
+    timestamps, values = zip(*rows)
+    x = np.array(timestamps, dtype="datetime64[us]").astype(np.int64)
+    y = np.array(values, dtype=np.float64)
+    return [rows[i] for i in lttb_indices(x, y, threshold)]
@@ -0,0 +1,41 @@
+"""
+Text encoders for streamed KPI value exports.
+"""
+import csv
+import io
+import json
+from typing import Iterable, Optional, Tuple
+from datetime import datetime
+
+# Export format -> response media type
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+EXPORT_COLUMNS = ("timestamp", "value", "category_label")
+
+ExportRow = Tuple[datetime, float, Optional[str]]
+
+
+def csv_header() -> str:
+    return ",".join(EXPORT_COLUMNS) + "\n"
+
+
+def encode_csv(rows: Iterable[ExportRow]) -> str:
+    """CSV lines for a batch of rows (no header); a missing category is an empty field."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows((timestamp.isoformat(), value, category_label) for timestamp, value, category_label in rows)
+    return buffer.getvalue()
+
+
+def encode_ndjson(rows: Iterable[ExportRow]) -> str:
+    """One JSON object per line for a batch of rows."""
+    return "".join(
+        json.dumps({"timestamp": timestamp.isoformat(), "value": value, "category_label": category_label}) + "\n"
+        for timestamp, value, category_label in rows
+    )
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson}
@@ -0,0 +1,6 @@
+"""
+Benchmark suite for the Climaborough API.
+
+Benchmarks run fully in-process (no Keycloak, no PostgreSQL) and are meant to
+be run from `backend/src`, e.g. `python -m benchmarks.bench_auth`.
+"""
@@ -0,0 +1,66 @@
+"""
+KPI value aggregation benchmark.
+
+Runs `KPIValueRepository.get_aggregated_by_period` against an in-memory SQLite
+database seeded with a regular series, once per bucket width. The time buckets
+compile to SQLite epoch arithmetic here and to date_trunc/date_bin on
+PostgreSQL, so the same repository code is measured.
+
+Usage (from backend/src):
+    python -m benchmarks.bench_aggregation [--points N] [--requests N] [--json out.json]
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+PERIODS = ("5min", "15min", "hour", "day", "week", "month")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100_000, help="Values in the seeded series")
+    parser.add_argument("--interval", type=int, default=300, help="Seconds between values")
+    parser.add_argument("--requests", type=int, default=50, help="Queries per bucket width")
+    parser.add_argument("--json", dest="json_path", help="Write results as JSON to this file")
+    return parser.parse_args()
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.repositories import kpi_value_repo
+    from .common import sqlite_session_factory, seed_kpi_series, run_load, report
+
+    session_factory = sqlite_session_factory()
+    interval = timedelta(seconds=args.interval)
+    start = datetime(2023, 1, 1)
+    end = start + args.points * interval
+    kpi_id = seed_kpi_series(session_factory, args.points, interval, start)
+
+    results = []
+    for period in PERIODS:
+        buckets = 0
+
+        async def query(i: int) -> int:
+            nonlocal buckets
+            db = session_factory()
+            try:
+                rows = kpi_value_repo.get_aggregated_by_period(
+                    db, kpi_id=kpi_id, period=period, start_date=start, end_date=end
+                )
+            finally:
+                db.close()
+            buckets = len(rows)
+            return 200
+
+        result = await run_load(period, query, args.requests, 1)
+        result.extra["buckets"] = buckets
+        results.append(result)
+
+    report(results, args.json_path)
+
+
+def main() -> None:
+    asyncio.run(run(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
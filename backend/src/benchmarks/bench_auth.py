@@ -0,0 +1,150 @@
+"""
+Token-verification throughput benchmark.
+
+Drives the real `/kpis` router (and its `KeycloakBearer` dependency) in-process,
+with keys served by a local JWKS stub and an in-memory SQLite database, so no
+request ever reaches auth.climaplatform.eu.
+
+Scenarios:
+- baseline:  auth dependency overridden, i.e. the cost of the route itself
+- cold:      JWKS and token caches cleared before every request
+- verify:    warm JWKS, a distinct token per request (signature verification)
+- warm:      warm JWKS and token cache, the same token repeated
+- rotation:  the signing key rotates; tokens signed with the new kid trigger
+             one kid-miss refresh
+
+Usage (from backend/src):
+    python -m benchmarks.bench_auth [--requests N] [--concurrency C] [--json out.json]
+"""
+import argparse
+import asyncio
+import os
+
+from .jwks_stub import JWKSStub
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--json", dest="json_path", help="Write results as JSON to this file")
+    return parser.parse_args()
+
+
+def seed(session_factory) -> None:
+    """Create the city and KPI the benchmarked route reads."""
+    from app.models import City, KPI
+
+    db = session_factory()
+    try:
+        city = City(name="Differdange", code="differdange", country="Luxembourg")
+        db.add(city)
+        db.flush()
+        db.add(KPI(
+            id_kpi="BENCH_KPI", name="Benchmark KPI", category="Environment",
+            unit_text="AQI", city_id=city.id
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(args: argparse.Namespace, stub: JWKSStub):
+    import httpx
+    from fastapi import FastAPI
+
+    from app.api import kpis
+    from app.core.database import get_db
+    from app.core.jwks import jwks_cache
+    from app.core.token_cache import token_cache
+    from .common import sqlite_session_factory, run_load, report
+
+    session_factory = sqlite_session_factory()
+    seed(session_factory)
+
+    def get_bench_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(kpis.router)
+    app.dependency_overrides[get_db] = get_bench_db
+    bearer = kpis.router.dependencies[0].dependency
+
+    url = "/kpis/categories?city_id=1"
+    n, concurrency = args.requests, args.concurrency
+    results = []
+
+    def reset_caches(_: int = 0) -> None:
+        jwks_cache.clear()
+        token_cache.clear()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def get(token: str) -> int:
+            response = await client.get(url, headers={"Authorization": f"Bearer {token}"})
+            return response.status_code
+
+        # Baseline: same route, no token verification (after a short warm-up)
+        app.dependency_overrides[bearer] = lambda: {}
+        await run_load("warm-up", lambda i: get("-"), min(n, 200), concurrency)
+        results.append(await run_load("baseline (no auth)", lambda i: get("-"), n, concurrency))
+        del app.dependency_overrides[bearer]
+
+        # Cold: every request fetches the JWKS and verifies the signature
+        token = stub.mint()
+        fetches = stub.fetches
+        result = await run_load("cold cache", lambda i: get(token), n, concurrency, before_each=reset_caches)
+        result.extra["jwks_fetches"] = stub.fetches - fetches
+        results.append(result)
+
+        # Verify: keys cached, but every token is new to the token cache
+        reset_caches()
+        tokens = [stub.mint() for _ in range(n)]
+        await get(tokens[0])
+        fetches = stub.fetches
+        result = await run_load("warm keys, new tokens", lambda i: get(tokens[i]), n, concurrency)
+        result.extra["jwks_fetches"] = stub.fetches - fetches
+        results.append(result)
+
+        # Warm: keys and token cached
+        hits = token_cache.hits
+        result = await run_load("warm cache", lambda i: get(token), n, concurrency)
+        result.extra["token_cache_hits"] = token_cache.hits - hits
+        results.append(result)
+
+        # Rotation: a new key is published; half the traffic already uses it
+        old_key = stub.current_key
+        new_key = stub.rotate()
+        old_tokens = [stub.mint(old_key) for _ in range(n // 2)]
+        new_tokens = [stub.mint(new_key) for _ in range(n - n // 2)]
+        mixed = [tok for pair in zip(old_tokens, new_tokens) for tok in pair] + new_tokens[len(old_tokens):]
+        fetches = stub.fetches
+        result = await run_load("key rotation", lambda i: get(mixed[i]), n, concurrency)
+        result.extra["jwks_fetches"] = stub.fetches - fetches
+        results.append(result)
+
+    report(results, args.json_path)
+
+
+def main() -> None:
+    args = parse_args()
+    stub = JWKSStub().start()
+
+    # Point the application at the stub before its settings are loaded
+    os.environ["KEYCLOAK_SERVER_URL"] = stub.server_url
+    os.environ["KEYCLOAK_REALM"] = stub.realm
+    os.environ.setdefault("JWKS_MIN_REFRESH_INTERVAL", "0")
+
+    try:
+        asyncio.run(run(args, stub))
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
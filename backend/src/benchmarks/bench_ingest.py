@@ -0,0 +1,97 @@
+"""
+KPI value bulk ingestion benchmark.
+
+Compares, per batch size, the former ORM path (one ``KPIValue`` object per
+row, ``add_all`` and commit) with `KPIValueRepository.bulk_create` (one
+multi-row INSERT ... ON CONFLICT DO NOTHING), and the latter on a batch that
+is entirely duplicates. Both paths update the rollups and latest values.
+Runs against an in-memory SQLite database.
+
+Usage (from backend/src):
+    python -m benchmarks.bench_ingest [--batches N] [--sizes 1000,10000] [--json out.json]
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+from .common import sqlite_session_factory, seed_kpi_series, run_load, report
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, default=10, help="Batches per scenario")
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated batch sizes")
+    parser.add_argument("--json", dest="json_path", help="Write results as JSON to this file")
+    return parser.parse_args()
+
+
+def make_batch(kpi_id: int, size: int, start: datetime) -> list:
+    rng = random.Random(size)
+    return [
+        {"kpi_id": kpi_id, "timestamp": start + timedelta(minutes=i), "value": rng.uniform(0, 100), "category_label": None}
+        for i in range(size)
+    ]
+
+
+async def run(args: argparse.Namespace) -> None:
+    from app.models import KPIValue
+    from app.repositories import kpi_value_repo
+
+    session_factory = sqlite_session_factory()
+    kpi_id = seed_kpi_series(session_factory, 1, timedelta(minutes=1), datetime(2000, 1, 1))
+
+    def orm_insert(db, values: list) -> None:
+        objects = [KPIValue(**value) for value in values]
+        db.add_all(objects)
+        db.flush()
+        kpi_value_repo._record_inserted(db, [
+            {"id": obj.id, "kpi_id": obj.kpi_id, "timestamp": obj.timestamp, "value": obj.value, "category_label": obj.category_label}
+            for obj in objects
+        ])
+        db.commit()
+
+    def set_insert(db, values: list) -> None:
+        kpi_value_repo.bulk_create(db, values=values)
+
+    results = []
+    origin = datetime(2010, 1, 1)
+    for size in (int(size) for size in args.sizes.split(",")):
+        for name, insert in (("orm", orm_insert), ("insert", set_insert)):
+            # Every scenario writes fresh timestamps
+            origin += timedelta(days=365 * 30)
+            base = origin
+
+            async def send(i: int) -> int:
+                db = session_factory()
+                try:
+                    insert(db, make_batch(kpi_id, size, base + timedelta(minutes=i * size)))
+                finally:
+                    db.close()
+                return 200
+
+            result = await run_load(f"{name}/{size}", send, args.batches, 1, batch=size)
+            result.extra["rows_per_s"] = round(result.rps * size)
+            results.append(result)
+
+        async def send_duplicates(i: int) -> int:
+            db = session_factory()
+            try:
+                set_insert(db, make_batch(kpi_id, size, base))
+            finally:
+                db.close()
+            return 200
+
+        result = await run_load(f"insert-dup/{size}", send_duplicates, args.batches, 1, batch=size)
+        result.extra["rows_per_s"] = round(result.rps * size)
+        results.append(result)
+
+    report(results, args.json_path)
+
+
+def main() -> None:
+    asyncio.run(run(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
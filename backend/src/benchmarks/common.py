@@ -0,0 +1,162 @@
+"""
+Shared helpers for the benchmark suite: in-memory database, load driver, reporting.
+"""
+import asyncio
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Any, List, Optional, Awaitable
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+def sqlite_session_factory() -> sessionmaker:
+    """Create an in-memory SQLite database with the full schema."""
+    from app.core.database import Base
+    from app import models  # noqa: F401  (register all tables)
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def seed_kpi_series(
+    session_factory: sessionmaker,
+    points: int,
+    interval: timedelta,
+    start: datetime = datetime(2023, 1, 1)
+) -> int:
+    """
+    Create a city and a KPI with ``points`` values ``interval`` apart (a daily
+    sine wave with noise), with rollups and latest value as for ingested values,
+    and return the KPI ID.
+    """
+    from app.models import City, KPI, KPIValue
+    from app.repositories import kpi_value_repo
+
+    db = session_factory()
+    try:
+        city = City(name="Differdange", code="differdange", country="Luxembourg")
+        db.add(city)
+        db.flush()
+        kpi = KPI(
+            id_kpi="BENCH_SERIES", name="Benchmark series", category="Environment",
+            unit_text="AQI", city_id=city.id
+        )
+        db.add(kpi)
+        db.flush()
+
+        rng = random.Random(42)
+        period = timedelta(days=1) / interval
+        rows = [
+            {
+                "kpi_id": kpi.id,
+                "timestamp": start + i * interval,
+                "value": 50 + 20 * math.sin(2 * math.pi * i / period) + rng.gauss(0, 3),
+            }
+            for i in range(points)
+        ]
+        db.execute(insert(KPIValue), rows)
+        db.commit()
+        kpi_value_repo.rebuild_rollups(db, kpi_ids=[kpi.id])
+        kpi_value_repo.rebuild_latest_values(db, kpi_ids=[kpi.id])
+        return kpi.id
+    finally:
+        db.close()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class BenchResult:
+    """Throughput and latency of one benchmark scenario."""
+
+    def __init__(self, name: str, latencies: List[float], elapsed: float, errors: int = 0, **extra: Any):
+        self.name = name
+        self.requests = len(latencies)
+        self.elapsed = elapsed
+        self.errors = errors
+        self.rps = self.requests / elapsed if elapsed else 0.0
+        self.p50_ms = percentile(latencies, 50) * 1000
+        self.p99_ms = percentile(latencies, 99) * 1000
+        self.extra = extra
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "requests": self.requests,
+            "errors": self.errors,
+            "elapsed_s": round(self.elapsed, 4),
+            "rps": round(self.rps, 1),
+            "p50_ms": round(self.p50_ms, 3),
+            "p99_ms": round(self.p99_ms, 3),
+            **self.extra,
+        }
+
+
+async def run_load(
+    name: str,
+    send: Callable[[int], Awaitable[int]],
+    requests: int,
+    concurrency: int,
+    before_each: Optional[Callable[[int], None]] = None,
+    expected_status: int = 200,
+    **extra: Any
+) -> BenchResult:
+    """
+    Issue ``requests`` calls of ``send(i)`` from ``concurrency`` workers.
+    ``send`` returns the HTTP status code; anything but ``expected_status`` is an error.
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            if before_each is not None:
+                before_each(i)
+            start = time.perf_counter()
+            status_code = await send(i)
+            latencies.append(time.perf_counter() - start)
+            if status_code != expected_status:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return BenchResult(name, latencies, elapsed, errors, **extra)
+
+
+def report(results: List[BenchResult], json_path: Optional[str] = None) -> None:
+    """Print a results table and optionally write them as JSON (for CI)."""
+    header = f"{'scenario':<22}{'requests':>10}{'errors':>8}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result.name:<22}{result.requests:>10}{result.errors:>8}"
+            f"{result.rps:>12.1f}{result.p50_ms:>10.3f}{result.p99_ms:>10.3f}"
+        )
+        if result.extra:
+            details = ", ".join(f"{key}={value}" for key, value in result.extra.items())
+            print(f"{'':<22}{details}")
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump([result.as_dict() for result in results], f, indent=2)
+        print(f"\nResults written to {json_path}")
@@ -0,0 +1,186 @@
+"""
+In-process Keycloak stand-in: local RSA keys, a JWKS endpoint, token minting
+and the OIDC token and userinfo endpoints.
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+
+class SigningKey:
+    """A locally generated RSA key pair published under ``kid``."""
+
+    def __init__(self, kid: Optional[str] = None):
+        self.kid = kid or uuid.uuid4().hex
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        )
+        # Parsed once: loading a PEM private key costs tens of milliseconds
+        self.signing_key = jwk.construct(self.private_pem, "RS256")
+        public_pem = private_key.public_key().public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        public_jwk = jwk.construct(public_pem, "RS256").to_dict()
+        self.public_jwk = {
+            name: value.decode() if isinstance(value, bytes) else value
+            for name, value in public_jwk.items()
+        }
+        self.public_jwk.update(kid=self.kid, use="sig", alg="RS256")
+
+
+class JWKSStub:
+    """
+    Serves ``/realms/<realm>/protocol/openid-connect/{certs,token,userinfo}``
+    on localhost.
+
+    Keys can be rotated at any time; ``fetches`` counts JWKS downloads so
+    benchmarks can check that caching and single-flight refreshes hold. The
+    token endpoint supports the password (for ``users``) and refresh_token
+    grants; ``token_requests`` counts its calls.
+    """
+
+    def __init__(
+        self,
+        realm: str = "climaborough",
+        client_id: str = "climaborough-platform",
+        users: Optional[Dict[str, str]] = None
+    ):
+        self.realm = realm
+        self.client_id = client_id
+        self.keys: List[SigningKey] = [SigningKey()]
+        self.users = users if users is not None else {"bench": "bench"}
+        self.refresh_tokens: Dict[str, str] = {}
+        self.fetches = 0
+        self.token_requests = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def server_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def current_key(self) -> SigningKey:
+        return self.keys[-1]
+
+    def start(self) -> "JWKSStub":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.endswith("/protocol/openid-connect/certs"):
+                    stub.fetches += 1
+                    self._send_json(200, {"keys": [key.public_jwk for key in stub.keys]})
+                elif self.path.endswith("/protocol/openid-connect/userinfo"):
+                    authorization = self.headers.get("Authorization", "")
+                    claims = stub.verify(authorization[len("Bearer "):]) if authorization.startswith("Bearer ") else None
+                    if claims is None:
+                        self._send_json(401, {"error": "invalid_token"})
+                    else:
+                        self._send_json(200, {"sub": claims["sub"], "preferred_username": claims["preferred_username"]})
+                else:
+                    self.send_error(404)
+
+            def do_POST(self):
+                if not self.path.endswith("/protocol/openid-connect/token"):
+                    self.send_error(404)
+                    return
+                stub.token_requests += 1
+                length = int(self.headers.get("Content-Length", 0))
+                form = {name: values[0] for name, values in parse_qs(self.rfile.read(length).decode()).items()}
+                status, body = stub.token(form)
+                self._send_json(status, body)
+
+            def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def rotate(self, keep_previous: bool = True) -> SigningKey:
+        """Publish a new signing key (optionally retiring the old ones)."""
+        new_key = SigningKey()
+        self.keys = (self.keys if keep_previous else []) + [new_key]
+        return new_key
+
+    def mint(self, key: Optional[SigningKey] = None, lifetime: int = 300, **claims: Any) -> str:
+        """Mint a Keycloak-shaped access token."""
+        key = key or self.current_key
+        now = int(time.time())
+        payload: Dict[str, Any] = {
+            "exp": now + lifetime,
+            "iat": now,
+            "jti": uuid.uuid4().hex,
+            "iss": f"{self.server_url}/realms/{self.realm}",
+            "aud": "account",
+            "sub": str(uuid.uuid4()),
+            "typ": "Bearer",
+            "azp": self.client_id,
+            "preferred_username": "bench",
+            "realm_access": {"roles": ["offline_access", "uma_authorization"]},
+            "resource_access": {self.client_id: {"roles": ["viewer"]}},
+        }
+        payload.update(claims)
+        return jwt.encode(payload, key.signing_key, algorithm="RS256", headers={"kid": key.kid})
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a token signed by one of the published keys, None if invalid or expired."""
+        for key in self.keys:
+            try:
+                return jwt.decode(token, key.public_jwk, algorithms=["RS256"], options={"verify_aud": False})
+            except Exception:
+                continue
+        return None
+
+    def token(self, form: Dict[str, str]) -> Tuple[int, Dict[str, Any]]:
+        """Status and body of the token endpoint's response to ``form``."""
+        if form.get("client_id") != self.client_id:
+            return 401, {"error": "unauthorized_client", "error_description": "Invalid client"}
+        grant_type = form.get("grant_type")
+        if grant_type == "password":
+            username = form.get("username")
+            if username not in self.users or self.users[username] != form.get("password"):
+                return 401, {"error": "invalid_grant", "error_description": "Invalid user credentials"}
+        elif grant_type == "refresh_token":
+            # Refresh tokens are single use, as with Keycloak's refresh token rotation
+            username = self.refresh_tokens.pop(form.get("refresh_token", ""), None)
+            if username is None:
+                return 400, {"error": "invalid_grant", "error_description": "Invalid refresh token"}
+        else:
+            return 400, {"error": "unsupported_grant_type"}
+
+        refresh_token = uuid.uuid4().hex
+        self.refresh_tokens[refresh_token] = username
+        return 200, {
+            "access_token": self.mint(preferred_username=username),
+            "token_type": "Bearer",
+            "expires_in": 300,
+            "refresh_token": refresh_token,
+        }
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Create the unique index on the identity of KPI values
+(uq_kpivalue_kpi_timestamp_label) on databases set up before it existed.
+Bulk and batch ingestion (INSERT ... ON CONFLICT DO NOTHING) require it.
+
+Values duplicating another on (kpi_id, timestamp, category_label) are deleted
+first, keeping the oldest (lowest id), and the rollups and latest values of
+their KPIs are rebuilt. On PostgreSQL the index is built CONCURRENTLY so
+ingestion keeps running; if a duplicate is written meanwhile the build fails
+and the command can simply be run again.
+"""
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+# Add the app directory to Python path
+sys.path.insert(0, '/code')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.partitions import kpi_value_partitions
+from app.models import KPI_VALUE_IDENTITY, KPILatestValue, KPIValue, KPIValueRollup
+from app.repositories import kpi_value_repo
+
+INDEX = KPI_VALUE_IDENTITY.name
+
+
+def index_state(conn: Connection) -> Optional[bool]:
+    """None if the index is missing, else whether it is usable (False: a failed concurrent build)."""
+    if conn.dialect.name == "postgresql":
+        return conn.execute(text(
+            "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:index)"
+        ), {"index": INDEX}).scalar()
+    # SQLite (reflection skips expression indexes)
+    exists = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :index"
+    ), {"index": INDEX}).scalar()
+    return True if exists else None
+
+
+def _ranked_duplicates():
+    rank = func.row_number().over(partition_by=KPI_VALUE_IDENTITY.expressions, order_by=KPIValue.id).label("rank")
+    ranked = select(KPIValue.id, KPIValue.kpi_id, rank).subquery()
+    return select(ranked.c.id, ranked.c.kpi_id).where(ranked.c.rank > 1).subquery()
+
+
+def find_duplicate_kpis(conn: Connection) -> List[int]:
+    """KPIs having values that duplicate another one."""
+    duplicates = _ranked_duplicates()
+    return list(conn.execute(select(duplicates.c.kpi_id).distinct().order_by(duplicates.c.kpi_id)).scalars())
+
+
+def delete_duplicates() -> int:
+    """Delete duplicate values, rebuild the derived tables of their KPIs and return how many were deleted."""
+    # Creates the tables on databases set up before they existed
+    Base.metadata.create_all(bind=engine, tables=[KPIValueRollup.__table__, KPILatestValue.__table__])
+
+    db = SessionLocal()
+    try:
+        kpi_ids = find_duplicate_kpis(db.connection())
+        if not kpi_ids:
+            return 0
+        duplicates = _ranked_duplicates()
+        deleted = db.execute(
+            delete(KPIValue).where(KPIValue.id.in_(select(duplicates.c.id))),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+        db.commit()
+        kpi_value_repo.rebuild_rollups(db, kpi_ids=kpi_ids)
+        kpi_value_repo.rebuild_latest_values(db, kpi_ids=kpi_ids)
+        return deleted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def create_index() -> None:
+    """Build the index (replacing an invalid one left by a failed concurrent build)."""
+    if engine.dialect.name != "postgresql":
+        with engine.begin() as conn:
+            conn.execute(CreateIndex(KPI_VALUE_IDENTITY, if_not_exists=True))
+        return
+
+    with engine.begin() as conn:
+        # CONCURRENTLY is not available on partitioned tables, which get the index on conversion
+        partitioned = kpi_value_partitions.is_partitioned(conn)
+        state = index_state(conn)
+    ddl = str(CreateIndex(KPI_VALUE_IDENTITY).compile(dialect=engine.dialect))
+    # Concurrent index builds cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if state is False:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY {INDEX}"))
+        if partitioned:
+            conn.execute(text(ddl))
+        else:
+            conn.execute(text(ddl.replace("CREATE UNIQUE INDEX", "CREATE UNIQUE INDEX CONCURRENTLY", 1)))
+
+
+def ensure_index(dedupe: bool = True) -> bool:
+    """
+    Create the index if it is missing or invalid and return whether it is in
+    place. Without ``dedupe`` nothing is deleted: if duplicates exist the
+    index is left missing.
+    """
+    with engine.connect() as conn:
+        if index_state(conn):
+            return True
+        duplicate_kpis = find_duplicate_kpis(conn)
+    if duplicate_kpis:
+        if not dedupe:
+            print(f"⚠️  KPIs {', '.join(map(str, duplicate_kpis))} have duplicate values; "
+                  f"run create_kpi_value_index.py to remove them and create {INDEX}")
+            return False
+        print(f"Deleting duplicate values of KPIs {', '.join(map(str, duplicate_kpis))}...")
+        print(f"✅ Deleted {delete_duplicates()} duplicate values")
+    print(f"Creating index {INDEX}...")
+    create_index()
+    print(f"✅ Created index {INDEX}")
+    return True
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--check", action="store_true",
+        help="Only report whether the index exists and which KPIs have duplicates"
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        with engine.connect() as conn:
+            state = index_state(conn)
+            duplicate_kpis = find_duplicate_kpis(conn)
+        print(f"Index {INDEX}: {'missing' if state is None else 'valid' if state else 'invalid'}")
+        print(f"KPIs with duplicate values: {', '.join(map(str, duplicate_kpis)) or 'none'}")
+        sys.exit(0 if state else 1)
+
+    ensure_index()
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 from app.core.database import Base, SessionLocal, engine
 from app.models import *  # Import all models
+from app.repositories import kpi_value_repo
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,6 +31,46 @@ def create_tables():
     
     logger.info("Database tables created successfully!")
 
+def backfill_rollups():
+    """
+    Fill kpi_value_rollups from the raw values when it is empty but values
+    exist: aggregations read the rollups, so a database that predates them
+    would otherwise return empty aggregates.
+    """
+    db = SessionLocal()
+    try:
+        if db.query(KPIValueRollup.kpi_id).first() is not None or db.query(KPIValue.id).first() is None:
+            return
+        logger.info("Rollups are empty; backfilling them from the KPI values...")
+        written = kpi_value_repo.rebuild_rollups(db)
+        logger.info(f"Wrote {written} rollup rows")
+    except Exception as e:
+        logger.error(f"Error backfilling rollups: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def backfill_latest_values():
+    """
+    Fill kpi_latest_values from the raw values when it is empty but values
+    exist: latest-value reads join it, so a database that predates it would
+    otherwise report no latest value for KPIs not written to since.
+    """
+    db = SessionLocal()
+    try:
+        if db.query(KPILatestValue.kpi_id).first() is not None or db.query(KPIValue.id).first() is None:
+            return
+        logger.info("Latest values are empty; backfilling them from the KPI values...")
+        written = kpi_value_repo.rebuild_latest_values(db)
+        logger.info(f"Wrote latest values of {written} KPIs")
+    except Exception as e:
+        logger.error(f"Error backfilling latest values: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 def create_sample_data(engine):
     """Create sample cities and minimal KPIs if database is empty."""
     
@@ -76,6 +117,10 @@ def main():
         # Create tables
         create_tables()
         
+        # Fill the rollups and latest values of databases created before they existed
+        backfill_rollups()
+        backfill_latest_values()
+        
         # Create sample data
         create_sample_data(engine)
         
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Manage the monthly partitions of kpi_values (PostgreSQL).
+
+  convert           Move an existing kpi_values into a table partitioned by month
+                    (blocks reads and writes of kpi_values while it runs)
+  ensure            Create the partitions of the current and coming months
+  list              Show the partitions
+  drop-before MONTH Drop the partitions of the months before MONTH (YYYY-MM)
+
+Dropped months keep their rollups; run rebuild_rollups.py to recompute them
+from the remaining values.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+# Add the app directory to Python path
+sys.path.insert(0, '/code')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import engine
+from app.core.partitions import kpi_value_partitions
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="Partition the existing table")
+    convert.add_argument(
+        "--keep-legacy", action="store_true",
+        help="Keep the old table as kpi_values_unpartitioned instead of dropping it"
+    )
+    commands.add_parser("ensure", help="Create upcoming partitions")
+    commands.add_parser("list", help="List partitions")
+    drop = commands.add_parser("drop-before", help="Drop old partitions")
+    drop.add_argument("month", type=lambda value: datetime.strptime(value, "%Y-%m").date(), help="YYYY-MM")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print("❌ Partitioning requires PostgreSQL")
+        sys.exit(1)
+
+    with engine.begin() as conn:
+        if args.command == "convert":
+            if kpi_value_partitions.is_partitioned(conn):
+                print("ℹ️  kpi_values is already partitioned")
+                return
+            moved = kpi_value_partitions.convert(conn, keep_legacy=args.keep_legacy)
+            print(f"✅ Moved {moved} values into monthly partitions")
+        elif args.command == "ensure":
+            created = kpi_value_partitions.ensure_ahead(conn)
+            print(f"✅ Created {created} partitions")
+        elif args.command == "list":
+            for name, month in kpi_value_partitions.partitions(conn):
+                print(f"{name:<32}{month.strftime('%Y-%m') if month else 'default'}")
+        elif args.command == "drop-before":
+            dropped = kpi_value_partitions.drop_before(conn, args.month)
+            print(f"✅ Dropped {len(dropped)} partitions: {', '.join(dropped) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
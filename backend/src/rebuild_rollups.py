@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Rebuild the tables derived from KPI values, the rollups (kpi_value_rollups)
+and latest values (kpi_latest_values), from the raw values. Run it once after
+creating the tables on an existing database, or to repair KPIs whose values
+were changed outside the API.
+"""
+import argparse
+import os
+import sys
+
+# Add the app directory to Python path
+sys.path.insert(0, '/code')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.database import Base, SessionLocal, engine
+from app.models import KPILatestValue, KPIValueRollup
+from app.repositories import kpi_value_repo
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--kpi-id", type=int, action="append", dest="kpi_ids",
+        help="KPI to rebuild (repeatable); all KPIs if omitted"
+    )
+    args = parser.parse_args()
+
+    # Creates the tables on databases set up before they existed
+    Base.metadata.create_all(bind=engine, tables=[KPIValueRollup.__table__, KPILatestValue.__table__])
+
+    db = SessionLocal()
+    try:
+        scope = ", ".join(map(str, args.kpi_ids)) if args.kpi_ids else "all KPIs"
+        print(f"Rebuilding rollups and latest values for {scope}...")
+        written = kpi_value_repo.rebuild_rollups(db, kpi_ids=args.kpi_ids)
+        print(f"✅ Wrote {written} rollup rows")
+        written = kpi_value_repo.rebuild_latest_values(db, kpi_ids=args.kpi_ids)
+        print(f"✅ Wrote latest values of {written} KPIs")
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -47,6 +47,17 @@ def initialize_database():
         # Don't fail if tables already exist
         return True
 
+def ensure_kpi_value_index():
+    """Create the unique index bulk ingestion needs on databases set up before it existed."""
+    print("\nChecking KPI value index...")
+    try:
+        from create_kpi_value_index import ensure_index
+        # Duplicates are only deleted when create_kpi_value_index.py is run by hand
+        if ensure_index(dedupe=False):
+            print("✓ KPI value index in place!")
+    except Exception as e:
+        print(f"⚠️  KPI value index: {e}")
+
 def create_minimal_kpis():
     """Create minimal KPIs if AUTO_CREATE_KPIS is enabled."""
     auto_create = os.getenv("AUTO_CREATE_KPIS", "false").lower() == "true"
@@ -97,10 +108,13 @@ def main():
         # Step 2: Initialize database schema
         initialize_database()
         
-        # Step 3: Create minimal KPIs (if enabled)
+        # Step 3: Create the KPI value index (existing databases)
+        ensure_kpi_value_index()
+        
+        # Step 4: Create minimal KPIs (if enabled)
         create_minimal_kpis()
         
-        # Step 4: Start the server
+        # Step 5: Start the server
         start_server()
         
     except Exception as e:
@@ -0,0 +1,22 @@
+"""
+Shared fixtures. Tests run from backend/src: ``python -m pytest tests``.
+"""
+import os
+import sys
+
+# Make the app and benchmarks packages importable from any working directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from benchmarks.jwks_stub import JWKSStub
+
+
+@pytest.fixture
+def oidc_stub():
+    """Local Keycloak stand-in with the user ``alice`` (password ``secret``)."""
+    stub = JWKSStub(users={"alice": "secret"}).start()
+    try:
+        yield stub
+    finally:
+        stub.stop()
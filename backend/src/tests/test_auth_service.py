@@ -0,0 +1,139 @@
+"""
+AuthenticationService against a local OIDC token/userinfo stub.
+"""
+import socket
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+from app.core.http import KeycloakHTTPClient
+from app.schemas import RefreshTokenRequest, TokenRequest
+from app.services import auth
+from app.services.auth import AuthenticationService
+
+
+@pytest_asyncio.fixture
+async def http_client(monkeypatch):
+    """A fresh client (and circuit breaker) for each test instead of the shared one."""
+    client = KeycloakHTTPClient(
+        timeout=2.0,
+        max_connections=5,
+        max_keepalive_connections=5,
+        breaker=CircuitBreaker(
+            name="keycloak-test",
+            failure_rate_threshold=0.5,
+            minimum_calls=2,
+            window=60.0,
+            reset_timeout=60.0,
+            half_open_max_calls=1,
+            max_in_flight=5
+        )
+    )
+    monkeypatch.setattr(auth, "keycloak_http", client)
+    yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def service(oidc_stub, monkeypatch):
+    monkeypatch.setattr(settings, "KEYCLOAK_SERVER_URL", oidc_stub.server_url)
+    monkeypatch.setattr(settings, "KEYCLOAK_REALM", oidc_stub.realm)
+    monkeypatch.setattr(settings, "KEYCLOAK_CLIENT_ID", oidc_stub.client_id)
+    return AuthenticationService()
+
+
+@pytest.fixture
+def unreachable_service(service):
+    """The service pointed at a local port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    service.token_url = f"http://127.0.0.1:{port}/token"
+    service.userinfo_url = f"http://127.0.0.1:{port}/userinfo"
+    return service
+
+
+@pytest.mark.asyncio
+async def test_get_access_token(service, oidc_stub, http_client):
+    token = await service.get_access_token(TokenRequest(username="alice", password="secret"))
+
+    assert token.token_type == "bearer"
+    assert token.expires_in == 300
+    assert token.refresh_token in oidc_stub.refresh_tokens
+    assert oidc_stub.verify(token.access_token)["preferred_username"] == "alice"
+
+
+@pytest.mark.asyncio
+async def test_get_access_token_bad_credentials(service, http_client):
+    with pytest.raises(HTTPException) as error:
+        await service.get_access_token(TokenRequest(username="alice", password="wrong"))
+
+    assert error.value.status_code == 401
+    assert error.value.detail == "Invalid user credentials"
+
+
+@pytest.mark.asyncio
+async def test_refresh_access_token(service, oidc_stub, http_client):
+    token = await service.get_access_token(TokenRequest(username="alice", password="secret"))
+
+    refreshed = await service.refresh_access_token(RefreshTokenRequest(refresh_token=token.refresh_token))
+
+    assert refreshed.refresh_token != token.refresh_token
+    assert oidc_stub.verify(refreshed.access_token)["preferred_username"] == "alice"
+
+
+@pytest.mark.asyncio
+async def test_refresh_access_token_invalid(service, http_client):
+    with pytest.raises(HTTPException) as error:
+        await service.refresh_access_token(RefreshTokenRequest(refresh_token="unknown"))
+
+    assert error.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_get_user_info(service, http_client):
+    token = await service.get_access_token(TokenRequest(username="alice", password="secret"))
+
+    user_info = await service.get_user_info(token.access_token)
+
+    assert user_info["preferred_username"] == "alice"
+
+
+@pytest.mark.asyncio
+async def test_get_user_info_invalid_token(service, oidc_stub, http_client):
+    with pytest.raises(HTTPException) as error:
+        await service.get_user_info(oidc_stub.mint(lifetime=-60))
+
+    assert error.value.status_code == 401
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("call", [
+    lambda service: service.get_access_token(TokenRequest(username="alice", password="secret")),
+    lambda service: service.refresh_access_token(RefreshTokenRequest(refresh_token="token")),
+    lambda service: service.get_user_info("token"),
+])
+async def test_unreachable_server(unreachable_service, http_client, call):
+    with pytest.raises(HTTPException) as error:
+        await call(unreachable_service)
+
+    assert error.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_open_circuit(unreachable_service, oidc_stub, http_client):
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await unreachable_service.get_access_token(TokenRequest(username="alice", password="secret"))
+    assert http_client.breaker.state == CircuitBreaker.OPEN
+
+    # The server is back, but calls are rejected until the circuit half-opens
+    service = AuthenticationService()
+    with pytest.raises(HTTPException) as error:
+        await service.get_access_token(TokenRequest(username="alice", password="secret"))
+
+    assert error.value.status_code == 503
+    assert oidc_stub.token_requests == 0
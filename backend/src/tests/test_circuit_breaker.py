@@ -0,0 +1,123 @@
+"""
+CircuitBreaker state transitions and KeycloakHTTPClient outcome recording.
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.core.http import KeycloakHTTPClient
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    options = dict(
+        name="test",
+        failure_rate_threshold=0.5,
+        minimum_calls=2,
+        window=60.0,
+        reset_timeout=0.05,
+        half_open_max_calls=1,
+        max_in_flight=5
+    )
+    options.update(overrides)
+    return CircuitBreaker(**options)
+
+
+def half_open(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.minimum_calls):
+        breaker.before_call()
+        breaker.after_call(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    time.sleep(breaker.reset_timeout)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_opens_on_failure_rate():
+    breaker = make_breaker()
+    breaker.before_call()
+    breaker.after_call(False)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.before_call()
+    breaker.after_call(True)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = make_breaker()
+    half_open(breaker)
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.after_call(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    half_open(breaker)
+    breaker.before_call()
+    breaker.after_call(False)
+    assert breaker._state == CircuitBreaker.OPEN
+
+
+def test_half_open_probe_without_outcome_frees_its_slot():
+    breaker = make_breaker()
+    half_open(breaker)
+    breaker.before_call()
+    breaker.after_call(None)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+    breaker.after_call(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def client_with(breaker: CircuitBreaker, handler) -> KeycloakHTTPClient:
+    client = KeycloakHTTPClient(timeout=5.0, max_connections=5, max_keepalive_connections=5, breaker=breaker)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_probe():
+    started = asyncio.Event()
+
+    async def hang(request):
+        started.set()
+        await asyncio.sleep(60)
+
+    breaker = make_breaker()
+    client = client_with(breaker, hang)
+    half_open(breaker)
+
+    probe = asyncio.create_task(client.get("http://keycloak/realms/test"))
+    await started.wait()
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.stats()["in_flight"] == 0
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+    response = await client.get("http://keycloak/realms/test")
+    assert response.status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_unexpected_error_counts_as_failure():
+    def fail(request):
+        raise RuntimeError("boom")
+
+    breaker = make_breaker()
+    client = client_with(breaker, fail)
+    half_open(breaker)
+
+    with pytest.raises(RuntimeError):
+        await client.get("http://keycloak/realms/test")
+
+    assert breaker._state == CircuitBreaker.OPEN
+    await client.aclose()